@@ -0,0 +1,413 @@
+"""
+Admission Control for Gemini-bound Work
+Per-session and per-league token buckets in front of a weighted fair queue
+
+A request first has to take a token from its session's bucket and its league's
+bucket; an empty bucket means an immediate rejection with the time until the
+next token (HTTP 429 + Retry-After). Admitted requests then compete for a fixed
+number of upstream slots. When all slots are busy they wait in a weighted fair
+queue: self-clocked virtual finish tags per session, advanced by cost / weight
+of the request's priority class. Interactive chat (weight 4 by default) gets
+four times the share of batch predictions (weight 1) while both are queued,
+and a session that sends messages back to back only delays itself: its finish
+tags run ahead of everyone else's. The queue is bounded per session and in
+total, and nothing waits longer than `max_wait`, so overload turns into fast
+rejections instead of timeouts.
+
+State is per process: classes compete for the slots of the controller they
+share, and each worker of each service has its own. Size `concurrency` so that
+it times the total number of workers fits the upstream quota.
+
+The core is non-blocking and lock-protected; acquire() blocks a thread (Flask)
+and acquire_async() awaits on the event loop (FastAPI).
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Dict, List, Optional
+
+# Share of upstream capacity per priority class when both are queued
+DEFAULT_CLASS_WEIGHTS = {
+    'interactive': 4.0,
+    'batch': 1.0,
+}
+
+
+class Overloaded(Exception):
+    """Request rejected by admission control"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"{reason}; retry after {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        """Retry-After value in whole seconds (at least 1)"""
+        return str(max(1, int(self.retry_after + 0.999)))
+
+
+class TokenBucket:
+    """Classic token bucket; `rate` tokens per second up to `burst`"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost: float, now: float) -> float:
+        """Seconds until `cost` tokens are available (0 if they are now)"""
+        self._refill(now)
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate if self.rate > 0 else float('inf')
+
+    def take(self, cost: float):
+        self.tokens -= cost
+
+
+class _Buckets:
+    """Token buckets by key, evicting the least recently used beyond `max_keys`"""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def get(self, key: str, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class Ticket:
+    """One admitted request; holds a slot once `granted`"""
+
+    __slots__ = ('session_id', 'priority', 'finish', 'enqueued_at', 'started_at', 'granted', 'error', '_notify')
+
+    def __init__(self, session_id: str, priority: str, finish: float, now: float, notify=None):
+        self.session_id = session_id
+        self.priority = priority
+        self.finish = finish
+        self.enqueued_at = now
+        self.started_at = now
+        self.granted = False
+        self.error: Optional[Overloaded] = None
+        self._notify: Optional[Callable[[], None]] = notify
+
+
+class AdmissionController:
+    """
+    Token buckets plus a weighted fair queue in front of `concurrency` upstream slots in this process
+
+    Args:
+        concurrency: Requests allowed upstream at once
+        session_rate / session_burst: Per-session token bucket (requests/s, burst)
+        league_rate / league_burst: Per-league token bucket; skipped for requests without a league
+        max_queue: Waiting requests across all sessions
+        max_queued_per_session: Waiting requests per session
+        max_wait: Seconds a request may wait for a slot before it is rejected
+        class_weights: Priority class -> weight in the fair queue, over DEFAULT_CLASS_WEIGHTS
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        session_rate: float = 1.0,
+        session_burst: float = 5.0,
+        league_rate: float = 10.0,
+        league_burst: float = 30.0,
+        max_queue: int = 64,
+        max_queued_per_session: int = 2,
+        max_wait: float = 10.0,
+        class_weights: Optional[Dict[str, float]] = None
+    ):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_queued_per_session = max_queued_per_session
+        self.max_wait = max_wait
+        self.class_weights = {**DEFAULT_CLASS_WEIGHTS, **(class_weights or {})}
+        if any(not weight > 0 for weight in self.class_weights.values()):
+            raise ValueError("Class weights must be positive")
+
+        self._sessions = _Buckets(session_rate, session_burst)
+        self._leagues = _Buckets(league_rate, league_burst)
+        self._lock = threading.Lock()
+        self._queue: List = []  # heap of (finish tag, seq, ticket)
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self._queued_by_session: Dict[str, int] = {}
+        self._in_flight = 0
+        self._service_time = 1.0  # EWMA of seconds a slot is held
+
+        self.admitted = 0
+        self.admitted_by_class: Dict[str, int] = {name: 0 for name in self.class_weights}
+        self.rejected: Dict[str, int] = {'session-rate': 0, 'league-rate': 0, 'queue-full': 0, 'timeout': 0}
+
+    def _weight(self, priority: str) -> float:
+        if priority not in self.class_weights:
+            raise ValueError(f"Unknown priority class '{priority}'")
+        return self.class_weights[priority]
+
+    def _queue_retry_after(self) -> float:
+        return max(len(self._queue), 1) * self._service_time / max(self.concurrency, 1)
+
+    def try_admit(
+        self,
+        session_id: str,
+        league_id=None,
+        priority: str = 'interactive',
+        cost: float = 1.0,
+        notify: Optional[Callable[[], None]] = None
+    ) -> Ticket:
+        """
+        Admit or reject without blocking
+
+        Args:
+            priority: Class in `class_weights`, e.g. 'interactive' or 'batch'
+            notify: Called (from the releasing thread) when a queued ticket is granted or times out
+
+        Returns:
+            A ticket that is either granted (slot held) or queued
+
+        Raises:
+            Overloaded: Rate limited or queue full
+            ValueError: Unknown priority class
+        """
+        now = time.monotonic()
+        session_id = str(session_id)
+        weight = self._weight(priority)
+
+        with self._lock:
+            session_bucket = self._sessions.get(session_id, now)
+            wait = session_bucket.wait_time(cost, now)
+            if wait > 0:
+                self.rejected['session-rate'] += 1
+                raise Overloaded("Too many requests for this session", wait)
+
+            league_bucket = None
+            if league_id is not None:
+                league_bucket = self._leagues.get(str(league_id), now)
+                wait = league_bucket.wait_time(cost, now)
+                if wait > 0:
+                    self.rejected['league-rate'] += 1
+                    raise Overloaded("Too many requests for this league", wait)
+
+            queued = self._queued_by_session.get(session_id, 0)
+            if self._in_flight >= self.concurrency and (
+                len(self._queue) >= self.max_queue or queued >= self.max_queued_per_session
+            ):
+                self.rejected['queue-full'] += 1
+                raise Overloaded("Server busy", self._queue_retry_after())
+
+            session_bucket.take(cost)
+            if league_bucket is not None:
+                league_bucket.take(cost)
+
+            start = max(self._virtual_time, self._last_finish.get(session_id, 0.0))
+            finish = start + cost / weight
+            self._last_finish[session_id] = finish
+            ticket = Ticket(session_id, priority, finish, now, notify)
+            self.admitted += 1
+            self.admitted_by_class[priority] += 1
+
+            if self._in_flight < self.concurrency and not self._queue:
+                self._grant(ticket)
+            else:
+                heapq.heappush(self._queue, (finish, next(self._seq), ticket))
+                self._queued_by_session[session_id] = queued + 1
+            return ticket
+
+    def _grant(self, ticket: Ticket):
+        ticket.granted = True
+        ticket.started_at = time.monotonic()
+        self._in_flight += 1
+        self._virtual_time = max(self._virtual_time, ticket.finish)
+
+    def _dequeue(self, ticket: Ticket):
+        remaining = self._queued_by_session[ticket.session_id] - 1
+        if remaining:
+            self._queued_by_session[ticket.session_id] = remaining
+        else:
+            del self._queued_by_session[ticket.session_id]
+
+    def _dispatch(self) -> List[Ticket]:
+        """Fill free slots from the queue in finish-tag order; returns tickets to notify"""
+        ready = []
+        now = time.monotonic()
+        while self._queue and self._in_flight < self.concurrency:
+            _, _, ticket = heapq.heappop(self._queue)
+            self._dequeue(ticket)
+            if now - ticket.enqueued_at > self.max_wait:
+                self.rejected['timeout'] += 1
+                ticket.error = Overloaded("Timed out waiting for capacity", self._queue_retry_after())
+            else:
+                self._grant(ticket)
+            ready.append(ticket)
+
+        # Sessions with nothing queued and no lead over virtual time need no state
+        if len(self._last_finish) > 4 * (self.max_queue + self.concurrency):
+            self._last_finish = {
+                session: finish for session, finish in self._last_finish.items()
+                if finish > self._virtual_time or session in self._queued_by_session
+            }
+        return ready
+
+    @staticmethod
+    def _notify_all(tickets: List[Ticket]):
+        for ticket in tickets:
+            if ticket._notify is not None:
+                ticket._notify()
+
+    def release(self, ticket: Ticket):
+        """Return a granted ticket's slot and hand it to the next queued request"""
+        if not ticket.granted:
+            return
+        with self._lock:
+            ticket.granted = False
+            self._in_flight -= 1
+            held = time.monotonic() - ticket.started_at
+            self._service_time = 0.9 * self._service_time + 0.1 * held
+            ready = self._dispatch()
+        self._notify_all(ready)
+
+    def cancel(self, ticket: Ticket):
+        """Withdraw a queued ticket (e.g. the waiter timed out or went away)"""
+        with self._lock:
+            for i, (_, _, queued) in enumerate(self._queue):
+                if queued is ticket:
+                    self._queue[i] = self._queue[-1]
+                    self._queue.pop()
+                    heapq.heapify(self._queue)
+                    self._dequeue(ticket)
+                    self.rejected['timeout'] += 1
+                    return
+        # Granted while we were giving up: pass the slot on
+        self.release(ticket)
+
+    def acquire(self, session_id: str, league_id=None, priority: str = 'interactive', cost: float = 1.0) -> Ticket:
+        """Block the calling thread until a slot is granted"""
+        event = threading.Event()
+        ticket = self.try_admit(session_id, league_id, priority, cost, notify=event.set)
+        if not ticket.granted and ticket.error is None and not event.wait(self.max_wait):
+            self.cancel(ticket)
+            if not ticket.granted:
+                raise Overloaded("Timed out waiting for capacity", self._queue_retry_after())
+        if ticket.error is not None:
+            raise ticket.error
+        return ticket
+
+    async def acquire_async(
+        self,
+        session_id: str,
+        league_id=None,
+        priority: str = 'interactive',
+        cost: float = 1.0
+    ) -> Ticket:
+        """Await a slot without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+        ticket = self.try_admit(
+            session_id, league_id, priority, cost,
+            notify=lambda: loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+        )
+        if not ticket.granted and ticket.error is None:
+            try:
+                await asyncio.wait_for(asyncio.shield(granted), self.max_wait)
+            except asyncio.TimeoutError:
+                self.cancel(ticket)
+                if not ticket.granted:
+                    raise Overloaded("Timed out waiting for capacity", self._queue_retry_after())
+            except asyncio.CancelledError:
+                self.cancel(ticket)
+                raise
+        if ticket.error is not None:
+            raise ticket.error
+        return ticket
+
+    @contextmanager
+    def slot(self, session_id: str, league_id=None, priority: str = 'interactive', cost: float = 1.0):
+        ticket = self.acquire(session_id, league_id, priority, cost)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    @asynccontextmanager
+    async def slot_async(self, session_id: str, league_id=None, priority: str = 'interactive', cost: float = 1.0):
+        ticket = await self.acquire_async(session_id, league_id, priority, cost)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            queued_by_class = {name: 0 for name in self.class_weights}
+            for _, _, ticket in self._queue:
+                queued_by_class[ticket.priority] += 1
+            return {
+                'in_flight': self._in_flight,
+                'queued': len(self._queue),
+                'queued_by_class': queued_by_class,
+                'concurrency': self.concurrency,
+                'class_weights': dict(self.class_weights),
+                'admitted': self.admitted,
+                'admitted_by_class': dict(self.admitted_by_class),
+                'rejected': dict(self.rejected),
+                'avg_service_ms': round(self._service_time * 1000, 1)
+            }
+
+
+def admission_from_env(prefix: str = 'ADMISSION', **defaults) -> AdmissionController:
+    """
+    Build a controller from environment variables, e.g. ADMISSION_CONCURRENCY,
+    ADMISSION_SESSION_RATE, ADMISSION_SESSION_BURST, ADMISSION_LEAGUE_RATE,
+    ADMISSION_LEAGUE_BURST, ADMISSION_MAX_QUEUE, ADMISSION_MAX_WAIT, and
+    ADMISSION_CLASS_WEIGHTS as "interactive=4,batch=1"
+    """
+    settings = {
+        'concurrency': int,
+        'session_rate': float,
+        'session_burst': float,
+        'league_rate': float,
+        'league_burst': float,
+        'max_queue': int,
+        'max_queued_per_session': int,
+        'max_wait': float,
+    }
+    kwargs = dict(defaults)
+    for name, cast in settings.items():
+        value = os.environ.get(f"{prefix}_{name.upper()}")
+        if value is not None:
+            kwargs[name] = cast(value)
+    weights = os.environ.get(f"{prefix}_CLASS_WEIGHTS")
+    if weights:
+        kwargs['class_weights'] = {
+            name.strip(): float(weight)
+            for name, weight in (item.split('=', 1) for item in weights.split(',') if item.strip())
+        }
+    return AdmissionController(**kwargs)
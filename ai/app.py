@@ -6,209 +6,126 @@ Gemini AI-powered lineup optimization for fantasy sports
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+import hashlib
 import os
-import random
-from typing import Dict, List, Tuple
-from dataclasses import dataclass
+import threading
+import time
+from typing import Optional, Tuple
 import logging
-import google.generativeai as genai
+import numpy as np
+from admission import Overloaded, admission_from_env
+from circuit_breaker import DEFAULT_SLOW_CALL_S, CircuitOpen, breaker_from_env
+from frontier import efficient_frontier, player_moments
+from lineup_engine import (
+    LINEUP_FEATURES, LineupRequest, current_snapshot, feature_store, get_player_slate, get_player_stats,
+    parse_player_ids, predict_lineups_batch, predictor, published_stats_version, stats_version
+)
+from model_router import ModelRouter, shared_router
+from model_transport import shared_transport, transport_mode
+from ownership import bitsets_to_lineups, contest_fields_from_env
+from precompute import PrecomputedLineups, strategy_fingerprint
+from replacement_index import SLATE_FEATURES, ReplacementIndex, slate_features
+from request_coalescer import RequestCoalescer
+from settlement_scorer import decode_array, encode_array, pack_lineups, settle_contest
+from slate_generator import POSITIONS, TRENDING_LABELS, generate_slate
+from strategies import Strategy
+from tracing import instrument_flask, tracer_from_env
 
 app = Flask(__name__)
 CORS(app)
 
+# Continue the gateway's W3C trace; sampled spans go to TRACE_EXPORT_PATH
+tracer = tracer_from_env('ai-lineups')
+instrument_flask(app, tracer)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Configure Gemini API
+# Configure Gemini API (the SDK is imported and the model built on first use).
+# GEMINI_TRANSPORT=replay serves recorded responses instead, with no key needed.
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel('gemini-pro')
-    logger.info("Gemini AI configured successfully")
-else:
-    model = None
+if not GEMINI_API_KEY and transport_mode() != 'replay':
     logger.warning("GEMINI_API_KEY not found, using fallback rule-based system")
 
-@dataclass
-class PlayerStats:
-    """Player performance statistics"""
-    player_id: int
-    recent_performance: float  # 0-100
-    market_value: float  # Estimated NFT market value
-    consistency: float  # 0-1
-    injury_risk: float  # 0-1
-    trending: str  # 'up', 'down', 'stable'
-
-class LineupPredictor:
-    """Rule-based lineup prediction engine"""
-    
-    def __init__(self):
-        self.alpha = 0.45  # Weight for recent performance
-        self.beta = 0.30   # Weight for market value
-        self.gamma = 0.15  # Weight for consistency
-        self.delta = 0.10  # Weight for trending
-        
-    def calculate_player_score(self, stats: PlayerStats) -> float:
-        """
-        Calculate composite score for a player
-        
-        Formula: score = α * performance + β * value + γ * consistency + δ * trending - injury_risk
-        """
-        # Normalize market value (assuming max 10000)
-        normalized_value = min(stats.market_value / 100.0, 100.0)
-        
-        # Trending bonus/penalty
-        trending_score = {
-            'up': 20.0,
-            'stable': 10.0,
-            'down': 0.0
-        }.get(stats.trending, 10.0)
-        
-        # Injury risk penalty
-        injury_penalty = stats.injury_risk * 15.0
-        
-        score = (
-            self.alpha * stats.recent_performance +
-            self.beta * normalized_value +
-            self.gamma * (stats.consistency * 100.0) +
-            self.delta * trending_score -
-            injury_penalty
-        )
-        
-        return max(0.0, score)
-    
-    def optimize_lineup(
-        self,
-        available_players: List[int],
-        positions: List[str],
-        player_stats: Dict[int, PlayerStats],
-        strategy: str = 'balanced'
-    ) -> Tuple[Dict[str, List[int]], float, str]:
-        """
-        Optimize lineup based on strategy
-        
-        Args:
-            available_players: List of player IDs available for selection
-            positions: Required positions to fill
-            player_stats: Dictionary of player statistics
-            strategy: 'balanced', 'high-risk', or 'conservative'
-        
-        Returns:
-            Tuple of (lineup, expected_score, rationale)
-        """
-        # Calculate scores for all players
-        player_scores = {}
-        for player_id in available_players:
-            if player_id in player_stats:
-                player_scores[player_id] = self.calculate_player_score(player_stats[player_id])
-            else:
-                # Default score for unknown players
-                player_scores[player_id] = 50.0
-        
-        # Adjust scores based on strategy
-        if strategy == 'high-risk':
-            # Favor high market value players
-            for player_id, stats in player_stats.items():
-                if stats.market_value > 500:
-                    player_scores[player_id] *= 1.25
-        elif strategy == 'conservative':
-            # Favor consistent players with low injury risk
-            for player_id, stats in player_stats.items():
-                if stats.consistency > 0.7 and stats.injury_risk < 0.3:
-                    player_scores[player_id] *= 1.15
-        
-        # Sort players by score
-        sorted_players = sorted(
-            player_scores.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
-        
-        # Assign players to positions (simple greedy approach)
-        lineup = {}
-        used_players = set()
-        expected_score = 0.0
-        
-        for position in positions:
-            # Find best available player for this position
-            for player_id, score in sorted_players:
-                if player_id not in used_players:
-                    if position not in lineup:
-                        lineup[position] = []
-                    lineup[position].append(player_id)
-                    used_players.add(player_id)
-                    expected_score += score
-                    break
-        
-        # Generate rationale
-        rationale = self._generate_rationale(
-            lineup,
-            player_stats,
-            strategy,
-            expected_score
-        )
-        
-        return lineup, expected_score, rationale
-    
-    def _generate_rationale(
-        self,
-        lineup: Dict[str, List[int]],
-        player_stats: Dict[int, PlayerStats],
-        strategy: str,
-        expected_score: float
-    ) -> str:
-        """Generate human-readable explanation of lineup selection"""
-        
-        total_value = 0
-        trending_up = 0
-        
-        for position, players in lineup.items():
-            for player_id in players:
-                if player_id in player_stats:
-                    stats = player_stats[player_id]
-                    total_value += stats.market_value
-                    if stats.trending == 'up':
-                        trending_up += 1
-        
-        rationale_parts = [
-            f"Optimized for {strategy} strategy.",
-            f"Expected score: {expected_score:.1f}.",
-        ]
-        
-        if trending_up > 2:
-            rationale_parts.append(f"{trending_up} players trending upward.")
-        
-        if total_value > 3000:
-            rationale_parts.append("High-value player concentration.")
-        
-        return " ".join(rationale_parts)
+# Lineup requests must finish inside the gateway's 10s timeout, leaving time to respond
+LINEUP_DEADLINE_S = float(os.environ.get('LINEUP_DEADLINE_S', '8'))
 
+_router_logged = False
 
-# Initialize predictor
-predictor = LineupPredictor()
 
-# Mock player database (in production, this would query Find Labs / Dapper APIs)
-def get_player_stats(player_ids: List[int]) -> Dict[int, PlayerStats]:
-    """
-    Mock function to retrieve player statistics
-    In production: Query Find Labs API, Dapper Moments, on-chain data
-    """
-    stats = {}
+def get_router() -> Optional[ModelRouter]:
+    """Return the shared model tier router over the configured transport (None without an API key)"""
+    global _router_logged
+    router = shared_router(GEMINI_API_KEY)
+    if router is not None and not _router_logged:
+        _router_logged = True
+        tiers = ', '.join(f"{tier.name}={tier.model}" for tier in router.tiers)
+        logger.info(f"Gemini AI configured successfully ({router.transport.mode} transport; tiers {tiers})")
+    return router
+
+
+def get_model(tier: Optional[str] = None):
+    """Return the shared Gemini model for a tier, the top tier by default (None without an API key)"""
+    router = get_router()
+    if router is None:
+        return None
+    return router.model(tier or router.top.name)
+
+
+def warm_up():
+    """Preload the Gemini SDK and every tier's model, e.g. in the gunicorn master before workers fork"""
+    router = get_router()
+    if router is not None:
+        for tier in router.tiers:
+            router.model(tier.name)
+
+# Concurrent rule-based predictions share one scoring pass per batch
+lineup_coalescer = RequestCoalescer(
+    predict_lineups_batch,
+    window_ms=float(os.environ.get('COALESCE_WINDOW_MS', '2')),
+    max_batch=int(os.environ.get('COALESCE_MAX_BATCH', '64'))
+)
+
+# Gemini-bound predictions: rate-limit per player address and league and queue fairly
+# for this worker's upstream slots; rejected requests fall back to the rule-based engine
+gemini_admission = admission_from_env()
+
+# Stop waiting on Gemini while it is failing or slow; requests use the rule-based engine.
+# A call taking over a quarter of the deadline counts as slow, so a degrading Gemini
+# trips the breaker well before requests start missing LINEUP_DEADLINE_S
+gemini_breaker = breaker_from_env('gemini-lineups', slow_call_s=min(DEFAULT_SLOW_CALL_S, LINEUP_DEADLINE_S / 4))
+
+# Per-league lineups built ahead of time by precompute.py; served when still current
+PRECOMPUTE_DIR = os.environ.get('PRECOMPUTE_DIR', '')
+precomputed_lineups = PrecomputedLineups(PRECOMPUTE_DIR) if PRECOMPUTE_DIR else None
+
+# Field ownership per contest, fed by entry batches as they are submitted;
+# shared by every worker when CONTEST_STORE_PATH is set, idle contests expire
+contest_fields = contest_fields_from_env()
+
+# League-wide substitute index: the whole snapshot, or generated IDs 1..N without one
+REPLACEMENT_UNIVERSE = int(os.environ.get('REPLACEMENT_UNIVERSE', '10000'))
+_replacement_index: Optional[Tuple[str, ReplacementIndex]] = None
+_replacement_lock = threading.Lock()
+
+
+def replacement_index() -> ReplacementIndex:
+    """Substitute index for the current stats version, rebuilt when new stats are published"""
+    global _replacement_index
+    snapshot = current_snapshot()
+    version = published_stats_version()
     
-    for player_id in player_ids:
-        # Generate semi-realistic mock data
-        random.seed(player_id)  # Deterministic for same player
-        
-        stats[player_id] = PlayerStats(
-            player_id=player_id,
-            recent_performance=random.uniform(40.0, 95.0),
-            market_value=random.uniform(50.0, 2000.0),
-            consistency=random.uniform(0.3, 0.95),
-            injury_risk=random.uniform(0.0, 0.4),
-            trending=random.choice(['up', 'up', 'stable', 'down'])
-        )
+    cached = _replacement_index
+    if cached is not None and cached[0] == version:
+        return cached[1]
     
-    return stats
+    with _replacement_lock:
+        if _replacement_index is None or _replacement_index[0] != version:
+            slate = snapshot.slate() if snapshot is not None else generate_slate(n_players=REPLACEMENT_UNIVERSE)
+            if feature_store is not None:
+                slate = feature_store.materialize(slate.player_id, base=slate)
+            _replacement_index = (version, ReplacementIndex.from_slate(slate))
+        return _replacement_index[1]
 
 
 @app.route('/health', methods=['GET'])
@@ -217,12 +134,27 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'service': 'Flow Fantasy Fusion AI',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'statsVersion': stats_version(),
+        'coalescer': lineup_coalescer.stats(),
+        'admission': gemini_admission.stats(),
+        'circuitBreaker': gemini_breaker.stats(),
+        'contests': contest_fields.stats(),
+        'precomputed': precomputed_lineups.stats() if precomputed_lineups is not None else None,
+        'featureStore': feature_store.stats() if feature_store is not None else None,
+        'modelTransport': shared_transport(GEMINI_API_KEY).stats() if shared_transport(GEMINI_API_KEY) else None,
+        'modelRouter': get_router().stats() if get_router() else None,
+        'tracing': tracer.stats()
     })
 
 
-def predict_lineup_with_gemini(available_players, positions, player_stats, strategy):
-    """Use Gemini AI to predict optimal lineup"""
+def predict_lineup_with_gemini(available_players, positions, player_stats, strategy, deadline=None):
+    """
+    Use Gemini AI to predict optimal lineup
+
+    The model tier is routed per call from the prompt size and the time left
+    before `deadline` (a time.monotonic() value; None for no deadline).
+    """
     try:
         # Prepare player data for Gemini
         player_data_str = "\n".join([
@@ -250,7 +182,14 @@ LINEUP: [list of player IDs in order of positions]
 SCORE: [number]
 RATIONALE: [your explanation]"""
 
-        response = model.generate_content(prompt)
+        router = get_router()
+        route = router.route(
+            len(prompt), 'lineup', deadline_s=None if deadline is None else deadline - time.monotonic()
+        )
+        with tracer.span('gemini.generate', attributes={
+            'prompt.chars': len(prompt), 'model.tier': route.tier, 'model.route': route.reason
+        }), gemini_breaker.guard(), router.track(route.tier):
+            response = router.model(route.tier).generate_content(prompt)
         text = response.text
         
         # Parse Gemini response
@@ -280,6 +219,8 @@ RATIONALE: [your explanation]"""
         
         return lineup_dict, expected_score, rationale
         
+    except CircuitOpen:
+        return None
     except Exception as e:
         logger.error(f"Gemini prediction failed: {e}, falling back to rule-based")
         return None
@@ -296,10 +237,18 @@ def predict_lineup():
         "playerAddress": "0x123...",
         "availablePlayers": [1, 2, 3, 4, 5],
         "positions": ["PG", "SG", "SF", "PF", "C"],
-        "optimizationGoal": "balanced"
+        "optimizationGoal": "balanced",
+        "optimizationGoals": ["balanced", "conservative", "high-risk"]  (optional),
+        "contestId": "c-1", "leverage": 0.5  (optional, 0-1, fade players the contest field owns)
     }
+    
+    When optimizationGoals is given, every goal is scored in one rule-based
+    pass and returned under "lineups"; "lineup" holds the first goal.
+    metadata.source is "precomputed" when the answer came from the league's
+    precompute.py artifact and "live" when it was computed for this request.
     """
     try:
+        deadline = time.monotonic() + LINEUP_DEADLINE_S
         data = request.get_json()
         
         # Validate input
@@ -310,35 +259,86 @@ def predict_lineup():
         
         league_id = data['leagueId']
         player_address = data['playerAddress']
-        available_players = data['availablePlayers']
+        try:
+            available_players = parse_player_ids(data['availablePlayers'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         positions = data['positions']
-        strategy = data.get('optimizationGoal', 'balanced')
+        strategies = data.get('optimizationGoals') or [data.get('optimizationGoal', 'balanced')]
+        # A bare string would be iterated one character (one unknown strategy) at a time
+        if not isinstance(strategies, list) or not all(isinstance(name, str) and name for name in strategies):
+            return jsonify({'error': 'optimizationGoals must be a list of strategy names'}), 400
+        strategy = strategies[0]
+        try:
+            leverage = float(data.get('leverage', 0.0))
+        except (ValueError, TypeError):
+            return jsonify({'error': 'leverage must be a number between 0 and 1'}), 400
+        # Above 1 the fade would turn into a reward for owned players (and NaN fails too)
+        if not 0.0 <= leverage <= 1.0:
+            return jsonify({'error': 'leverage must be a number between 0 and 1'}), 400
+        field = None
+        if 'contestId' in data and leverage:
+            field = contest_fields.get(data['contestId'])
+            if field is None:
+                return jsonify({'error': 'Unknown contest'}), 404
         
         logger.info(f"Predicting lineup for league {league_id}, player {player_address}")
         
-        # Get player statistics
-        player_stats = get_player_stats(available_players)
-        
         # Try Gemini AI first, fallback to rule-based
         lineup = None
         expected_score = 0
         rationale = ""
         ai_method = "rule-based"
-        
-        if model:
-            result = predict_lineup_with_gemini(available_players, positions, player_stats, strategy)
+        source = "live"
+        
+        lineups = None
+        
+        # The league's precomputed artifact, when it is current for these stats and
+        # strategies, answers before any model call. Leverage depends on the
+        # contest's live ownership, so it is never precomputed
+        if precomputed_lineups is not None and field is None:
+            lineups = precomputed_lineups.lookup(
+                league_id,
+                available_players,
+                positions,
+                {name: strategy_fingerprint(predictor.registry.get(name, league_id)) for name in strategies},
+                stats_version()
+            )
+            if lineups:
+                source = "precomputed"
+                lineup, expected_score, rationale = lineups[strategy]
+        
+        # An open breaker skips Gemini (and its admission queue) entirely. Admission only
+        # sheds Gemini calls: a throttled request gets the rule-based lineup instead
+        if not lineup and get_router() and len(strategies) == 1 and field is None and not gemini_breaker.is_open:
+            with tracer.span('stats.fetch', attributes={'players': len(available_players)}):
+                player_stats = get_player_stats(available_players)
+            try:
+                with tracer.span('gemini.admission'), gemini_admission.slot(player_address, league_id, priority='batch'):
+                    result = predict_lineup_with_gemini(available_players, positions, player_stats, strategy, deadline)
+            except Overloaded as e:
+                logger.info(f"Gemini admission rejected ({e.reason}), using rule-based lineup")
+                result = None
             if result:
                 lineup, expected_score, rationale = result
                 ai_method = "gemini-ai"
         
-        # Fallback to rule-based if Gemini fails
+        # Fallback to rule-based if Gemini fails, computed live
+        if not lineup and field is not None:
+            with tracer.span('lineup.leverage', attributes={'entries': field.entries}):
+                lineups = predictor.optimize_lineups(
+                    available_players, positions, get_player_stats(available_players),
+                    strategies, league_id, field, leverage
+                )
+            lineup, expected_score, rationale = lineups[strategy]
+        
         if not lineup:
-            lineup, expected_score, rationale = predictor.optimize_lineup(
-                available_players=available_players,
-                positions=positions,
-                player_stats=player_stats,
-                strategy=strategy
-            )
+            # Concurrent requests share one scoring pass
+            with tracer.span('lineup.rule_based', attributes={'strategies': len(strategies)}):
+                lineups = lineup_coalescer.submit(
+                    LineupRequest(available_players, positions, strategies, league_id)
+                )
+            lineup, expected_score, rationale = lineups[strategy]
         
         # Calculate confidence (based on data availability and score distribution)
         confidence = min(0.95, 0.65 + (expected_score / 1000.0))
@@ -356,11 +356,27 @@ def predict_lineup():
                 'leagueId': league_id,
                 'playerAddress': player_address,
                 'strategy': strategy,
+                'source': source,
                 'timestamp': os.times().elapsed
             }
         }
         
-        logger.info(f"Lineup prediction successful: method={ai_method}, score={expected_score:.1f}, confidence={confidence:.2f}")
+        if field is not None:
+            response['metadata']['leverage'] = {'weight': leverage, 'fieldEntries': field.entries}
+        
+        if lineups and len(strategies) > 1:
+            response['lineups'] = {
+                name: {
+                    'positions': result[0],
+                    'expectedScore': round(result[1], 2),
+                    'confidence': round(min(0.95, 0.65 + (result[1] / 1000.0)), 2),
+                    'rationale': result[2],
+                    'aiMethod': ai_method
+                }
+                for name, result in lineups.items()
+            }
+        
+        logger.info(f"Lineup prediction successful: method={ai_method}, source={source}, score={expected_score:.1f}, confidence={confidence:.2f}")
         
         return jsonify(response), 200
         
@@ -372,6 +388,349 @@ def predict_lineup():
         }), 500
 
 
+@app.route('/api/ai/strategies', methods=['GET'])
+def list_strategies():
+    """List global strategies, plus a league's custom ones with ?leagueId="""
+    league_id = request.args.get('leagueId')
+    return jsonify({
+        'success': True,
+        'strategies': [
+            predictor.registry.get(name, league_id).to_dict()
+            for name in predictor.registry.names(league_id)
+        ],
+        'features': list(LINEUP_FEATURES)
+    })
+
+
+@app.route('/api/ai/strategies', methods=['POST'])
+def register_strategy():
+    """
+    Register a custom strategy for a league
+    
+    Expected payload:
+    {
+        "leagueId": 1,
+        "name": "value-hunter",
+        "weights": {"recent_performance": 0.3, "normalized_value": 0.6, "injury_penalty": -1.0},
+        "modifiers": [{"conditions": [["market_value", "<", 400]], "factor": 1.2}],
+        "floor": 0.0
+    }
+    """
+    try:
+        data = request.get_json()
+        
+        if 'leagueId' not in data or 'name' not in data or 'weights' not in data:
+            return jsonify({'error': 'Missing required field: leagueId, name and weights are required'}), 400
+        
+        strategy = Strategy.from_dict(data)
+        predictor.registry.register(strategy, league_id=data['leagueId'])
+        
+        return jsonify({'success': True, 'strategy': strategy.to_dict()}), 200
+        
+    except (ValueError, KeyError, TypeError, IndexError) as e:
+        return jsonify({'success': False, 'error': f'Invalid strategy: {e}'}), 400
+
+
+@app.route('/api/ai/replacements', methods=['POST'])
+def find_replacements():
+    """
+    Nearest same-position substitutes for an injured or slumping player
+    
+    Expected payload:
+    {
+        "playerId": 42,
+        "k": 3,
+        "maxValue": 800,              # optional, defaults to the player's market value
+        "maxInjuryRisk": 0.2,         # optional
+        "exclude": [1, 2, 3],         # optional, e.g. the rest of the lineup
+        "availablePlayers": [...]     # optional, search this pool instead of the whole league
+    }
+    """
+    try:
+        data = request.get_json()
+        player_id = data.get('playerId')
+        
+        if player_id is None:
+            return jsonify({'error': 'Missing playerId'}), 400
+        
+        [player_id] = parse_player_ids([player_id], 'playerId')
+        exclude = parse_player_ids(data.get('exclude', []), 'exclude')
+        player = get_player_slate([player_id])
+        
+        if data.get('availablePlayers'):
+            index = ReplacementIndex.from_slate(get_player_slate(parse_player_ids(data['availablePlayers'])))
+        else:
+            index = replacement_index()
+        
+        # Look for this player's profile without the slump
+        target = slate_features(player)[0]
+        target[SLATE_FEATURES.index('trend')] = max(target[SLATE_FEATURES.index('trend')], 0.0)
+        
+        max_value = data.get('maxValue')
+        max_risk = data.get('maxInjuryRisk')
+        matches = index.query(
+            target,
+            int(player.position[0]),
+            k=min(int(data.get('k', 3)), 50),
+            max_value=float(player.market_value[0]) if max_value is None else float(max_value),
+            exclude=[player_id, *exclude],
+            max_risk=None if max_risk is None else float(max_risk)
+        )
+        
+        stats = get_player_stats([match.player_id for match in matches])
+        replacements = []
+        for match in matches:
+            player_stats = stats[match.player_id]
+            replacements.append({
+                'playerId': match.player_id,
+                'distance': round(match.distance, 4),
+                'score': round(predictor.calculate_player_score(player_stats), 2),
+                'marketValue': round(player_stats.market_value, 2),
+                'recentPerformance': round(player_stats.recent_performance, 2),
+                'injuryRisk': round(player_stats.injury_risk, 2),
+                'trending': player_stats.trending
+            })
+        
+        return jsonify({
+            'success': True,
+            'playerId': player_id,
+            'position': POSITIONS[int(player.position[0])],
+            'replacements': replacements
+        }), 200
+        
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'error': f'Invalid request: {e}'}), 400
+    except Exception as e:
+        logger.error(f"Error finding replacements: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/ai/frontier', methods=['POST'])
+def lineup_frontier():
+    """
+    Every lineup on the expected-score vs. variance frontier, from one solve
+    
+    Expected payload:
+    {
+        "leagueId": 1,                           # optional, for league strategies
+        "availablePlayers": [1, 2, 3, ...],
+        "positions": ["PG", "SG", "SF", "PF", "C"],
+        "optimizationGoal": "balanced",          # scores used as expected points
+        "positionAware": true                    # fill each position from its own players
+    }
+    
+    Points run from the highest expected score to the lowest variance, so a
+    risk slider can index into them client-side.
+    """
+    try:
+        data = request.get_json()
+        
+        if 'availablePlayers' not in data or 'positions' not in data:
+            return jsonify({'error': 'Missing required field: availablePlayers and positions are required'}), 400
+        
+        positions = data['positions']
+        strategy = data.get('optimizationGoal', 'balanced')
+        position_aware = data.get('positionAware', True)
+        pool = np.unique(np.asarray(parse_player_ids(data['availablePlayers']), dtype=np.int64))
+        
+        with tracer.span('stats.fetch', attributes={'players': len(pool)}):
+            slate = get_player_slate(pool)
+        scores = predictor.score_strategies(slate, [strategy], data.get('leagueId'))[:, 0]
+        mean, variance = player_moments(scores, slate.consistency, slate.injury_risk)
+        
+        if position_aware:
+            unknown = [position for position in positions if position not in POSITIONS]
+            if unknown:
+                return jsonify({'error': f'Unknown positions: {unknown}'}), 400
+            slots = {position: positions.count(position) for position in positions}
+            groups = np.asarray(POSITIONS)[slate.position]
+            frontier = efficient_frontier(slate.player_id, mean, variance, groups, slots)
+        else:
+            frontier = efficient_frontier(slate.player_id, mean, variance, slots=len(positions))
+        
+        row_of = {int(player_id): row for row, player_id in enumerate(slate.player_id.tolist())}
+        lineups = []
+        for point in frontier.points:
+            rows = sorted((row_of[player_id] for player_id in point.player_ids), key=lambda row: -scores[row])
+            if position_aware:
+                lineup = {}
+                for row in rows:
+                    lineup.setdefault(POSITIONS[slate.position[row]], []).append(int(slate.player_id[row]))
+            else:
+                lineup, _ = predictor._assign(slate.player_id[rows].tolist(), [], positions)
+            lineups.append(lineup)
+        
+        payload = frontier.to_dict()
+        payload['lineups'] = lineups
+        return jsonify({'success': True, 'strategy': strategy, 'frontier': payload}), 200
+        
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'error': f'Invalid request: {e}'}), 400
+    except Exception as e:
+        logger.error(f"Error computing frontier: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/ai/settle-contest', methods=['POST'])
+def settle_contest_endpoint():
+    """
+    Score every lineup in a contest and split the top-3 prize pool
+    
+    Expected payload (packed arrays are base64 little-endian; JSON lists also work
+    for small contests as "points" / "lineups"):
+    {
+        "pointsPacked": "<float64 points per player slot>",
+        "lineupsPacked": "<int32 indices into points, -1 for empty slots>",
+        "slots": 9,
+        "prizePool": 1000.0,
+        "includeTotals": false
+    }
+    """
+    try:
+        data = request.get_json()
+        
+        if 'pointsPacked' in data:
+            points = decode_array(data['pointsPacked'], '<f8')
+        elif 'points' in data:
+            points = np.asarray(data['points'], dtype=np.float64)
+        else:
+            return jsonify({'error': 'Missing required field: points or pointsPacked'}), 400
+        
+        if 'lineupsPacked' in data:
+            if not data.get('slots'):
+                return jsonify({'error': 'slots is required with lineupsPacked'}), 400
+            lineups = decode_array(data['lineupsPacked'], '<i4', int(data['slots']))
+        elif 'lineups' in data:
+            lineups = pack_lineups(data['lineups'], data.get('slots'))
+        else:
+            return jsonify({'error': 'Missing required field: lineups or lineupsPacked'}), 400
+        
+        result = settle_contest(points, lineups, float(data.get('prizePool', 1.0)))
+        
+        response = {
+            'success': True,
+            'entries': result['entries'],
+            'payouts': result['payouts'],
+            'unallocated': result['unallocated']
+        }
+        if data.get('includeTotals'):
+            response['totalsPacked'] = encode_array(result['totals'], '<f8')
+        
+        return jsonify(response), 200
+        
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'error': f'Invalid contest: {e}'}), 400
+    except Exception as e:
+        logger.error(f"Error settling contest: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/ai/contests/<contest_id>/entries', methods=['POST'])
+def ingest_contest_entries(contest_id):
+    """
+    Add a batch of submitted lineups to a contest's ownership counts
+    
+    Expected payload, one of:
+    {"lineupsPacked": "<int32 player IDs, -1 for empty slots>", "slots": 9}
+    {"lineups": [[1, 2, 3], [4, 5, 6]]}
+    {"bitsetsPacked": "<uint8 bitset rows>", "universe": [101, 102, ...]}
+    """
+    try:
+        data = request.get_json()
+        
+        if 'bitsetsPacked' in data:
+            universe = data.get('universe')
+            if not universe:
+                return jsonify({'error': 'universe is required with bitsetsPacked'}), 400
+            row_bytes = (len(universe) + 7) // 8
+            lineups = bitsets_to_lineups(decode_array(data['bitsetsPacked'], 'u1', row_bytes), universe)
+        elif 'lineupsPacked' in data:
+            if not data.get('slots'):
+                return jsonify({'error': 'slots is required with lineupsPacked'}), 400
+            lineups = decode_array(data['lineupsPacked'], '<i4', int(data['slots']))
+        elif 'lineups' in data:
+            lineups = pack_lineups(data['lineups'], data.get('slots'))
+        else:
+            return jsonify({'error': 'Missing required field: lineups, lineupsPacked or bitsetsPacked'}), 400
+        
+        field = contest_fields.ingest(contest_id, lineups)
+        return jsonify({'success': True, 'contestId': contest_id, 'field': field.stats()}), 200
+        
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'error': f'Invalid entries: {e}'}), 400
+    except Exception as e:
+        logger.error(f"Error ingesting contest entries: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/ai/contests/<contest_id>/ownership', methods=['GET'])
+def contest_ownership(contest_id):
+    """Most-owned players and most common pairs, e.g. ?top=20&stacks=10"""
+    field = contest_fields.get(contest_id)
+    if field is None:
+        return jsonify({'error': 'Unknown contest'}), 404
+    
+    return jsonify({
+        'success': True,
+        'contestId': contest_id,
+        'field': field.stats(),
+        'players': field.top_owned(min(request.args.get('top', 20, type=int), 500)),
+        'stacks': field.stacks(min(request.args.get('stacks', 10, type=int), 500))
+    }), 200
+
+
+@app.route('/api/ai/contests/<contest_id>/uniqueness', methods=['POST'])
+def contest_uniqueness(contest_id):
+    """
+    How unique lineups are against a contest's field
+    
+    Expected payload:
+    {
+        "lineups": [[1, 2, 3, 4, 5]]
+    }
+    """
+    try:
+        data = request.get_json()
+        field = contest_fields.get(contest_id)
+        if field is None:
+            return jsonify({'error': 'Unknown contest'}), 404
+        if not data.get('lineups'):
+            return jsonify({'error': 'Missing lineups'}), 400
+        
+        lineups = pack_lineups(data['lineups'])
+        result = field.uniqueness(lineups)
+        return jsonify({
+            'success': True,
+            'contestId': contest_id,
+            'fieldEntries': field.entries,
+            'duplicates': result['duplicates'].tolist(),
+            'ownershipSum': np.round(result['ownershipSum'], 4).tolist(),
+            'logUniqueness': np.round(result['logUniqueness'], 3).tolist(),
+            'ownership': np.round(field.ownership(lineups.ravel()).reshape(lineups.shape), 4).tolist()
+        }), 200
+        
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'error': f'Invalid lineups: {e}'}), 400
+    except Exception as e:
+        logger.error(f"Error scoring uniqueness: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @app.route('/api/ai/player-analysis', methods=['POST'])
 def player_analysis():
     """
@@ -419,6 +778,78 @@ def player_analysis():
         }), 500
 
 
+# Upper bound on ids per bulk analysis request
+BULK_ANALYSIS_MAX_IDS = int(os.environ.get('BULK_ANALYSIS_MAX_IDS', '1000'))
+
+
+def bulk_analysis_etag(player_ids: np.ndarray, version: str) -> str:
+    """ETag for a roster's analysis: changes only with the stats version or the ids asked for"""
+    digest = hashlib.blake2b(player_ids.tobytes(), digest_size=8)
+    digest.update(version.encode())
+    return digest.hexdigest()
+
+
+@app.route('/api/ai/player-analysis/bulk', methods=['POST'])
+def player_analysis_bulk():
+    """
+    Score many players in one vectorized pass, returned column by column
+    
+    Expected payload:
+    {
+        "playerIds": [42, 7, 19]
+    }
+    
+    The response carries an ETag for the current stats version; a request with
+    a matching If-None-Match gets 304 without the stats being fetched or scored.
+    """
+    try:
+        data = request.get_json()
+        player_ids = data.get('playerIds') if isinstance(data, dict) else None
+        
+        if not isinstance(player_ids, list) or not player_ids:
+            return jsonify({'error': 'Missing playerIds'}), 400
+        if len(player_ids) > BULK_ANALYSIS_MAX_IDS:
+            return jsonify({'error': f'At most {BULK_ANALYSIS_MAX_IDS} playerIds per request'}), 400
+        if not all(isinstance(pid, int) and not isinstance(pid, bool) for pid in player_ids):
+            return jsonify({'error': 'playerIds must be integers'}), 400
+        
+        ids = np.asarray(player_ids, dtype=np.int64)
+        version = stats_version()
+        etag = bulk_analysis_etag(ids, version)
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': 'private, no-cache'}
+        # Weak comparison (RFC 7232): proxies that compress responses weaken the tag
+        if request.if_none_match.contains_weak(etag):
+            return '', 304, headers
+        
+        with tracer.span('stats.fetch', attributes={'players': len(ids)}):
+            slate = get_player_slate(ids)
+        scores = predictor.calculate_scores(slate)
+        
+        response = {
+            'success': True,
+            'statsVersion': version,
+            'count': len(slate),
+            'columns': {
+                'playerId': slate.player_id.tolist(),
+                'score': np.round(scores, 2).tolist(),
+                'recentPerformance': np.round(slate.recent_performance, 2).tolist(),
+                'marketValue': np.round(slate.market_value, 2).tolist(),
+                'consistency': np.round(slate.consistency, 2).tolist(),
+                'injuryRisk': np.round(slate.injury_risk, 2).tolist(),
+                'trending': [TRENDING_LABELS[t] for t in slate.trending.tolist()]
+            }
+        }
+        
+        return jsonify(response), 200, headers
+        
+    except Exception as e:
+        logger.error(f"Error analyzing players: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') == 'development'
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the AI services
+Runs offline, without a Gemini API key
+
+Usage:
+    python benchmark.py                 # run every benchmark
+    python benchmark.py semantic-cache  # run a single benchmark
+"""
+
+import os
+import subprocess
+import sys
+import time
+from typing import Callable, Dict
+
+import numpy as np
+
+BENCHMARKS: Dict[str, Callable[[], None]] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark under a command-line name"""
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def report_latencies(label: str, samples_s):
+    """Print p50/p99 latency for a list of per-operation timings in seconds"""
+    samples_us = np.asarray(samples_s) * 1e6
+    print(
+        f"  {label}: p50={np.percentile(samples_us, 50):.1f}µs "
+        f"p99={np.percentile(samples_us, 99):.1f}µs "
+        f"mean={samples_us.mean():.1f}µs"
+    )
+
+
+@benchmark("semantic-cache")
+def bench_semantic_cache():
+    """Lookup latency of the chat response cache at 100k entries"""
+    from semantic_cache import SemanticCache
+
+    entries = 100_000
+    rng = np.random.default_rng(7)
+    vocabulary = [
+        "lineup", "balanced", "aggressive", "safe", "trending", "players", "budget",
+        "flow", "center", "guard", "forward", "lakers", "celtics", "warriors", "heat",
+        "tonight", "value", "nft", "risk", "upside", "consistent", "injury", "swap",
+        "league", "strategy", "suggest", "who", "best", "cheap", "stack"
+    ]
+
+    def random_message():
+        words = rng.choice(vocabulary, size=rng.integers(4, 10))
+        return " ".join(words) + f" {rng.integers(0, 1_000_000)}"
+
+    cache = SemanticCache(capacity=entries)
+    scopes = [f"scope-{i}" for i in range(4)]
+
+    start = time.perf_counter()
+    for i in range(entries):
+        cache.put(random_message(), f"response {i}", scopes[i % len(scopes)])
+    insert_s = time.perf_counter() - start
+    print(f"  inserted {entries:,} entries in {insert_s:.2f}s")
+
+    queries = [random_message() for _ in range(2000)]
+    timings = []
+    for i, query in enumerate(queries):
+        t0 = time.perf_counter()
+        cache.lookup(query, scopes[i % len(scopes)])
+        timings.append(time.perf_counter() - t0)
+    report_latencies("lookup (miss-heavy)", timings)
+
+    timings = []
+    for i in range(2000):
+        t0 = time.perf_counter()
+        cache.lookup("suggest a balanced lineup for me", scopes[0])
+        timings.append(time.perf_counter() - t0)
+    report_latencies("lookup (repeat)", timings)
+
+
+@benchmark("slate")
+def bench_slate():
+    """Synthetic slate generation throughput and per-request stats lookup"""
+    from slate_generator import generate_slate
+
+    for n_players in (100_000, 1_000_000, 5_000_000):
+        start = time.perf_counter()
+        generate_slate(n_players=n_players)
+        elapsed = time.perf_counter() - start
+        print(f"  {n_players:>9,} players: {elapsed * 1000:8.1f}ms ({n_players / elapsed / 1e6:.1f}M players/s)")
+
+    from lineup_engine import get_player_stats
+
+    rng = np.random.default_rng(11)
+    timings = []
+    for _ in range(500):
+        pool = rng.integers(1, 1_000_000, size=50).tolist()
+        t0 = time.perf_counter()
+        get_player_stats(pool)
+        timings.append(time.perf_counter() - t0)
+    report_latencies("get_player_stats (50 players)", timings)
+
+
+@benchmark("feature-store")
+def bench_feature_store():
+    """Game-log ingest throughput and per-pool PlayerStats materialization at millions of rows"""
+    from feature_store import GameLogStore, synthetic_game_logs
+
+    n_players, games = 200_000, 25
+    ids = np.arange(1, n_players + 1)
+    days = [synthetic_game_logs(ids, 1, first_game=game) for game in range(games)]
+    rows = n_players * games
+
+    store = GameLogStore()
+    start = time.perf_counter()
+    for logs in days:
+        store.append(logs)
+    elapsed = time.perf_counter() - start
+    print(f"  {rows:>9,} rows in {games} daily batches: {elapsed * 1000:8.1f}ms ({rows / elapsed / 1e6:.1f}M rows/s)")
+
+    bulk = {name: np.concatenate([logs[name] for logs in days]) for name in days[0]}
+    start = time.perf_counter()
+    GameLogStore().append(bulk)
+    elapsed = time.perf_counter() - start
+    print(f"  {rows:>9,} rows in one batch:     {elapsed * 1000:8.1f}ms ({rows / elapsed / 1e6:.1f}M rows/s)")
+
+    rng = np.random.default_rng(5)
+    for pool_size, repeats in ((50, 500), (1_000, 200), (100_000, 10)):
+        timings = []
+        for _ in range(repeats):
+            pool = rng.integers(1, n_players + 1, size=pool_size)
+            t0 = time.perf_counter()
+            store.materialize(pool)
+            timings.append(time.perf_counter() - t0)
+        report_latencies(f"materialize {pool_size:>7,} players", timings)
+
+
+@benchmark("coalescer")
+def bench_coalescer():
+    """Rule-based lineup throughput with and without request coalescing"""
+    import threading
+
+    from lineup_engine import LineupRequest, predict_lineups_batch
+    from request_coalescer import RequestCoalescer
+
+    positions = ["PG", "SG", "SF", "PF", "C"]
+    requests = [
+        LineupRequest(list(range(1 + i % 16, 61 + i % 16)), positions, ["balanced"])
+        for i in range(4000)
+    ]
+
+    def run(submit, threads: int) -> float:
+        chunks = [requests[i::threads] for i in range(threads)]
+        workers = [
+            threading.Thread(target=lambda chunk=chunk: [submit(req) for req in chunk])
+            for chunk in chunks
+        ]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return len(requests) / (time.perf_counter() - start)
+
+    direct = lambda req: predict_lineups_batch([req])[0]
+    coalescer = RequestCoalescer(predict_lineups_batch, window_ms=2.0)
+    print(f"  32 threads, direct:    {run(direct, 32):8.0f} req/s")
+    print(f"  32 threads, coalesced: {run(coalescer.submit, 32):8.0f} req/s {coalescer.stats()}")
+
+    for label, submit in (("direct", direct), ("coalesced", RequestCoalescer(predict_lineups_batch).submit)):
+        timings = []
+        for req in requests[:500]:
+            t0 = time.perf_counter()
+            submit(req)
+            timings.append(time.perf_counter() - t0)
+        report_latencies(f"single client, {label}", timings)
+
+
+@benchmark("settlement")
+def bench_settlement():
+    """Bulk contest settlement: gather-sum totals and top-3 selection"""
+    from settlement_scorer import lineup_totals, rank_winners, synthetic_contest
+
+    for n_entries in (100_000, 1_000_000, 5_000_000):
+        points, lineups = synthetic_contest(n_entries)
+        t0 = time.perf_counter()
+        totals = lineup_totals(points, lineups)
+        t1 = time.perf_counter()
+        rank_winners(totals, 1000.0)
+        t2 = time.perf_counter()
+        print(
+            f"  {n_entries:>9,} entries: totals {(t1 - t0) * 1000:7.1f}ms, "
+            f"winners {(t2 - t1) * 1000:6.1f}ms ({n_entries / (t2 - t0) / 1e6:.1f}M entries/s)"
+        )
+
+
+@benchmark("replacements")
+def bench_replacements():
+    """Same-position substitute queries under a value cap"""
+    from replacement_index import ReplacementIndex, slate_features
+    from slate_generator import generate_slate
+
+    rng = np.random.default_rng(5)
+    for n_players in (500, 10_000, 100_000, 1_000_000):
+        slate = generate_slate(n_players=n_players)
+        start = time.perf_counter()
+        index = ReplacementIndex.from_slate(slate)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        features = slate_features(slate)
+        timings = []
+        for row in rng.integers(0, n_players, size=500):
+            t0 = time.perf_counter()
+            index.query(
+                features[row], int(slate.position[row]), k=3,
+                max_value=float(slate.market_value[row]), exclude=[int(slate.player_id[row])]
+            )
+            timings.append(time.perf_counter() - t0)
+        report_latencies(f"{n_players:>9,} players (build {build_ms:.1f}ms)", timings)
+
+
+@benchmark("admission")
+def bench_admission():
+    """Latency of well-behaved sessions while one session floods the upstream slots"""
+    import threading
+
+    from admission import AdmissionController, Overloaded
+
+    def run(abusive_threads: int):
+        controller = AdmissionController(concurrency=2, session_rate=1000, session_burst=1000)
+        timings = []
+        rejected = 0
+        deadline = time.monotonic() + 2.0
+
+        def client(session_id: str, think_s: float, record: bool):
+            nonlocal rejected
+            while time.monotonic() < deadline:
+                t0 = time.perf_counter()
+                try:
+                    with controller.slot(session_id):
+                        time.sleep(0.01)  # stand-in for the model call
+                    if record:
+                        timings.append(time.perf_counter() - t0)
+                except Overloaded:
+                    rejected += not record
+                    time.sleep(0.001)
+                time.sleep(think_s)
+
+        threads = [threading.Thread(target=client, args=("abuser", 0.0, False)) for _ in range(abusive_threads)]
+        threads += [threading.Thread(target=client, args=(f"user-{i}", 0.1, True)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        report_latencies(f"well-behaved, {abusive_threads:>2} abusive threads ({rejected} rejected)", timings)
+
+    run(0)
+    run(20)
+
+
+@benchmark("model-router")
+def bench_model_router():
+    """Deadline misses with every request on the top tier vs. routed across tiers, against simulated tier latencies"""
+    import threading
+
+    from model_router import ModelRouter, ModelTier
+    from model_transport import ReplayTransport
+
+    # Tier latencies scaled down 20x from production so the run takes seconds
+    tiers = [
+        ModelTier("fast", "gemini-1.5-flash-8b", 8_000, expected_latency_s=0.04, max_in_flight=32),
+        ModelTier("standard", "gemini-1.5-flash", 32_000, expected_latency_s=0.075, max_in_flight=16),
+        ModelTier("pro", "gemini-pro", 120_000, expected_latency_s=0.2, max_in_flight=4),
+    ]
+    model_latency = {
+        "gemini-1.5-flash-8b": "lognormal:25,0.3",
+        "gemini-1.5-flash": "lognormal:60,0.3",
+        "gemini-pro": "lognormal:150,0.5",
+    }
+    deadline_s = 0.3
+    prompt = "Suggest a balanced lineup. " * 80
+
+    def run(routing: bool):
+        router = ModelRouter(ReplayTransport(model_latency=model_latency), tiers, routing=routing)
+        timings = []
+        stop = time.monotonic() + 2.0
+
+        def client():
+            while time.monotonic() < stop:
+                t0 = time.perf_counter()
+                route = router.route(len(prompt), "lineup", deadline_s=deadline_s)
+                with router.track(route.tier):
+                    router.model(route.tier).generate_content(prompt)
+                timings.append(time.perf_counter() - t0)
+
+        threads = [threading.Thread(target=client) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        missed = np.mean(np.asarray(timings) > deadline_s)
+        mix = ", ".join(f"{name} {tier['routed']}" for name, tier in router.stats()["tiers"].items())
+        print(f"  routing {'on ' if routing else 'off'}  {len(timings)} requests, {missed:.1%} over the deadline ({mix})")
+        report_latencies("latency", timings)
+
+    run(False)
+    run(True)
+
+
+@benchmark("frontier")
+def bench_frontier():
+    """Full risk/reward frontier solve vs. pool size"""
+    from frontier import efficient_frontier, player_moments
+    from slate_generator import POSITIONS, generate_slate
+
+    for n in (200, 1_000, 5_000):
+        slate = generate_slate(n_players=n)
+        mean, variance = player_moments(slate.recent_performance, slate.consistency, slate.injury_risk)
+        groups = np.asarray(POSITIONS)[slate.position]
+        slots = dict.fromkeys(POSITIONS, 2)
+        samples = []
+        for _ in range(5):
+            t0 = time.perf_counter()
+            frontier = efficient_frontier(slate.player_id, mean, variance, groups, slots)
+            samples.append(time.perf_counter() - t0)
+        report_latencies(f"{n:>6,} players, {len(frontier):>3} frontier points", samples)
+
+
+@benchmark("ownership")
+def bench_ownership():
+    """Incremental field ownership over 500k entries, then uniqueness queries"""
+    from ownership import FieldOwnership
+
+    rng = np.random.default_rng(0)
+    field = FieldOwnership()
+    batches = [rng.integers(1, 500, size=(50_000, 9)) for _ in range(10)]
+    t0 = time.perf_counter()
+    for batch in batches:
+        field.ingest(batch)
+    elapsed = time.perf_counter() - t0
+    print(f"  ingest {field.entries:,} entries: {elapsed:.2f}s ({field.entries / elapsed:,.0f} entries/s), {field.stats()['pairs']:,} pairs")
+
+    lineups = rng.integers(1, 500, size=(1_000, 9))
+    samples = []
+    for _ in range(20):
+        t0 = time.perf_counter()
+        field.uniqueness(lineups)
+        samples.append(time.perf_counter() - t0)
+    report_latencies("uniqueness of 1,000 lineups", samples)
+
+
+@benchmark("tracing")
+def bench_tracing():
+    """Per-span overhead of a three-stage request at different sample ratios"""
+    import tempfile
+
+    from tracing import FileSpanExporter, Tracer
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for ratio in (0.0, 0.1, 1.0):
+            tracer = Tracer("bench", sample_ratio=ratio, exporter=FileSpanExporter(os.path.join(tmp, "spans.jsonl")))
+            n = 20_000
+            t0 = time.perf_counter()
+            for _ in range(n):
+                with tracer.span("request", kind="server"):
+                    for stage in ("stats.fetch", "admission", "model"):
+                        with tracer.span(stage):
+                            pass
+            tracer.exporter.flush()
+            per_span_us = (time.perf_counter() - t0) / (n * 4) * 1e6
+            print(f"  sample ratio {ratio:<4}  {per_span_us:6.2f} us/span  ({tracer.exporter.exported} exported)")
+
+
+def import_time_breakdown(module: str, top: int = 8):
+    """Import a module in a fresh interpreter under -X importtime and print the slowest imports"""
+    env = dict(os.environ, GEMINI_API_KEY="")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True
+    )
+
+    # Children are reported before their parent, so collect the direct imports
+    # seen since the previous top-level module finished.
+    children, total_us = [], None
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative_us), name.strip()))
+        elif depth == 0:
+            if name.strip() == module:
+                total_us = int(cumulative_us)
+                break
+            children = []
+
+    if total_us is None:
+        print(f"  ❌ import {module} failed")
+        return
+
+    print(f"  import {module}: {total_us / 1000:.1f}ms cumulative")
+    for cumulative_us, name in sorted(children, reverse=True)[:top]:
+        print(f"    {cumulative_us / 1000:8.1f}ms  {name}")
+
+
+@benchmark("import-time")
+def bench_import_time():
+    """Cold-start import cost of both services, measured with -X importtime"""
+    import_time_breakdown("app")
+    import_time_breakdown("gemini_app")
+
+    for label, module in (("app", "app"), ("gemini_app", "gemini_app")):
+        env = dict(os.environ, GEMINI_API_KEY="bench-key")
+        completed = subprocess.run(
+            [
+                sys.executable, "-c",
+                f"import time; t = time.perf_counter(); import {module}; "
+                f"{module}.warm_up(); print(time.perf_counter() - t)"
+            ],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env,
+            capture_output=True,
+            text=True
+        )
+        if completed.returncode == 0:
+            print(f"  {label} import + warm_up(): {float(completed.stdout.split()[-1]) * 1000:.1f}ms")
+
+
+def main(argv) -> int:
+    selected = argv or list(BENCHMARKS)
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        print(f"❌ Unknown benchmark(s): {', '.join(unknown)}")
+        print(f"Available: {', '.join(BENCHMARKS)}")
+        return 1
+
+    print("⏱️  Flow Fantasy Fusion - AI Benchmark Suite")
+    print("=" * 50)
+    for name in selected:
+        print(f"\n▶ {name}")
+        BENCHMARKS[name]()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
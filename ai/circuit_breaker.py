@@ -0,0 +1,241 @@
+"""
+Circuit Breaker for Upstream Model Calls
+Stops calling Gemini while it is failing or slow, and probes it back in
+
+Outcomes are counted in a rolling window of time buckets. The breaker opens when,
+over at least `min_calls` calls in the window, the error rate reaches
+`error_rate` or the share of calls slower than `slow_call_s` reaches `slow_rate`.
+While open every call fails fast with CircuitOpen, so callers go straight to
+their local fallback. After `cooldown_s` the breaker goes half-open and lets
+`half_open_probes` calls through: a healthy probe closes it, a failed or slow
+one opens it for another cooldown.
+
+Every state change starts a new generation, and each call is tagged with the
+generation it was allowed under. A result from an older generation, such as a
+call that started before the breaker opened and finished while it was
+half-open, is ignored, so only the probes decide whether the breaker closes.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+# Well inside the lineup deadline (LINEUP_DEADLINE_S, 8s) and the gateway's 10s
+# timeout, so a Gemini that slows down trips the breaker before requests time out
+DEFAULT_SLOW_CALL_S = 2.5
+
+
+class CircuitOpen(Exception):
+    """Call rejected without reaching upstream"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit '{name}' is open; retry in {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Rolling-window error-rate and latency breaker
+
+    Args:
+        name: Label for errors and stats
+        window_s: Length of the rolling window
+        buckets: Number of time buckets the window is split into
+        min_calls: Calls needed in the window before it can open
+        error_rate: Failure share that opens the breaker
+        slow_call_s: Calls at least this slow count as slow
+        slow_rate: Slow-call share that opens the breaker
+        cooldown_s: Time spent open before probing
+        half_open_probes: Concurrent trial calls while half-open
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_s: float = 30.0,
+        buckets: int = 10,
+        min_calls: int = 10,
+        error_rate: float = 0.5,
+        slow_call_s: float = DEFAULT_SLOW_CALL_S,
+        slow_rate: float = 0.8,
+        cooldown_s: float = 30.0,
+        half_open_probes: int = 1
+    ):
+        self.name = name
+        self.bucket_s = window_s / buckets
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_s = slow_call_s
+        self.slow_rate = slow_rate
+        self.cooldown_s = cooldown_s
+        self.half_open_probes = half_open_probes
+
+        # Per bucket: [bucket number, calls, failures, slow calls]
+        self._buckets = [[-1, 0, 0, 0] for _ in range(buckets)]
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._generation = 0
+
+        self.rejected = 0
+        self.trips = 0
+        self.stale_results = 0
+
+    def _bucket(self, now: float):
+        number = int(now / self.bucket_s)
+        bucket = self._buckets[number % len(self._buckets)]
+        if bucket[0] != number:
+            bucket[:] = [number, 0, 0, 0]
+        return bucket
+
+    def _window(self, now: float):
+        oldest = int(now / self.bucket_s) - len(self._buckets) + 1
+        calls = failures = slow = 0
+        for number, bucket_calls, bucket_failures, bucket_slow in self._buckets:
+            if number >= oldest:
+                calls += bucket_calls
+                failures += bucket_failures
+                slow += bucket_slow
+        return calls, failures, slow
+
+    def _transition(self, state: str):
+        self._state = state
+        self._probes = 0
+        self._generation += 1
+
+    def _open(self, now: float):
+        self._transition(OPEN)
+        self._opened_at = now
+        self.trips += 1
+
+    @property
+    def state(self) -> str:
+        """Current state; an open breaker past its cooldown reports half-open"""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_s:
+                return HALF_OPEN
+            return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls would be rejected (does not use up a half-open probe)"""
+        with self._lock:
+            if self._state == OPEN:
+                return time.monotonic() - self._opened_at < self.cooldown_s
+            return self._state == HALF_OPEN and self._probes >= self.half_open_probes
+
+    def allow(self) -> Optional[int]:
+        """
+        Reserve a call; every allowed call must be followed by record()
+
+        Returns:
+            The generation to pass to record(), or None if the call is rejected
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._state == OPEN and now - self._opened_at >= self.cooldown_s:
+                self._transition(HALF_OPEN)
+            if self._state == CLOSED:
+                return self._generation
+            if self._state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return self._generation
+            self.rejected += 1
+            return None
+
+    def record(self, success: bool, latency_s: float, generation: int):
+        """Report the outcome of a call allowed under `generation`; stale results are ignored"""
+        slow = latency_s >= self.slow_call_s
+        with self._lock:
+            now = time.monotonic()
+            if generation != self._generation:
+                self.stale_results += 1
+                return
+            if self._state == HALF_OPEN:
+                if success and not slow:
+                    self._transition(CLOSED)
+                    for bucket in self._buckets:
+                        bucket[:] = [-1, 0, 0, 0]
+                else:
+                    self._open(now)
+                return
+
+            bucket = self._bucket(now)
+            bucket[1] += 1
+            bucket[2] += not success
+            bucket[3] += slow
+
+            calls, failures, slow_calls = self._window(now)
+            if calls >= self.min_calls and (
+                failures >= self.error_rate * calls or slow_calls >= self.slow_rate * calls
+            ):
+                self._open(now)
+
+    def _retry_in(self) -> float:
+        return max(self.cooldown_s - (time.monotonic() - self._opened_at), 0.0)
+
+    @contextmanager
+    def guard(self):
+        """
+        Run the enclosed upstream call under the breaker
+
+        Raises:
+            CircuitOpen: Without running the block, while the breaker is open
+        """
+        generation = self.allow()
+        if generation is None:
+            raise CircuitOpen(self.name, self._retry_in())
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException:
+            self.record(False, time.monotonic() - start, generation)
+            raise
+        self.record(True, time.monotonic() - start, generation)
+
+    def stats(self) -> Dict:
+        state = self.state
+        with self._lock:
+            calls, failures, slow = self._window(time.monotonic())
+            return {
+                'state': state,
+                'window_calls': calls,
+                'window_failures': failures,
+                'window_slow': slow,
+                'trips': self.trips,
+                'rejected': self.rejected,
+                'stale_results': self.stale_results,
+                'slow_call_s': self.slow_call_s,
+                'retry_in_s': round(self._retry_in(), 1) if state == OPEN else 0.0
+            }
+
+
+def breaker_from_env(name: str, prefix: str = 'GEMINI_BREAKER', **defaults) -> CircuitBreaker:
+    """
+    Build a breaker from environment variables, e.g. GEMINI_BREAKER_WINDOW_S,
+    GEMINI_BREAKER_MIN_CALLS, GEMINI_BREAKER_ERROR_RATE, GEMINI_BREAKER_SLOW_CALL_S,
+    GEMINI_BREAKER_SLOW_RATE, GEMINI_BREAKER_COOLDOWN_S, GEMINI_BREAKER_HALF_OPEN_PROBES;
+    `defaults` apply where the environment sets nothing
+    """
+    settings = {
+        'window_s': float,
+        'min_calls': int,
+        'error_rate': float,
+        'slow_call_s': float,
+        'slow_rate': float,
+        'cooldown_s': float,
+        'half_open_probes': int,
+    }
+    kwargs = dict(defaults)
+    for setting, cast in settings.items():
+        value = os.environ.get(f"{prefix}_{setting.upper()}")
+        if value is not None:
+            kwargs[setting] = cast(value)
+    return CircuitBreaker(name, **kwargs)
@@ -0,0 +1,437 @@
+"""
+Game-log Feature Store
+Append-only columnar box scores with per-player rolling aggregates kept incrementally
+
+Box scores are appended in batches (segments). Each batch updates per-player
+exponentially weighted moments in place. Nothing is recomputed over a player's
+full history, so ingest costs O(batch rows) and a pool's PlayerStats are a
+gather over state arrays:
+
+- recent_performance: EWMA of fantasy points, on the 0-100 scale
+- consistency: 1 - EW standard deviation / EWMA (one minus the EW coefficient of variation)
+- trending: slope of an EW least-squares fit of fantasy points against game
+  order, relative to the EWMA
+- injury_risk: EW share of games the player did not play
+
+Weights halve every `half_life_games` games. The fit is kept as decayed sums
+over each game's age (games since the player's latest), so a batch of k new games
+shifts old ages by k in closed form. Within a batch, rows are vectorized by
+their rank within the player's run, so one batch of any size is a handful of
+NumPy passes.
+
+With a directory, every batch is also written as an .npz segment, published
+atomically (temp file + os.replace). Readers in other processes apply new
+segments on refresh(). One process appends; any number can read. A player's
+games must arrive in time order: a batch with a game older than that player's
+latest raises ValueError.
+
+Usage:
+    python feature_store.py generate --players 100000 --games 20 --out games.npz
+    python feature_store.py ingest --logs games.npz --dir gamelogs
+    python feature_store.py info --dir gamelogs
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from slate_generator import DEFAULT_SEED, PlayerSlate, counter_uniforms, generate_slate
+
+# Box score columns and their stored dtypes; game_time orders a player's games
+BOX_SCORE_COLUMNS: Dict[str, str] = {
+    'player_id': '<i8',
+    'game_time': '<i8',
+    'minutes': '<f4',
+    'points': '<i2',
+    'rebounds': '<i2',
+    'assists': '<i2',
+    'steals': '<i2',
+    'blocks': '<i2',
+    'turnovers': '<i2',
+}
+
+# Fantasy points per box score stat
+FANTASY_WEIGHTS = {
+    'points': 1.0,
+    'rebounds': 1.25,
+    'assists': 1.5,
+    'steals': 2.0,
+    'blocks': 2.0,
+    'turnovers': -0.5,
+}
+
+# Fantasy points per game that maps to a recent_performance of 100
+PERFORMANCE_SCALE = 60.0
+
+HALF_LIFE_GAMES = 5.0
+
+# Relative slope (share of the EWMA per game) beyond which a player is trending
+TREND_THRESHOLD = 0.02
+
+# Games played before consistency and trend are derived rather than taken from the base slate
+MIN_GAMES_CONSISTENCY = 2
+MIN_GAMES_TREND = 3
+
+# Decayed sums per player over played games: weight, age, age^2, y, y^2, age*y
+_W, _A, _AA, _Y, _YY, _AY = range(6)
+
+_SEGMENT_RE = re.compile(r'^segment-(\d{8})\.npz$')
+
+
+def fantasy_points(logs: Mapping[str, np.ndarray]) -> np.ndarray:
+    """Fantasy points per box score row"""
+    return sum(weight * np.asarray(logs[stat], dtype=np.float64) for stat, weight in FANTASY_WEIGHTS.items())
+
+
+def _runs(dense: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Runs of equal player indexes in rows sorted by (player, time)
+
+    Returns:
+        Tuple of (run starts, run lengths, age of each row: games after it in its run)
+    """
+    starts = np.flatnonzero(np.r_[True, dense[1:] != dense[:-1]]) if len(dense) else np.empty(0, dtype=np.int64)
+    counts = np.diff(np.r_[starts, len(dense)])
+    age = np.repeat(starts + counts, counts) - 1 - np.arange(len(dense))
+    return starts, counts, age
+
+
+def synthetic_game_logs(
+    player_ids: Sequence[int],
+    games: int,
+    first_game: int = 0,
+    seed: int = DEFAULT_SEED
+) -> Dict[str, np.ndarray]:
+    """
+    Deterministic box scores for every player in games first_game..first_game + games - 1
+
+    Each player's fantasy output centres on its generated slate stats (see
+    slate_generator): mean from recent_performance, spread from consistency,
+    and missed games from injury_risk. Rows are ordered by game, then player.
+    """
+    ids = np.asarray(player_ids, dtype=np.int64)
+    slate = generate_slate(ids, seed=seed)
+    n = len(ids)
+    game = np.repeat(np.arange(first_game, first_game + games, dtype=np.int64), n)
+    player = np.tile(ids, games)
+    rows = np.tile(np.arange(n), games)
+    key = player * 1_000_003 + game
+
+    u_play, u_noise, u_minutes = (counter_uniforms(key, stream, seed) for stream in (11, 12, 13))
+    played = u_play >= slate.injury_risk[rows] * 0.5
+    mean = slate.recent_performance[rows] / 100.0 * PERFORMANCE_SCALE
+    spread = mean * (1.0 - slate.consistency[rows])
+    fp = np.where(played, np.maximum(mean + spread * (u_noise * 2.0 - 1.0) * 1.7, 0.0), 0.0)
+
+    # Split fantasy points into box score stats by fixed shares
+    shares = {'points': 0.55, 'rebounds': 0.2, 'assists': 0.17, 'steals': 0.04, 'blocks': 0.04}
+    logs = {'player_id': player, 'game_time': game,
+            'minutes': np.where(played, 18.0 + u_minutes * 20.0, 0.0).astype(np.float32)}
+    for stat, share in shares.items():
+        logs[stat] = np.round(fp * share / FANTASY_WEIGHTS[stat]).astype(np.int16)
+    logs['turnovers'] = np.round(fp * 0.05).astype(np.int16)
+    return logs
+
+
+class GameLogStore:
+    """
+    Incremental per-player aggregates over appended box scores
+
+    Args:
+        directory: Segment directory; None keeps the store in memory only
+        half_life_games: Games after which a game's weight has halved
+        check_interval: Seconds between directory scans for new segments
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        half_life_games: float = HALF_LIFE_GAMES,
+        check_interval: float = 1.0
+    ):
+        self.directory = directory
+        self.half_life_games = half_life_games
+        self.decay = 0.5 ** (1.0 / half_life_games)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = float('-inf')
+        self.segments = 0
+        self.rows = 0
+
+        self._player_ids = np.empty(0, dtype=np.int64)
+        self._sorted_ids = np.empty(0, dtype=np.int64)
+        self._sorted_dense = np.empty(0, dtype=np.int64)
+        self._moments = np.zeros((0, 6))
+        self._availability = np.zeros((0, 2))  # Decayed sums over all games: weight, missed
+        self._played = np.zeros(0, dtype=np.int64)
+        self._last_time = np.zeros(0, dtype=np.int64)
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.refresh(force=True)
+
+    @property
+    def version(self) -> str:
+        """Changes whenever a segment is applied"""
+        self.refresh()
+        return f"logs-{self.segments}-{self.rows}"
+
+    def _lookup(self, player_ids: np.ndarray) -> np.ndarray:
+        """Dense indexes for player IDs, -1 where unknown"""
+        if not len(self._sorted_ids):
+            return np.full(player_ids.shape, -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self._sorted_ids, player_ids), len(self._sorted_ids) - 1)
+        return np.where(self._sorted_ids[positions] == player_ids, self._sorted_dense[positions], -1)
+
+    def _dense(self, player_ids: np.ndarray) -> np.ndarray:
+        """Dense indexes, registering new players"""
+        dense = self._lookup(player_ids)
+        new_ids = np.unique(player_ids[dense < 0])
+        if len(new_ids):
+            grow = len(new_ids)
+            self._player_ids = np.concatenate([self._player_ids, new_ids])
+            self._moments = np.concatenate([self._moments, np.zeros((grow, 6))])
+            self._availability = np.concatenate([self._availability, np.zeros((grow, 2))])
+            self._played = np.concatenate([self._played, np.zeros(grow, dtype=np.int64)])
+            self._last_time = np.concatenate([self._last_time, np.full(grow, np.iinfo(np.int64).min)])
+            order = np.argsort(self._player_ids, kind='stable')
+            self._sorted_ids, self._sorted_dense = self._player_ids[order], order
+            dense = self._lookup(player_ids)
+        return dense
+
+    @staticmethod
+    def _validate(logs: Mapping[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        missing = [name for name in BOX_SCORE_COLUMNS if name not in logs]
+        if missing:
+            raise ValueError(f"Game logs missing columns: {', '.join(missing)}")
+        columns = {name: np.asarray(logs[name]).astype(dtype, copy=False) for name, dtype in BOX_SCORE_COLUMNS.items()}
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) != 1 or any(column.ndim != 1 for column in columns.values()):
+            raise ValueError("Game log columns must be 1-D arrays of equal length")
+        return columns
+
+    def append(self, logs: Mapping[str, np.ndarray]) -> int:
+        """
+        Append a batch of box scores and update the aggregates
+
+        Args:
+            logs: Column name -> array for every BOX_SCORE_COLUMNS entry
+
+        Returns:
+            Rows appended
+
+        Raises:
+            ValueError: On missing or ragged columns, or a game older than the player's latest
+        """
+        columns = self._validate(logs)
+        if not len(columns['player_id']):
+            return 0
+        with self._lock:
+            if self.directory:
+                self._apply_new_segments()
+            self._apply(columns)
+            if self.directory:
+                self._write_segment(columns)
+            self.segments += 1
+            self.rows += len(columns['player_id'])
+        return len(columns['player_id'])
+
+    def _apply(self, columns: Dict[str, np.ndarray]):
+        dense = self._dense(columns['player_id'])
+        order = np.lexsort((columns['game_time'], dense))
+        dense = dense[order]
+        game_time = columns['game_time'][order]
+        played = columns['minutes'][order] > 0
+        fp = fantasy_points({stat: columns[stat][order] for stat in FANTASY_WEIGHTS})
+
+        starts, counts, age = _runs(dense)
+        players = dense[starts]
+        if (game_time[starts] < self._last_time[players]).any():
+            raise ValueError("Game logs must arrive in time order per player")
+
+        # Availability over every game
+        weight = self.decay ** age
+        shift = self.decay ** counts
+        self._availability[players] = self._availability[players] * shift[:, None] + np.column_stack([
+            np.add.reduceat(weight, starts),
+            np.add.reduceat(weight * ~played, starts)
+        ])
+        self._last_time[players] = game_time[starts + counts - 1]
+
+        # Moments over played games, with ages counted among played games only
+        dense, fp = dense[played], fp[played]
+        if not len(dense):
+            return
+        starts, counts, age = _runs(dense)
+        players = dense[starts]
+        k = counts.astype(np.float64)
+        shift = self.decay ** k
+        weight = self.decay ** age
+
+        old = self._moments[players]
+        new = np.empty_like(old)
+        # Old games age by k: sums over (age + k) expand in terms of the old sums
+        new[:, _W] = old[:, _W]
+        new[:, _A] = old[:, _A] + k * old[:, _W]
+        new[:, _AA] = old[:, _AA] + 2.0 * k * old[:, _A] + k * k * old[:, _W]
+        new[:, _Y] = old[:, _Y]
+        new[:, _YY] = old[:, _YY]
+        new[:, _AY] = old[:, _AY] + k * old[:, _Y]
+        new *= shift[:, None]
+        new += np.column_stack([
+            np.add.reduceat(weight, starts),
+            np.add.reduceat(weight * age, starts),
+            np.add.reduceat(weight * age * age, starts),
+            np.add.reduceat(weight * fp, starts),
+            np.add.reduceat(weight * fp * fp, starts),
+            np.add.reduceat(weight * age * fp, starts)
+        ])
+        self._moments[players] = new
+        self._played[players] += counts
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"segment-{number:08d}.npz")
+
+    def _write_segment(self, columns: Dict[str, np.ndarray]):
+        """Publish a batch atomically as the next segment"""
+        fd, tmp_path = tempfile.mkstemp(prefix='.segment-', suffix='.npz', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **columns)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self._segment_path(self.segments + 1))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _apply_new_segments(self):
+        numbers = sorted(
+            int(match.group(1)) for match in map(_SEGMENT_RE.match, os.listdir(self.directory)) if match
+        )
+        for number in numbers:
+            if number <= self.segments:
+                continue
+            if number != self.segments + 1:
+                raise ValueError(f"Segment {number} follows {self.segments} in {self.directory}")
+            with np.load(self._segment_path(number)) as data:
+                columns = self._validate({name: data[name] for name in data.files})
+            self._apply(columns)
+            self.segments = number
+            self.rows += len(columns['player_id'])
+
+    def refresh(self, force: bool = False):
+        """Apply segments other processes have published (at most every check_interval seconds)"""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            self._apply_new_segments()
+
+    def materialize(self, player_ids: Sequence[int], base: Optional[PlayerSlate] = None) -> PlayerSlate:
+        """
+        Derived stats for a pool, in one vectorized read
+
+        Players without enough games keep the base slate's values for the
+        affected fields, as do market_value and position, which box scores
+        don't carry.
+
+        Args:
+            player_ids: Pool to materialize
+            base: Stats to start from, row-aligned with player_ids; generated
+                stats (slate_generator) by default
+        """
+        self.refresh()
+        ids = np.asarray(player_ids, dtype=np.int64)
+        slate = base if base is not None else generate_slate(ids)
+        slate = PlayerSlate(**{name: np.array(getattr(slate, name)) for name in slate.__dataclass_fields__})
+
+        with self._lock:
+            dense = self._lookup(ids)
+            known = np.flatnonzero(dense >= 0)
+            rows = dense[known]
+            moments = self._moments[rows]
+            availability = self._availability[rows]
+            played = self._played[rows]
+
+        weight = np.maximum(moments[:, _W], 1e-300)
+        mean = moments[:, _Y] / weight
+        std = np.sqrt(np.maximum(moments[:, _YY] / weight - mean ** 2, 0.0))
+        age_mean = moments[:, _A] / weight
+        age_var = moments[:, _AA] / weight - age_mean ** 2
+        covariance = moments[:, _AY] / weight - age_mean * mean
+        # Slope per game against time is the negative of the slope against age
+        slope = np.divide(-covariance, age_var, out=np.zeros_like(mean), where=age_var > 1e-12)
+
+        has_games = played >= 1
+        rated = known[has_games]
+        slate.recent_performance[rated] = np.clip(mean[has_games] / PERFORMANCE_SCALE * 100.0, 0.0, 100.0)
+
+        steady = played >= MIN_GAMES_CONSISTENCY
+        slate.consistency[known[steady]] = np.clip(
+            1.0 - std[steady] / np.maximum(mean[steady], 1e-9), 0.0, 1.0
+        )
+
+        trended = played >= MIN_GAMES_TREND
+        relative = slope[trended] / np.maximum(mean[trended], 1.0)
+        slate.trending[known[trended]] = np.where(
+            relative > TREND_THRESHOLD, 2, np.where(relative < -TREND_THRESHOLD, 0, 1)
+        ).astype(np.int8)
+
+        slate.injury_risk[known] = np.clip(availability[:, 1] / np.maximum(availability[:, 0], 1e-300), 0.0, 1.0)
+        return slate
+
+    def stats(self) -> Dict:
+        return {
+            'directory': self.directory,
+            'segments': self.segments,
+            'rows': self.rows,
+            'players': len(self._player_ids),
+            'half_life_games': self.half_life_games
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Game-log feature store")
+    commands = parser.add_subparsers(dest='command', required=True)
+    generate = commands.add_parser('generate', help="Write synthetic box scores")
+    generate.add_argument('--players', type=int, default=100000, help="Players (IDs 1..N)")
+    generate.add_argument('--games', type=int, default=20)
+    generate.add_argument('--first-game', type=int, default=0)
+    generate.add_argument('--out', default='games.npz')
+    ingest = commands.add_parser('ingest', help="Append box scores as a new segment")
+    ingest.add_argument('--logs', required=True, help=".npz with the box score columns")
+    ingest.add_argument('--dir', default=os.environ.get('FEATURE_STORE_DIR', 'gamelogs'))
+    info = commands.add_parser('info', help="Summarize a segment directory")
+    info.add_argument('--dir', default=os.environ.get('FEATURE_STORE_DIR', 'gamelogs'))
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        logs = synthetic_game_logs(np.arange(1, args.players + 1), args.games, args.first_game)
+        np.savez(args.out, **logs)
+        print(f"✅ Wrote {len(logs['player_id']):,} box scores to {args.out}")
+        return
+
+    start = time.perf_counter()
+    store = GameLogStore(args.dir)
+    if args.command == 'ingest':
+        with np.load(args.logs) as data:
+            rows = store.append({name: data[name] for name in data.files})
+        print(f"✅ Appended {rows:,} box scores as segment {store.segments} in {time.perf_counter() - start:.2f}s")
+    else:
+        print(f"{store.stats()} (loaded in {time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""
+Risk/Reward Efficient Frontier
+Every lineup that trades expected score against variance optimally, from one parametric solve
+
+Each player has an expected score and a variance. Volatility comes from low
+consistency, and a blow-up term comes from injury risk (the player may not play
+at all). With players independent, a lineup's mean and variance are both sums,
+so maximizing mean - lambda * variance is separable. For a fixed lambda the best
+lineup is the top-k players of each position group by a_i - lambda * b_i.
+
+As lambda sweeps from 0 (pure expected score) to infinity (minimum variance),
+each player's key is a line and a group's top-k set only changes where a member's
+line crosses a non-member's. The solve prunes players that at least k others
+dominate (never selected for any lambda) and sorts the remaining pairwise
+crossings. It then sweeps them once, swapping members at each crossing (a
+kinetic top-k), and the swaps of all groups are merged into a single frontier.
+This yields every supported (convex-hull) Pareto-efficient lineup. Each point
+stores its lineup, mean and variance, so a client can pick any point by index
+in O(1).
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Standard deviation of a fully inconsistent player's score, as a share of its mean
+VOLATILITY = 0.5
+
+
+def player_moments(
+    expected: np.ndarray,
+    consistency: np.ndarray,
+    injury_risk: Optional[np.ndarray] = None,
+    volatility: float = VOLATILITY
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-player (mean, variance) of fantasy score
+
+    A player who plays scores around `expected` with standard deviation
+    expected * (1 - consistency) * volatility. With probability injury_risk
+    they do not play, which adds p(1 - p) * expected^2 of variance. The mean is
+    left as given, since lineup scores already discount injury risk.
+    """
+    expected = np.asarray(expected, dtype=np.float64)
+    spread = expected * (1.0 - np.asarray(consistency, dtype=np.float64)) * volatility
+    if injury_risk is None:
+        return expected, spread ** 2
+    p = np.clip(np.asarray(injury_risk, dtype=np.float64), 0.0, 1.0)
+    return expected, (1.0 - p) * spread ** 2 + p * (1.0 - p) * expected ** 2
+
+
+@dataclass
+class FrontierPoint:
+    lambda_min: float  # Risk aversion range over which this lineup is optimal
+    lambda_max: float
+    player_ids: List[int]
+    mean: float
+    variance: float
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(max(self.variance, 0.0)))
+
+
+class Frontier:
+    """Frontier points from highest expected score (lambda = 0) to lowest variance"""
+
+    def __init__(self, points: List[FrontierPoint]):
+        self.points = points
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def pick(self, risk: float) -> FrontierPoint:
+        """Point for a risk slider position: 1 is the highest-scoring lineup, 0 the safest"""
+        risk = min(max(risk, 0.0), 1.0)
+        return self.points[int(round((1.0 - risk) * (len(self.points) - 1)))]
+
+    def at_lambda(self, risk_aversion: float) -> FrontierPoint:
+        """Lineup maximizing mean - risk_aversion * variance"""
+        starts = [point.lambda_min for point in self.points]
+        return self.points[max(int(np.searchsorted(starts, risk_aversion, side='right')) - 1, 0)]
+
+    def to_dict(self) -> Dict:
+        """Columnar payload: a slider can move along it with no further requests"""
+        return {
+            'count': len(self.points),
+            'lambdaMin': [round(p.lambda_min, 8) for p in self.points],
+            'lambdaMax': [round(p.lambda_max, 8) if np.isfinite(p.lambda_max) else None for p in self.points],
+            'mean': [round(p.mean, 2) for p in self.points],
+            'std': [round(p.std, 2) for p in self.points],
+            'lineups': [p.player_ids for p in self.points]
+        }
+
+
+def _dominance_counts(a: np.ndarray, b: np.ndarray, block: int = 1024) -> np.ndarray:
+    """For each player, how many others are at least as good on mean and variance and better on one"""
+    counts = np.empty(len(a), dtype=np.int64)
+    for start in range(0, len(a), block):
+        ai, bi = a[start:start + block, None], b[start:start + block, None]
+        dominates = (a >= ai) & (b <= bi) & ((a > ai) | (b < bi))
+        counts[start:start + block] = dominates.sum(axis=1)
+    return counts
+
+
+def _group_sweep(a: np.ndarray, b: np.ndarray, k: int) -> Tuple[np.ndarray, List[Tuple[float, int, int]]]:
+    """
+    Kinetic top-k of lines a - lambda * b over lambda >= 0
+
+    Returns:
+        Tuple of (members at lambda = 0, [(lambda, leaving, entering), ...] in lambda order),
+        all as indices into a and b
+    """
+    n = len(a)
+    # Best mean first; equal means go to the lower variance, which leads for lambda > 0
+    order = np.lexsort((b, -a))
+    if n <= k:
+        return order, []
+
+    candidates = np.flatnonzero(_dominance_counts(a, b) < k)
+    ca, cb = a[candidates], b[candidates]
+    i, j = np.triu_indices(len(candidates), 1)
+    slope = cb[i] - cb[j]
+    crossing = np.divide(ca[i] - ca[j], slope, out=np.full(len(i), -1.0), where=slope != 0)
+    keep = crossing > 0
+    i, j, crossing = i[keep], j[keep], crossing[keep]
+    sequence = np.argsort(crossing, kind='stable')
+
+    member = np.zeros(n, dtype=bool)
+    member[order[:k]] = True
+    swaps = []
+    for event in sequence.tolist():
+        x, y = int(candidates[i[event]]), int(candidates[j[event]])
+        # Past the crossing the lower-variance line is ahead
+        high, low = (x, y) if b[x] > b[y] else (y, x)
+        if member[high] and not member[low]:
+            member[high], member[low] = False, True
+            swaps.append((float(crossing[event]), high, low))
+    return order[:k], swaps
+
+
+def efficient_frontier(
+    player_ids: Sequence[int],
+    mean: np.ndarray,
+    variance: np.ndarray,
+    groups: Optional[Sequence] = None,
+    slots: Optional[Dict] = None
+) -> Frontier:
+    """
+    Solve the whole mean-variance frontier
+
+    Args:
+        player_ids: One ID per player
+        mean, variance: Per-player moments (see player_moments)
+        groups: Position group per player; None puts everyone in one group
+        slots: Group -> number of lineup slots (an int when groups is None)
+
+    Raises:
+        ValueError: If a group has fewer players than slots
+    """
+    ids = np.asarray(player_ids, dtype=np.int64)
+    mean = np.asarray(mean, dtype=np.float64)
+    variance = np.asarray(variance, dtype=np.float64)
+    if groups is None:
+        groups = np.zeros(len(ids), dtype=np.int64)
+        slots = {0: int(slots)}
+    groups = np.asarray(groups)
+
+    members: List[int] = []
+    events: List[Tuple[float, int, int]] = []
+    for group, k in slots.items():
+        rows = np.flatnonzero(groups == group)
+        if len(rows) < k:
+            raise ValueError(f"Need {k} players for {group}, pool has {len(rows)}")
+        start, swaps = _group_sweep(mean[rows], variance[rows], k)
+        members.extend(rows[start].tolist())
+        events.extend((lam, int(rows[out]), int(rows[into])) for lam, out, into in swaps)
+    events.sort(key=lambda event: event[0])
+
+    lineup = dict.fromkeys(members)
+    points = []
+    lam_start = 0.0
+    e = 0
+    while True:
+        # Apply every swap at the same lambda together
+        lam_next = events[e][0] if e < len(events) else float('inf')
+        rows = list(lineup)
+        points.append(FrontierPoint(
+            lam_start, lam_next, ids[rows].tolist(), float(mean[rows].sum()), float(variance[rows].sum())
+        ))
+        if e == len(events):
+            return Frontier(points)
+        while e < len(events) and events[e][0] == lam_next:
+            _, out, into = events[e]
+            del lineup[out]
+            lineup[into] = None
+            e += 1
+        lam_start = lam_next
@@ -4,12 +4,26 @@ FastAPI server with Google Gemini integration
 """
 
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Dict, Optional, List
-import uvicorn
+from collections import OrderedDict
+import asyncio
 import os
-from gemini_chat_service import GeminiFantasyAssistant
+import threading
+import gemini_chat_service
+from gemini_chat_service import GeminiFantasyAssistant, response_cache, tracer
+from session_store import create_session_store
+from admission import Overloaded, admission_from_env
+from model_router import shared_router
+from model_transport import shared_transport, transport_mode
+from tracing import instrument_fastapi
+from lineup_subscriptions import LineupSubscriptionHub, SubscriptionKey
+from lineup_engine import (
+    LineupRequest, get_player_slate, live_stats, merged_pool, parse_player_ids,
+    predict_lineups_for_slate, published_stats_version, stats_version
+)
 
 app = FastAPI(title="Flow Fantasy Fusion AI Chat")
 
@@ -20,18 +34,104 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["traceparent"],
 )
 
-# Store active chat sessions
-chat_sessions: Dict[str, GeminiFantasyAssistant] = {}
+# Continue the gateway's W3C trace; sampled spans go to TRACE_EXPORT_PATH
+instrument_fastapi(app, tracer)
+
+# Session state lives in a pluggable store (SESSION_BACKEND=memory|sqlite) so any
+# worker can serve any session; chat_sessions only caches live assistants locally
+session_store = create_session_store()
+chat_sessions: "OrderedDict[str, GeminiFantasyAssistant]" = OrderedDict()
+chat_sessions_lock = threading.Lock()
+LOCAL_SESSION_LIMIT = int(os.getenv("LOCAL_SESSION_LIMIT", "1000"))
 
-# Get Gemini API key from environment
+# Get Gemini API key from environment (not needed with GEMINI_TRANSPORT=replay)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+GEMINI_CONFIGURED = bool(GEMINI_API_KEY) or transport_mode() == "replay"
 
-if not GEMINI_API_KEY:
+if not GEMINI_CONFIGURED:
     print("⚠️  WARNING: GEMINI_API_KEY not set in environment variables")
     print("Please set it using: export GEMINI_API_KEY='your-api-key'")
 
+def get_session(session_id: str) -> GeminiFantasyAssistant:
+    """
+    Get the assistant for a session, rebuilding it from the shared store when
+    another worker has updated the session since this worker last saw it
+    
+    Blocking (store I/O, and a new assistant primes its model chat), so the
+    async handlers call it through load_session().
+    """
+    stored_version = session_store.version(session_id)
+    with chat_sessions_lock:
+        assistant = chat_sessions.get(session_id)
+    
+    if assistant is None or (stored_version is not None and assistant.state_version != stored_version):
+        state = session_store.load(session_id) if stored_version is not None else None
+        assistant = GeminiFantasyAssistant(GEMINI_API_KEY, state=state)
+    
+    with chat_sessions_lock:
+        chat_sessions[session_id] = assistant
+        chat_sessions.move_to_end(session_id)
+        while len(chat_sessions) > LOCAL_SESSION_LIMIT:
+            chat_sessions.popitem(last=False)
+    
+    return assistant
+
+async def load_session(session_id: str) -> GeminiFantasyAssistant:
+    """get_session() in the thread pool, so a cold session never stalls the event loop"""
+    return await run_in_threadpool(get_session, session_id)
+
+def save_session(session_id: str, assistant: GeminiFantasyAssistant):
+    """Write the session's state back to the shared store"""
+    assistant.state_version = session_store.save(assistant.export_state(session_id))
+
+async def store_session(session_id: str, assistant: GeminiFantasyAssistant):
+    """save_session() in the thread pool"""
+    await run_in_threadpool(save_session, session_id, assistant)
+
+# Live lineup subscriptions: in-game stat updates (lineup_engine.live_stats) are
+# layered over the published stats, and subscribers are pushed a new lineup only
+# when theirs changes. Updates posted to other workers arrive through the stats
+# version poll, since stats_version() moves with every shared live update.
+def compute_subscribed_lineups(keys: List[SubscriptionKey]) -> List[Dict]:
+    """Recompute every subscribed (league, pool, positions, strategy) in one batch"""
+    requests = [
+        LineupRequest(list(key.pool), list(key.positions), [key.strategy], key.league_id)
+        for key in keys
+    ]
+    slate = get_player_slate(merged_pool(requests))
+    results = []
+    for key, lineups in zip(keys, predict_lineups_for_slate(requests, slate)):
+        lineup, expected_score, rationale = lineups[key.strategy]
+        results.append({
+            "leagueId": key.league_id,
+            "strategy": key.strategy,
+            "positions": lineup,
+            "expectedScore": round(expected_score, 2),
+            "rationale": rationale
+        })
+    return results
+
+lineup_hub = LineupSubscriptionHub(
+    compute_subscribed_lineups,
+    debounce_ms=float(os.getenv("LINEUP_DEBOUNCE_MS", "250")),
+    version_fn=stats_version
+)
+
+# Gemini-bound chat: per-session/league rate limits and fair queueing across sessions
+admission = admission_from_env()
+
+def league_of(context: Optional[Dict]):
+    """League ID from a chat context's league_info, if any"""
+    league_info = (context or {}).get("league_info")
+    return league_info.get("id") if isinstance(league_info, dict) else None
+
+def warm_up():
+    """Preload the Gemini SDK, e.g. in the gunicorn master before workers fork"""
+    gemini_chat_service.warm_up()
+
 class ChatMessage(BaseModel):
     message: str
     session_id: str = "default"
@@ -42,6 +142,13 @@ class PreferenceUpdate(BaseModel):
     key: str
     value: str
 
+class CacheSetting(BaseModel):
+    session_id: str = "default"
+    enabled: bool
+
+class StatsUpdate(BaseModel):
+    players: List[Dict]
+
 class PlayerQuery(BaseModel):
     player_id: int
     session_id: str = "default"
@@ -52,14 +159,23 @@ async def root():
         "service": "Flow Fantasy Fusion AI Chat",
         "version": "1.0.0",
         "powered_by": "Google Gemini",
-        "status": "active" if GEMINI_API_KEY else "no_api_key"
+        "status": "active" if GEMINI_CONFIGURED else "no_api_key"
     }
 
 @app.get("/health")
 async def health_check():
     return {
         "status": "healthy",
-        "gemini_configured": bool(GEMINI_API_KEY)
+        "gemini_configured": GEMINI_CONFIGURED,
+        "model_transport": shared_transport(GEMINI_API_KEY).stats() if GEMINI_CONFIGURED else None,
+        "model_router": shared_router(GEMINI_API_KEY).stats() if GEMINI_CONFIGURED else None,
+        "session_backend": session_store.backend,
+        "lineup_subscriptions": lineup_hub.stats(),
+        "admission": admission.stats(),
+        "circuit_breaker": gemini_chat_service.model_breaker.stats(),
+        "tracing": tracer.stats(),
+        "worker_pid": os.getpid(),
+        "response_cache": response_cache.stats()
     }
 
 @app.post("/api/chat")
@@ -77,7 +193,7 @@ async def chat(chat_message: ChatMessage):
     }
     """
     try:
-        if not GEMINI_API_KEY:
+        if not GEMINI_CONFIGURED:
             raise HTTPException(
                 status_code=500, 
                 detail="Gemini API key not configured. Please set GEMINI_API_KEY environment variable."
@@ -86,14 +202,20 @@ async def chat(chat_message: ChatMessage):
         session_id = chat_message.session_id
         
         # Get or create chat session
-        if session_id not in chat_sessions:
-            chat_sessions[session_id] = GeminiFantasyAssistant(GEMINI_API_KEY)
+        with tracer.span("session.load"):
+            assistant = await load_session(session_id)
         
         # Get response from AI
-        result = await chat_sessions[session_id].chat(
-            chat_message.message,
-            chat_message.context
-        )
+        with tracer.span("chat.admission"):
+            async with admission.slot_async(session_id, league_of(chat_message.context), 'interactive'):
+                # The model call blocks, so it runs off the event loop
+                result = await run_in_threadpool(
+                    assistant.chat,
+                    chat_message.message,
+                    chat_message.context
+                )
+        with tracer.span("session.save"):
+            await store_session(session_id, assistant)
         
         return {
             "success": True,
@@ -101,6 +223,10 @@ async def chat(chat_message: ChatMessage):
             **result
         }
         
+    except Overloaded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": e.retry_after_header})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -120,13 +246,14 @@ async def update_preferences(pref: PreferenceUpdate):
         session_id = pref.session_id
         
         if session_id not in chat_sessions:
-            if not GEMINI_API_KEY:
+            if not GEMINI_CONFIGURED:
                 raise HTTPException(status_code=500, detail="Gemini API key not configured")
-            chat_sessions[session_id] = GeminiFantasyAssistant(GEMINI_API_KEY)
         
-        success = chat_sessions[session_id].update_preference(pref.key, pref.value)
+        assistant = await load_session(session_id)
+        success = assistant.update_preference(pref.key, pref.value)
         
         if success:
+            await store_session(session_id, assistant)
             return {
                 "success": True,
                 "message": f"Preference '{pref.key}' updated to '{pref.value}'"
@@ -139,6 +266,38 @@ async def update_preferences(pref: PreferenceUpdate):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/cache")
+async def update_cache_setting(setting: CacheSetting):
+    """
+    Opt a session in or out of the semantic response cache
+    
+    Example request:
+    {
+        "session_id": "user123",
+        "enabled": false
+    }
+    """
+    try:
+        session_id = setting.session_id
+        
+        if session_id not in chat_sessions:
+            if not GEMINI_CONFIGURED:
+                raise HTTPException(status_code=500, detail="Gemini API key not configured")
+        
+        assistant = await load_session(session_id)
+        assistant.set_cache_enabled(setting.enabled)
+        await store_session(session_id, assistant)
+        
+        return {
+            "success": True,
+            "message": f"Response cache {'enabled' if setting.enabled else 'disabled'} for session '{session_id}'"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/player-info")
 async def get_player_info(query: PlayerQuery):
     """
@@ -154,11 +313,10 @@ async def get_player_info(query: PlayerQuery):
         session_id = query.session_id
         
         if session_id not in chat_sessions:
-            if not GEMINI_API_KEY:
+            if not GEMINI_CONFIGURED:
                 raise HTTPException(status_code=500, detail="Gemini API key not configured")
-            chat_sessions[session_id] = GeminiFantasyAssistant(GEMINI_API_KEY)
         
-        player = chat_sessions[session_id].get_player_info(query.player_id)
+        player = (await load_session(session_id)).get_player_info(query.player_id)
         
         if player:
             return {
@@ -173,12 +331,39 @@ async def get_player_info(query: PlayerQuery):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/lineup-frontier")
+async def lineup_frontier(session_id: str = "default"):
+    """
+    Every lineup on the expected-score vs. risk frontier, for a client-side risk slider
+    
+    Points run from the highest expected score to the safest lineup; "preferred"
+    indexes the one matching the session's risk appetite.
+    """
+    try:
+        if session_id not in chat_sessions:
+            if not GEMINI_CONFIGURED:
+                raise HTTPException(status_code=500, detail="Gemini API key not configured")
+        
+        assistant = await load_session(session_id)
+        return {
+            "success": True,
+            "session_id": session_id,
+            "frontier": await run_in_threadpool(assistant.lineup_frontier)
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/reset")
 async def reset_conversation(session_id: str = "default"):
     """Reset conversation history for a session"""
     try:
-        if session_id in chat_sessions:
-            chat_sessions[session_id].reset_conversation()
+        if session_id in chat_sessions or await run_in_threadpool(session_store.version, session_id) is not None:
+            assistant = await load_session(session_id)
+            assistant.reset_conversation()
+            await store_session(session_id, assistant)
             return {
                 "success": True,
                 "message": "Conversation reset successfully"
@@ -199,7 +384,7 @@ async def websocket_chat(websocket: WebSocket, session_id: str):
     await websocket.accept()
     
     try:
-        if not GEMINI_API_KEY:
+        if not GEMINI_CONFIGURED:
             await websocket.send_json({
                 "error": "Gemini API key not configured"
             })
@@ -207,8 +392,7 @@ async def websocket_chat(websocket: WebSocket, session_id: str):
             return
         
         # Initialize chat session
-        if session_id not in chat_sessions:
-            chat_sessions[session_id] = GeminiFantasyAssistant(GEMINI_API_KEY)
+        await load_session(session_id)
         
         # Send welcome message
         await websocket.send_json({
@@ -222,8 +406,20 @@ async def websocket_chat(websocket: WebSocket, session_id: str):
             message = data.get("message", "")
             context = data.get("context")
             
-            # Get AI response
-            result = await chat_sessions[session_id].chat(message, context)
+            # Get AI response; overload is reported without dropping the connection
+            assistant = await load_session(session_id)
+            try:
+                async with admission.slot_async(session_id, league_of(context), 'interactive'):
+                    result = await run_in_threadpool(assistant.chat, message, context)
+            except Overloaded as e:
+                await websocket.send_json({
+                    "type": "error",
+                    "status": 429,
+                    "message": str(e),
+                    "retry_after": round(e.retry_after, 1)
+                })
+                continue
+            await store_session(session_id, assistant)
             
             # Send response back to client
             await websocket.send_json({
@@ -240,6 +436,109 @@ async def websocket_chat(websocket: WebSocket, session_id: str):
             "message": str(e)
         })
 
+@app.post("/api/stats/updates")
+async def update_live_stats(update: StatsUpdate):
+    """
+    Apply live stat updates and re-optimize affected lineup subscriptions
+    
+    Example request:
+    {
+        "players": [{"player_id": 7, "injury_risk": 0.9, "trending": "down"}]
+    }
+    """
+    try:
+        ids = parse_player_ids([player.get("player_id") for player in update.players], "player_id")
+        players = [{**player, "player_id": player_id} for player, player_id in zip(update.players, ids)]
+        player_ids = await asyncio.to_thread(live_stats.update, players, published_stats_version())
+    except (KeyError, ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid stats update: {e}")
+    
+    lineup_hub.notify_stats_changed(player_ids)
+    return {
+        "success": True,
+        "updated": len(player_ids),
+        "subscriptions": lineup_hub.stats()
+    }
+
+def subscription_key(data: Dict) -> SubscriptionKey:
+    """
+    Validated subscription key from a /ws/lineups subscribe message
+    
+    Raises:
+        ValueError: On a missing or malformed pool, positions or strategy
+    """
+    if not data.get("availablePlayers") or not data.get("positions"):
+        raise ValueError("availablePlayers and positions are required")
+    pool = parse_player_ids(data["availablePlayers"])
+    positions = data["positions"]
+    if not isinstance(positions, list) or not all(isinstance(position, str) for position in positions):
+        raise ValueError("positions must be a list of position names")
+    strategy = data.get("optimizationGoal", "balanced")
+    if not isinstance(strategy, str) or not strategy:
+        raise ValueError("optimizationGoal must be a strategy name")
+    league_id = data.get("leagueId")
+    if league_id is not None and not isinstance(league_id, (int, str)):
+        raise ValueError("leagueId must be a number or string")
+    return SubscriptionKey.create(league_id, pool, positions, strategy)
+
+@app.websocket("/ws/lineups")
+async def lineup_subscription(websocket: WebSocket):
+    """
+    Subscribe to lineup updates instead of polling /api/ai/predict-lineup
+    
+    Client messages:
+    {"action": "subscribe", "leagueId": 1, "availablePlayers": [...],
+     "positions": ["PG", "SG", "SF", "PF", "C"], "optimizationGoal": "balanced"}
+    {"action": "unsubscribe"}
+    
+    The current lineup is sent right away, then again only when a stats change
+    alters it.
+    """
+    await websocket.accept()
+    
+    key = None
+    queue = None
+    receive_task = asyncio.create_task(websocket.receive_json())
+    update_task = None
+    
+    try:
+        while True:
+            pending = {receive_task} | ({update_task} if update_task else set())
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            
+            if update_task in done:
+                await websocket.send_json({"type": "lineup", **update_task.result()})
+                update_task = asyncio.create_task(queue.get())
+            
+            if receive_task in done:
+                data = receive_task.result()
+                receive_task = asyncio.create_task(websocket.receive_json())
+                
+                if key is not None:
+                    lineup_hub.unsubscribe(key, queue)
+                    update_task.cancel()
+                    key = queue = update_task = None
+                
+                if data.get("action", "subscribe") == "subscribe":
+                    try:
+                        key = subscription_key(data)
+                    except ValueError as e:
+                        await websocket.send_json({"type": "error", "message": str(e)})
+                        continue
+                    queue = await lineup_hub.subscribe(key)
+                    update_task = asyncio.create_task(queue.get())
+                    
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Lineup subscription error: {e}")
+    finally:
+        receive_task.cancel()
+        if update_task:
+            update_task.cancel()
+        if key is not None:
+            lineup_hub.unsubscribe(key, queue)
+
 @app.get("/api/quick-suggestions")
 async def quick_suggestions():
     """Get quick suggestion prompts for users"""
@@ -257,7 +556,16 @@ async def quick_suggestions():
     }
 
 if __name__ == "__main__":
+    import uvicorn
+    
     port = int(os.getenv("PORT", 5001))
     print(f"🚀 Starting Gemini AI Chat Service on port {port}")
-    print(f"📡 API Key configured: {bool(GEMINI_API_KEY)}")
-    uvicorn.run(app, host="0.0.0.0", port=port, reload=True)
+    print(f"📡 API Key configured: {bool(GEMINI_API_KEY)} (transport: {transport_mode()})")
+    
+    # The reloader spawns a file watcher process; only use it in development.
+    # In production run under gunicorn (see gunicorn.conf.py) to preload and fork workers.
+    if os.getenv("FLASK_ENV") == "development":
+        uvicorn.run("gemini_app:app", host="0.0.0.0", port=port, reload=True)
+    else:
+        warm_up()
+        uvicorn.run(app, host="0.0.0.0", port=port)
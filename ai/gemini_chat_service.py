@@ -5,10 +5,31 @@ Provides intelligent lineup suggestions and fantasy sports advice
 
 import os
 import json
+import threading
 from typing import Dict, List, Optional
-from dataclasses import dataclass, asdict
-import google.generativeai as genai
+from dataclasses import dataclass, asdict, field
 from datetime import datetime
+import numpy as np
+from circuit_breaker import CircuitOpen, breaker_from_env
+from frontier import efficient_frontier, player_moments
+from model_router import ModelRouter, intent_of, shared_router, tiers_from_env
+from model_transport import ModelTransport, shared_transport
+from replacement_index import ReplacementIndex
+from semantic_cache import SemanticCache
+from session_store import SessionState, compact_history
+from slate_generator import counter_uniforms
+from strategies import Strategy, StrategyRegistry
+from tracing import tracer_from_env
+
+# Seed for the chat assistant's mock player database
+PLAYERS_DB_SEED = 7
+
+# Responses are shared across sessions; entries are scoped by preference state
+response_cache = SemanticCache(
+    capacity=int(os.getenv("SEMANTIC_CACHE_SIZE", "10000")),
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9")),
+    ttl_seconds=float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+)
 
 @dataclass
 class Player:
@@ -31,6 +52,8 @@ class LineupSuggestion:
     risk_level: str
     reasoning: str
     confidence: float
+    # Player ID -> substitutes for lineup players trending down
+    replacements: Dict[int, List[Player]] = field(default_factory=dict)
     
     def to_dict(self):
         return {
@@ -38,19 +61,146 @@ class LineupSuggestion:
             'expected_score': self.expected_score,
             'risk_level': self.risk_level,
             'reasoning': self.reasoning,
-            'confidence': self.confidence
+            'confidence': self.confidence,
+            'replacements': [
+                {'player_id': player_id, 'reason': 'trending down', 'candidates': [p.to_dict() for p in candidates]}
+                for player_id, candidates in self.replacements.items()
+            ]
         }
 
+def warm_up():
+    """Preload the Gemini SDK (or replay cassette), e.g. in the gunicorn master before workers fork"""
+    transport = shared_transport(os.getenv("GEMINI_API_KEY", ""))
+    if transport is not None:
+        transport.warm_up()
+
+
+_players_db: Optional[List[Player]] = None
+
+def _shared_players_db() -> List[Player]:
+    """Build the mock player database once per process instead of once per session"""
+    global _players_db
+    if _players_db is None:
+        _players_db = GeminiFantasyAssistant._initialize_players_db()
+    return _players_db
+
+# Chat request spans (cache lookup, model call) under the gateway's trace
+tracer = tracer_from_env('ai-chat')
+
+# Time a chat reply should take at most; slower model tiers are skipped near it
+CHAT_DEADLINE_S = float(os.getenv("CHAT_DEADLINE_S", "10"))
+
+# Shared by every session: while Gemini is failing or slow, chat answers locally.
+# Chat may use the pro tier (about 4s), so slow means over half the chat deadline
+model_breaker = breaker_from_env('gemini-chat', slow_call_s=CHAT_DEADLINE_S / 2)
+
+# Sent instead of a model reply while the breaker is open
+FALLBACK_RESPONSE = (
+    "I can't reach the AI model right now, so I can't give you a full analysis. "
+    "Please try again in a minute."
+)
+FALLBACK_LINEUP_RESPONSE = (
+    "I can't reach the AI model right now, so here's a {strategy} lineup from the "
+    "built-in lineup engine: {players}. Ask again in a minute for a full analysis."
+)
+
+# Where each risk appetite sits on the risk/reward frontier (1 = highest expected score)
+RISK_APPETITE_POSITIONS = {'conservative': 0.0, 'balanced': 0.5, 'aggressive': 1.0}
+
+# Substitutes offered per lineup player trending down
+REPLACEMENT_CANDIDATES = 2
+
+_replacement_index: Optional[ReplacementIndex] = None
+
+def _shared_replacement_index() -> ReplacementIndex:
+    """Substitute index over the players database; players trending down don't qualify"""
+    global _replacement_index
+    if _replacement_index is None:
+        players = [p for p in _shared_players_db() if p.trend >= 0]
+        _replacement_index = ReplacementIndex(
+            [p.id for p in players],
+            [p.position for p in players],
+            chat_features(players)[:, :-1],
+            [p.nft_value for p in players]
+        )
+    return _replacement_index
+
+# Stands in for the model's reply to the system prompt when a session is restored
+SYSTEM_CONTEXT_ACK = "Understood! I'm ready to help with fantasy lineups on Flow Fantasy Fusion."
+
+# Columns of the chat player feature matrix built by chat_features()
+CHAT_FEATURES = ('recent_performance', 'consistency', 'nft_value', 'trend', 'bias')
+
+def chat_features(players: List[Player]) -> np.ndarray:
+    """(n_players, len(CHAT_FEATURES)) feature matrix"""
+    return np.array(
+        [[p.recent_performance, p.consistency, p.nft_value, p.trend, 1.0] for p in players],
+        dtype=np.float64
+    ).reshape(len(players), len(CHAT_FEATURES))
+
+def default_chat_strategies() -> StrategyRegistry:
+    """
+    Chat lineup strategies as weight vectors
+    
+    balanced:     performance * 0.45 + consistency * 50 * 0.30 + nft_value * 2 * 0.15 + (trend + 1) * 25 * 0.10
+    conservative: consistency * 0.6 + (performance / 50) * 0.4
+    aggressive:   trend * 2 + performance * 0.5 + nft_value * 0.3
+    """
+    registry = StrategyRegistry(CHAT_FEATURES, default='balanced')
+    registry.register(Strategy('balanced', {
+        'recent_performance': 0.45, 'consistency': 15.0, 'nft_value': 0.3, 'trend': 2.5, 'bias': 2.5
+    }))
+    registry.register(Strategy('conservative', {'consistency': 0.6, 'recent_performance': 0.008}))
+    registry.register(Strategy('aggressive', {'trend': 2.0, 'recent_performance': 0.5, 'nft_value': 0.3}))
+    return registry
+
+chat_strategies = default_chat_strategies()
+
+# Presentation per strategy: (risk level, reasoning, confidence, expected points per player)
+LINEUP_PROFILES = {
+    'balanced': (
+        "Medium",
+        "Balanced lineup with consistent performers and upside potential",
+        0.78,
+        lambda p: p.recent_performance
+    ),
+    'conservative': (
+        "Low",
+        "Safe lineup focused on consistent, reliable performers",
+        0.85,
+        lambda p: p.recent_performance * p.consistency
+    ),
+    'aggressive': (
+        "High",
+        "High-risk lineup with breakout potential and trending players",
+        0.65,
+        lambda p: p.recent_performance * (1 + p.trend * 0.5)
+    ),
+}
+
 class GeminiFantasyAssistant:
-    def __init__(self, api_key: str):
-        """Initialize Gemini AI assistant"""
-        genai.configure(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        cache: Optional[SemanticCache] = response_cache,
+        state: Optional[SessionState] = None,
+        transport: Optional[ModelTransport] = None
+    ):
+        """
+        Initialize Gemini AI assistant
         
-        # Use Gemini Pro model
-        self.model = genai.GenerativeModel('gemini-pro')
+        Passing a stored SessionState restores preferences and history into a
+        new chat without re-sending the system prompt to Gemini. Models come
+        from `transport`, by default the one selected by GEMINI_TRANSPORT, and
+        each message is routed to a model tier by the process-wide router.
+        """
+        self.router = ModelRouter(transport, tiers_from_env()) if transport else shared_router(api_key)
+        if self.router is None:
+            raise ValueError("Gemini API key not configured")
         
-        # Initialize chat with system context
-        self.chat = self.model.start_chat(history=[])
+        # Semantic response cache (set cache_enabled=False to opt a session out)
+        self.cache = cache
+        self.cache_enabled = cache is not None
         
         # Set up the system prompt
         self.system_context = """
@@ -79,9 +229,6 @@ When suggesting lineups:
 Be conversational, helpful, and show personality!
 """
         
-        # Send system context
-        self.chat.send_message(self.system_context)
-        
         # User preferences
         self.user_preferences = {
             'risk_appetite': 'balanced',
@@ -91,13 +238,35 @@ Be conversational, helpful, and show personality!
             'avoid_players': []
         }
         
-        # Available players database (mock data)
-        self.players_db = self._initialize_players_db()
-    
-    def _initialize_players_db(self) -> List[Player]:
-        """Initialize mock player database"""
-        import random
+        # Model tier the chat session is on; each message may move it (see _use_tier)
+        self.tier = self.router.tiers[0].name
         
+        # Conversation turns kept for the session store
+        self.history: List[Dict[str, str]] = []
+        # chat() runs in a thread pool; one message at a time per session
+        self._chat_lock = threading.Lock()
+        self.created_at = datetime.now().isoformat()
+        self.message_count = 0
+        self.state_version = 0
+        
+        if state is not None:
+            self.user_preferences.update(state.preferences)
+            self.history = compact_history(state.history)
+            self.created_at = state.metadata.get('created_at', self.created_at)
+            self.message_count = state.metadata.get('message_count', 0)
+            self.cache_enabled = state.metadata.get('cache_enabled', True) and self.cache is not None
+            self.state_version = state.version
+            self.chat_session = self.model.start_chat(history=self._seed_history())
+        else:
+            # Initialize chat and send system context
+            self._start_chat_session()
+        
+        # Available players database (mock data, shared by every session)
+        self.players_db = _shared_players_db()
+    
+    @staticmethod
+    def _initialize_players_db() -> List[Player]:
+        """Initialize mock player database (same players on every run and worker)"""
         positions = ["PG", "SG", "SF", "PF", "C"]
         teams = ["Lakers", "Warriors", "Celtics", "Heat", "Bucks", "Nuggets", "Suns", "Mavericks"]
         
@@ -118,24 +287,32 @@ Be conversational, helpful, and show personality!
             "Keegan Murray", "Bennedict Mathurin"
         ]
         
+        ids = list(range(1, len(player_names) + 1))
+        performance, consistency, nft_value, trend = (
+            (low + counter_uniforms(ids, stream, PLAYERS_DB_SEED) * (high - low)).tolist()
+            for stream, (low, high) in enumerate([(15, 48), (0.65, 0.95), (0.5, 15), (-0.3, 0.5)])
+        )
+        
         for i, name in enumerate(player_names):
             players.append(Player(
                 id=i + 1,
                 name=name,
                 position=positions[i % len(positions)],
-                recent_performance=random.uniform(15, 48),
-                consistency=random.uniform(0.65, 0.95),
-                nft_value=random.uniform(0.5, 15),
-                trend=random.uniform(-0.3, 0.5),
+                recent_performance=performance[i],
+                consistency=consistency[i],
+                nft_value=nft_value[i],
+                trend=trend[i],
                 team=teams[i % len(teams)]
             ))
         
         return players
     
-    async def chat(self, message: str, context: Optional[Dict] = None) -> Dict:
+    def chat(self, message: str, context: Optional[Dict] = None) -> Dict:
         """
         Handle user messages and return AI responses
         
+        Blocks on the model call; async callers run it in a thread pool.
+        
         Args:
             message: User's message
             context: Optional context (league info, player stats, etc.)
@@ -143,26 +320,72 @@ Be conversational, helpful, and show personality!
         Returns:
             Dictionary with response and metadata
         """
+        with self._chat_lock:
+            return self._chat(message, context)
+    
+    def _chat(self, message: str, context: Optional[Dict]) -> Dict:
         try:
             # Build enhanced prompt with context
             enhanced_message = self._build_enhanced_prompt(message, context)
             
-            # Get response from Gemini
-            response = self.chat.send_message(enhanced_message)
-            
             # Check if this is a lineup request
-            is_lineup_request = any(keyword in message.lower() for keyword in 
-                                   ['lineup', 'suggest', 'recommend', 'team', 'players'])
+            intent = intent_of(message)
+            is_lineup_request = intent == 'lineup'
+            lineup = self._generate_lineup_data() if is_lineup_request else None
+            
+            # Serve semantically similar questions from the cache
+            cache_hit = None
+            route = None
+            degraded = False
+            scope = self._cache_scope(context)
+            if self.cache_enabled:
+                with tracer.span('cache.lookup') as span:
+                    cache_hit = self.cache.lookup(message, scope)
+                    span.set_attribute('cache.hit', cache_hit is not None)
+            
+            if cache_hit:
+                response_text = cache_hit.response
+                # The model never saw this exchange; add it so later turns have the context
+                self._continue_chat([
+                    {'role': 'user', 'parts': [enhanced_message]},
+                    {'role': 'model', 'parts': [response_text]}
+                ])
+            else:
+                try:
+                    # Get response from Gemini, on the tier the router picks for this message
+                    route = self.router.route(
+                        self._context_chars() + len(enhanced_message), intent, deadline_s=CHAT_DEADLINE_S
+                    )
+                    self._use_tier(route.tier)
+                    with tracer.span('gemini.send_message', attributes={
+                        'prompt.chars': len(enhanced_message), 'model.tier': route.tier, 'model.route': route.reason
+                    }), model_breaker.guard(), self.router.track(route.tier):
+                        response = self.chat_session.send_message(enhanced_message)
+                    response_text = response.text
+                    if self.cache_enabled:
+                        self.cache.put(message, response_text, scope)
+                except CircuitOpen:
+                    degraded = True
+                    response_text = self._fallback_response(lineup)
+            
+            # Local fallback replies never reached the model, so keep them out of its history
+            if not degraded:
+                self.history.append({'role': 'user', 'text': message})
+                self.history.append({'role': 'model', 'text': response_text})
+                self.history = compact_history(self.history)
+            self.message_count += 1
             
             result = {
-                'response': response.text,
+                'response': response_text,
                 'timestamp': datetime.now().isoformat(),
-                'is_lineup_suggestion': is_lineup_request
+                'is_lineup_suggestion': is_lineup_request,
+                'cached': cache_hit is not None,
+                'degraded': degraded,
+                'model_tier': route.tier if route is not None and not degraded else None
             }
             
             # If it's a lineup request, also generate structured data
-            if is_lineup_request:
-                lineup = self._generate_lineup_data()
+            if lineup is not None:
                 result['lineup_data'] = lineup.to_dict()
             
             return result
@@ -175,6 +398,23 @@ Be conversational, helpful, and show personality!
                 'timestamp': datetime.now().isoformat()
             }
     
+    def _fallback_response(self, lineup: Optional[LineupSuggestion]) -> str:
+        """Canned reply used while the model breaker is open"""
+        if lineup is None:
+            return FALLBACK_RESPONSE
+        return FALLBACK_LINEUP_RESPONSE.format(
+            strategy=self.user_preferences['risk_appetite'],
+            players=", ".join(f"{p.name} ({p.position})" for p in lineup.players)
+        )
+    
+    def _cache_scope(self, context: Optional[Dict]) -> str:
+        """Preference state that a cached answer must match to be reused"""
+        return json.dumps(
+            {'preferences': self.user_preferences, 'context': context},
+            sort_keys=True,
+            default=str
+        )
+    
     def _build_enhanced_prompt(self, message: str, context: Optional[Dict]) -> str:
         """Build enhanced prompt with user preferences and context"""
         prompt_parts = [message]
@@ -202,104 +442,69 @@ Be conversational, helpful, and show personality!
     def _generate_lineup_data(self) -> LineupSuggestion:
         """Generate structured lineup data based on user preferences"""
         strategy = self.user_preferences['risk_appetite']
-        
-        if strategy == 'conservative':
-            return self._generate_conservative_lineup()
-        elif strategy == 'aggressive':
-            return self._generate_aggressive_lineup()
-        else:
-            return self._generate_balanced_lineup()
-    
-    def _generate_balanced_lineup(self) -> LineupSuggestion:
-        """Generate a balanced lineup"""
-        # Sort by weighted score
-        sorted_players = sorted(
-            self.players_db,
-            key=lambda p: (
-                p.recent_performance * 0.45 +
-                p.consistency * 50 * 0.30 +
-                p.nft_value * 2 * 0.15 +
-                (p.trend + 1) * 25 * 0.10
-            ),
-            reverse=True
-        )
-        
-        # Select one player per position
-        lineup = []
-        positions_filled = set()
-        
-        for player in sorted_players:
-            if player.position not in positions_filled:
-                lineup.append(player)
-                positions_filled.add(player.position)
-                if len(lineup) == 5:
-                    break
-        
-        expected_score = sum(p.recent_performance for p in lineup)
-        
-        return LineupSuggestion(
-            players=lineup,
-            expected_score=expected_score,
-            risk_level="Medium",
-            reasoning="Balanced lineup with consistent performers and upside potential",
-            confidence=0.78
-        )
+        if strategy not in LINEUP_PROFILES:
+            strategy = 'balanced'
+        return self.generate_lineups([strategy])[strategy]
     
-    def _generate_conservative_lineup(self) -> LineupSuggestion:
-        """Generate a conservative lineup"""
-        sorted_players = sorted(
-            self.players_db,
-            key=lambda p: (p.consistency * 0.6 + (p.recent_performance / 50) * 0.4),
-            reverse=True
-        )
-        
-        lineup = []
-        positions_filled = set()
+    def generate_lineups(self, strategies: List[str]) -> Dict[str, LineupSuggestion]:
+        """
+        Generate one lineup per strategy, scoring all strategies in one matrix product
         
-        for player in sorted_players:
-            if player.position not in positions_filled:
-                lineup.append(player)
-                positions_filled.add(player.position)
-                if len(lineup) == 5:
-                    break
+        Each lineup takes the best-scoring player for each of the five positions.
+        """
+        scores = chat_strategies.score(chat_features(self.players_db), strategies)
         
-        expected_score = sum(p.recent_performance * p.consistency for p in lineup)
+        suggestions = {}
+        for j, strategy in enumerate(strategies):
+            # Select one player per position
+            lineup = []
+            positions_filled = set()
+            
+            for row in np.argsort(-scores[:, j], kind='stable'):
+                player = self.players_db[row]
+                if player.position not in positions_filled:
+                    lineup.append(player)
+                    positions_filled.add(player.position)
+                    if len(lineup) == 5:
+                        break
+            
+            risk_level, reasoning, confidence, player_points = LINEUP_PROFILES.get(
+                strategy, LINEUP_PROFILES['balanced']
+            )
+            suggestions[strategy] = LineupSuggestion(
+                players=lineup,
+                expected_score=sum(player_points(p) for p in lineup),
+                risk_level=risk_level,
+                reasoning=reasoning,
+                confidence=confidence,
+                replacements=self._suggest_replacements(lineup)
+            )
         
-        return LineupSuggestion(
-            players=lineup,
-            expected_score=expected_score,
-            risk_level="Low",
-            reasoning="Safe lineup focused on consistent, reliable performers",
-            confidence=0.85
-        )
+        return suggestions
     
-    def _generate_aggressive_lineup(self) -> LineupSuggestion:
-        """Generate an aggressive lineup"""
-        sorted_players = sorted(
-            self.players_db,
-            key=lambda p: (p.trend * 2 + p.recent_performance * 0.5 + p.nft_value * 0.3),
-            reverse=True
-        )
-        
-        lineup = []
-        positions_filled = set()
-        
-        for player in sorted_players:
-            if player.position not in positions_filled:
-                lineup.append(player)
-                positions_filled.add(player.position)
-                if len(lineup) == 5:
-                    break
+    def _suggest_replacements(self, lineup: List[Player]) -> Dict[int, List[Player]]:
+        """Similar, no more expensive, same-position players for lineup players trending down"""
+        index = _shared_replacement_index()
+        players_by_id = {p.id: p for p in self.players_db}
+        lineup_ids = [p.id for p in lineup]
         
-        potential_score = sum(p.recent_performance * (1 + p.trend * 0.5) for p in lineup)
-        
-        return LineupSuggestion(
-            players=lineup,
-            expected_score=potential_score,
-            risk_level="High",
-            reasoning="High-risk lineup with breakout potential and trending players",
-            confidence=0.65
-        )
+        replacements = {}
+        for player in lineup:
+            if player.trend >= 0:
+                continue
+            # Match the player's profile without the slump
+            target = chat_features([player])[0, :-1]
+            target[CHAT_FEATURES.index('trend')] = 0.0
+            matches = index.query(
+                target,
+                player.position,
+                k=REPLACEMENT_CANDIDATES,
+                max_value=player.nft_value,
+                exclude=lineup_ids
+            )
+            if matches:
+                replacements[player.id] = [players_by_id[m.player_id] for m in matches]
+        return replacements
     
     def update_preference(self, key: str, value):
         """Update user preference"""
@@ -308,6 +513,33 @@ Be conversational, helpful, and show personality!
             return True
         return False
     
+    def set_cache_enabled(self, enabled: bool):
+        """Opt this session in or out of the shared response cache"""
+        self.cache_enabled = enabled and self.cache is not None
+    
+    def lineup_frontier(self) -> Dict:
+        """
+        Risk/reward frontier of one-per-position lineups, solved once
+        
+        Expected points are recent performance, with variance from consistency.
+        "preferred" is the point matching the user's risk appetite.
+        """
+        players = self.players_db
+        mean, variance = player_moments(
+            np.array([p.recent_performance for p in players]),
+            np.array([p.consistency for p in players])
+        )
+        positions = [p.position for p in players]
+        frontier = efficient_frontier(
+            [p.id for p in players], mean, variance, positions, dict.fromkeys(positions, 1)
+        )
+        
+        risk = RISK_APPETITE_POSITIONS.get(self.user_preferences['risk_appetite'], 0.5)
+        result = frontier.to_dict()
+        result['preferred'] = frontier.points.index(frontier.pick(risk))
+        result['players'] = {p.id: {'name': p.name, 'position': p.position} for p in players}
+        return result
+    
     def get_player_info(self, player_id: int) -> Optional[Player]:
         """Get detailed player information"""
         for player in self.players_db:
@@ -315,7 +547,60 @@ Be conversational, helpful, and show personality!
                 return player
         return None
     
+    @property
+    def model(self):
+        """Shared model client for the session's current tier"""
+        return self.router.model(self.tier)
+    
+    def _use_tier(self, tier: str):
+        """Move the conversation to another tier's model, carrying over the live chat history"""
+        if tier != self.tier:
+            self.tier = tier
+            self._continue_chat()
+    
+    def _continue_chat(self, turns: List[Dict] = ()):
+        """Restart the chat on the current tier's model from the live session's history plus `turns`"""
+        history = list(self.chat_session.history) + list(turns)
+        self.chat_session = self.model.start_chat(history=history)
+    
+    def _context_chars(self) -> int:
+        """Characters of conversation the model sees before the next message"""
+        return len(self.system_context) + sum(len(turn['text']) for turn in self.history)
+    
+    def _start_chat_session(self):
+        """Start a chat primed with the system prompt; seed it locally while the breaker is open"""
+        self.chat_session = self.model.start_chat(history=[])
+        try:
+            with model_breaker.guard(), self.router.track(self.tier):
+                self.chat_session.send_message(self.system_context)
+        except CircuitOpen:
+            self.chat_session = self.model.start_chat(history=self._seed_history())
+    
+    def _seed_history(self) -> List[Dict]:
+        """Chat history for start_chat: system prompt, its acknowledgement, then stored turns"""
+        seeded = [
+            {'role': 'user', 'parts': [self.system_context]},
+            {'role': 'model', 'parts': [SYSTEM_CONTEXT_ACK]}
+        ]
+        seeded.extend({'role': turn['role'], 'parts': [turn['text']]} for turn in self.history)
+        return seeded
+    
+    def export_state(self, session_id: str) -> SessionState:
+        """Snapshot preferences, compacted history and metadata for the session store"""
+        return SessionState(
+            session_id=session_id,
+            preferences=dict(self.user_preferences),
+            history=compact_history(self.history),
+            metadata={
+                'created_at': self.created_at,
+                'updated_at': datetime.now().isoformat(),
+                'message_count': self.message_count,
+                'cache_enabled': self.cache_enabled
+            },
+            version=self.state_version
+        )
+    
     def reset_conversation(self):
         """Reset the conversation history"""
-        self.chat = self.model.start_chat(history=[])
-        self.chat.send_message(self.system_context)
+        self.history = []
+        self._start_chat_session()
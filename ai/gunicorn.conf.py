@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration for the AI services
+Loads the app once in the master and warms up the Gemini SDK before workers fork,
+so scaled-up workers start without paying the SDK import
+
+    gunicorn -c gunicorn.conf.py app:app
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker gemini_app:app
+"""
+
+import importlib
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+preload_app = True
+
+
+def when_ready(server):
+    """Call the app module's warm_up() hook in the master, after preload and before forking"""
+    module_name = server.app.app_uri.split(':')[0]
+    module = importlib.import_module(module_name)
+    warm_up = getattr(module, 'warm_up', None)
+    if warm_up:
+        warm_up()
+        server.log.info(f"Warmed up {module_name} before forking workers")
@@ -0,0 +1,471 @@
+"""
+Lineup Engine
+Player stats, strategy scoring and batched rule-based lineups shared by both services
+
+The Flask lineup service and the FastAPI chat service (lineup subscriptions)
+both score lineups through this module, so the chat service does not import
+the Flask app. Stats come from the published snapshot (PLAYER_SNAPSHOT_PATH)
+or the slate generator, then game-log features (FEATURE_STORE_DIR), then live
+stat updates (LIVE_STATS_PATH).
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from feature_store import GameLogStore
+from live_stats import live_stats_from_env
+from ownership import FieldOwnership
+from player_snapshot import SnapshotReader
+from slate_generator import DEFAULT_SEED, TRENDING_LABELS, PlayerSlate, generate_slate
+from strategies import Modifier, Strategy, StrategyRegistry
+
+
+@dataclass
+class PlayerStats:
+    """Player performance statistics"""
+    player_id: int
+    recent_performance: float  # 0-100
+    market_value: float  # Estimated NFT market value
+    consistency: float  # 0-1
+    injury_risk: float  # 0-1
+    trending: str  # 'up', 'down', 'stable'
+
+# Trending bonus indexed by TRENDING_LABELS ('down', 'stable', 'up')
+TRENDING_SCORES = np.array([0.0, 10.0, 20.0])
+
+# Columns of the lineup feature matrix built by lineup_features()
+LINEUP_FEATURES = (
+    'recent_performance',  # 0-100
+    'normalized_value',    # market value / 100, capped at 100
+    'consistency_pct',     # consistency * 100
+    'trending_score',      # TRENDING_SCORES
+    'injury_penalty',      # injury risk * 15
+    'market_value',        # raw values, used by modifier conditions
+    'consistency',
+    'injury_risk',
+)
+
+
+def lineup_features(slate: PlayerSlate) -> np.ndarray:
+    """(n_players, len(LINEUP_FEATURES)) feature matrix for a columnar slate"""
+    return np.column_stack([
+        slate.recent_performance,
+        np.minimum(slate.market_value / 100.0, 100.0),
+        slate.consistency * 100.0,
+        TRENDING_SCORES[slate.trending],
+        slate.injury_risk * 15.0,
+        slate.market_value,
+        slate.consistency,
+        slate.injury_risk,
+    ]).astype(np.float64)
+
+
+# League strategies are shared by every worker (and the precompute job) through this
+# file; unset, they stay in this process's memory
+STRATEGY_STORE_PATH = os.environ.get('STRATEGY_STORE_PATH', '')
+
+
+def default_strategy_registry() -> StrategyRegistry:
+    """
+    Built-in strategies
+    
+    Base formula: score = α * performance + β * value + γ * consistency + δ * trending - injury_risk,
+    clamped at 0, with α=0.45, β=0.30, γ=0.15, δ=0.10.
+    """
+    base = {
+        'recent_performance': 0.45,
+        'normalized_value': 0.30,
+        'consistency_pct': 0.15,
+        'trending_score': 0.10,
+        'injury_penalty': -1.0,
+    }
+    registry = StrategyRegistry(LINEUP_FEATURES, default='balanced', path=STRATEGY_STORE_PATH or None)
+    registry.register(Strategy('balanced', base, floor=0.0, description="Weighted composite score"))
+    registry.register(Strategy(
+        'high-risk',
+        base,
+        modifiers=(Modifier((('market_value', '>', 500.0),), 1.25),),
+        floor=0.0,
+        description="Favor high market value players"
+    ))
+    registry.register(Strategy(
+        'conservative',
+        base,
+        modifiers=(Modifier((('consistency', '>', 0.7), ('injury_risk', '<', 0.3)), 1.15),),
+        floor=0.0,
+        description="Favor consistent players with low injury risk"
+    ))
+    return registry
+
+
+def slate_from_stats(stats_list: List[PlayerStats]) -> PlayerSlate:
+    """Convert PlayerStats objects into a columnar slate"""
+    return PlayerSlate(
+        player_id=np.array([s.player_id for s in stats_list], dtype=np.int64),
+        position=np.zeros(len(stats_list), dtype=np.int8),
+        recent_performance=np.array([s.recent_performance for s in stats_list], dtype=np.float64),
+        market_value=np.array([s.market_value for s in stats_list], dtype=np.float64),
+        consistency=np.array([s.consistency for s in stats_list], dtype=np.float64),
+        injury_risk=np.array([s.injury_risk for s in stats_list], dtype=np.float64),
+        trending=np.array(
+            [TRENDING_LABELS.index(s.trending) if s.trending in TRENDING_LABELS else 1 for s in stats_list],
+            dtype=np.int8
+        )
+    )
+
+
+class LineupPredictor:
+    """Rule-based lineup prediction engine"""
+    
+    def __init__(self, registry: Optional[StrategyRegistry] = None):
+        # Strategy weights live in the registry (global and per-league)
+        self.registry = registry or default_strategy_registry()
+        
+    def calculate_player_score(self, stats: PlayerStats) -> float:
+        """
+        Calculate composite score for a player
+        
+        Formula: score = α * performance + β * value + γ * consistency + δ * trending - injury_risk
+        """
+        return float(self.calculate_scores(slate_from_stats([stats]))[0])
+    
+    def calculate_scores(self, slate: PlayerSlate) -> np.ndarray:
+        """Vectorized calculate_player_score over every row of a columnar slate"""
+        return self.score_strategies(slate, [self.registry.default])[:, 0]
+    
+    def score_strategies(self, slate: PlayerSlate, strategies: List[str], league_id=None) -> np.ndarray:
+        """(n_players, n_strategies) scores for all strategies in one matrix product"""
+        return self.registry.score(lineup_features(slate), strategies, league_id)
+    
+    @staticmethod
+    def _assign(
+        ranked_ids: List[int],
+        ranked_scores: List[float],
+        positions: List[str]
+    ) -> Tuple[Dict[str, List[int]], float]:
+        """Assign the top-ranked players to positions (simple greedy approach)"""
+        lineup = {}
+        for position, player_id in zip(positions, ranked_ids):
+            lineup.setdefault(position, []).append(int(player_id))
+        return lineup, float(sum(ranked_scores[:len(positions)]))
+    
+    def optimize_lineups(
+        self,
+        available_players: List[int],
+        positions: List[str],
+        player_stats: Dict[int, PlayerStats],
+        strategies: List[str],
+        league_id=None,
+        field: Optional[FieldOwnership] = None,
+        leverage: float = 0.0
+    ) -> Dict[str, Tuple[Dict[str, List[int]], float, str]]:
+        """
+        Optimize one lineup per strategy, scoring all strategies together
+        
+        With a contest field and leverage > 0, each player's score is scaled by
+        (1 - leverage * ownership), fading players the field already owns.
+        
+        Returns:
+            Dictionary of strategy -> (lineup, expected_score, rationale)
+        """
+        pool = list(dict.fromkeys(available_players))
+        known = [player_id for player_id in pool if player_id in player_stats]
+        
+        # Default score for unknown players
+        scores = np.full((len(pool), len(strategies)), 50.0)
+        if known:
+            known_rows = [pool.index(player_id) for player_id in known]
+            slate = slate_from_stats([player_stats[player_id] for player_id in known])
+            scores[known_rows] = self.score_strategies(slate, strategies, league_id)
+        
+        if field is not None and leverage:
+            scores *= (1.0 - leverage * field.ownership(pool))[:, None]
+        
+        results = {}
+        for j, strategy in enumerate(strategies):
+            order = np.argsort(-scores[:, j], kind='stable')[:len(positions)]
+            lineup, expected_score = self._assign(
+                [pool[i] for i in order],
+                scores[order, j].tolist(),
+                positions
+            )
+            rationale = self._generate_rationale(lineup, player_stats, strategy, expected_score)
+            results[strategy] = (lineup, expected_score, rationale)
+        
+        return results
+    
+    def optimize_lineup(
+        self,
+        available_players: List[int],
+        positions: List[str],
+        player_stats: Dict[int, PlayerStats],
+        strategy: str = 'balanced',
+        league_id=None,
+        field: Optional[FieldOwnership] = None,
+        leverage: float = 0.0
+    ) -> Tuple[Dict[str, List[int]], float, str]:
+        """
+        Optimize lineup based on strategy
+        
+        Args:
+            available_players: List of player IDs available for selection
+            positions: Required positions to fill
+            player_stats: Dictionary of player statistics
+            strategy: 'balanced', 'high-risk', 'conservative' or a league strategy
+            league_id: League whose custom strategies take precedence
+            field: Contest field whose ownership is used as a leverage signal
+            leverage: 0 ignores ownership; 1 scores a player the whole field owns at 0
+        
+        Returns:
+            Tuple of (lineup, expected_score, rationale)
+        """
+        return self.optimize_lineups(
+            available_players, positions, player_stats, [strategy], league_id, field, leverage
+        )[strategy]
+    
+    def _generate_rationale(
+        self,
+        lineup: Dict[str, List[int]],
+        player_stats: Dict[int, PlayerStats],
+        strategy: str,
+        expected_score: float
+    ) -> str:
+        """Generate human-readable explanation of lineup selection"""
+        
+        total_value = 0
+        trending_up = 0
+        
+        for position, players in lineup.items():
+            for player_id in players:
+                if player_id in player_stats:
+                    stats = player_stats[player_id]
+                    total_value += stats.market_value
+                    if stats.trending == 'up':
+                        trending_up += 1
+        
+        rationale_parts = [
+            f"Optimized for {strategy} strategy.",
+            f"Expected score: {expected_score:.1f}.",
+        ]
+        
+        if trending_up > 2:
+            rationale_parts.append(f"{trending_up} players trending upward.")
+        
+        if total_value > 3000:
+            rationale_parts.append("High-value player concentration.")
+        
+        return " ".join(rationale_parts)
+
+
+# Initialize predictor
+predictor = LineupPredictor()
+
+def stats_from_slate(slate: PlayerSlate) -> Dict[int, PlayerStats]:
+    """Convert columnar slate rows into PlayerStats objects"""
+    return {
+        int(player_id): PlayerStats(
+            player_id=int(player_id),
+            recent_performance=float(performance),
+            market_value=float(value),
+            consistency=float(consistency),
+            injury_risk=float(injury_risk),
+            trending=TRENDING_LABELS[trending]
+        )
+        for player_id, performance, value, consistency, injury_risk, trending in zip(
+            slate.player_id.tolist(),
+            slate.recent_performance.tolist(),
+            slate.market_value.tolist(),
+            slate.consistency.tolist(),
+            slate.injury_risk.tolist(),
+            slate.trending.tolist()
+        )
+    }
+
+
+# Published stats snapshot shared read-only by all workers (see player_snapshot.py)
+PLAYER_SNAPSHOT_PATH = os.environ.get('PLAYER_SNAPSHOT_PATH', '')
+snapshot_reader = SnapshotReader(PLAYER_SNAPSHOT_PATH) if PLAYER_SNAPSHOT_PATH else None
+
+
+def current_snapshot():
+    """The published snapshot, or None (generated stats) when none is configured or readable"""
+    return snapshot_reader.current() if snapshot_reader is not None else None
+
+# Game-log segments (see feature_store.py); performance, consistency, trend and
+# injury risk are then derived from box scores for players with games
+FEATURE_STORE_DIR = os.environ.get('FEATURE_STORE_DIR', '')
+feature_store = GameLogStore(FEATURE_STORE_DIR) if FEATURE_STORE_DIR else None
+
+
+# In-game stat updates over the published stats (see live_stats.py);
+# shared by every worker of both services through LIVE_STATS_PATH
+live_stats = live_stats_from_env()
+
+
+def published_stats_version() -> str:
+    """Version of the published stats: the snapshot (or generator seed) and game logs"""
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        version = snapshot.version
+    else:
+        version = f"generated-{DEFAULT_SEED}"
+    if feature_store is not None:
+        version = f"{version}+{feature_store.version}"
+    return version
+
+
+def stats_version() -> str:
+    """Version of the stats currently being served, live updates included"""
+    version = published_stats_version()
+    live = live_stats.version(version)
+    return f"{version}+live{live}" if live else version
+
+
+# Mock player database (in production, this would query Find Labs / Dapper APIs)
+def get_player_slate(player_ids) -> PlayerSlate:
+    """
+    Mock function to retrieve columnar player statistics
+    In production: Query Find Labs API, Dapper Moments, on-chain data
+    
+    Reads from the memory-mapped snapshot when PLAYER_SNAPSHOT_PATH is set.
+    Otherwise (and for players missing from it) stats come from the
+    counter-based slate generator, which is deterministic per player and safe
+    to call from concurrent worker threads. With FEATURE_STORE_DIR set, stats
+    derived from the players' game logs replace the base values. Live stat
+    updates made against the published stats are applied last.
+    """
+    slate = _base_player_slate(player_ids)
+    if feature_store is not None:
+        slate = feature_store.materialize(slate.player_id, base=slate)
+    return live_stats.apply(slate, published_stats_version())
+
+
+def _base_player_slate(player_ids) -> PlayerSlate:
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return generate_slate(player_ids)
+    
+    ids = np.asarray(player_ids, dtype=np.int64)
+    rows, found = snapshot.lookup_rows(ids)
+    if found.all():
+        return snapshot.slate(rows)
+    
+    slate = generate_slate(ids)
+    known = snapshot.slate(rows[found])
+    for name in slate.__dataclass_fields__:
+        getattr(slate, name)[found] = getattr(known, name)
+    return slate
+
+
+def get_player_stats(player_ids: List[int]) -> Dict[int, PlayerStats]:
+    """Retrieve player statistics keyed by player ID"""
+    return stats_from_slate(get_player_slate(player_ids))
+
+
+# Player IDs are stored as int64 (on-chain they are UInt64 moment IDs)
+MAX_PLAYER_ID = 2 ** 63 - 1
+
+
+def parse_player_ids(values, name: str = 'availablePlayers') -> List[int]:
+    """
+    Player IDs from a request body as ints
+
+    Integers and integer strings are accepted.
+
+    Raises:
+        ValueError: If `values` is not a list of IDs in [0, MAX_PLAYER_ID]
+    """
+    if not isinstance(values, list):
+        raise ValueError(f"{name} must be a list of player IDs")
+    ids = []
+    for value in values:
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError(f"{name} must contain integer player IDs, got {value!r}")
+        try:
+            player_id = int(value)
+        except ValueError:
+            raise ValueError(f"{name} must contain integer player IDs, got {value!r}") from None
+        if not 0 <= player_id <= MAX_PLAYER_ID:
+            raise ValueError(f"Player ID {player_id} in {name} is out of range")
+        ids.append(player_id)
+    return ids
+
+
+@dataclass
+class LineupRequest:
+    """Rule-based lineup request as queued by the coalescer"""
+    available_players: List[int]
+    positions: List[str]
+    strategies: List[str]
+    league_id: Optional[object] = None
+
+
+def predict_lineups_batch(
+    requests: List[LineupRequest]
+) -> List[Dict[str, Tuple[Dict[str, List[int]], float, str]]]:
+    """
+    Rule-based lineups for many requests at once
+    
+    Player pools are merged so stats are fetched once, every strategy a league
+    asked for is scored in one matrix product, and the merged pool is ranked
+    once per (league, strategy). Each request then takes the best players from
+    the shared ranking that are in its own pool.
+    
+    Returns:
+        One dictionary of strategy -> (lineup, expected_score, rationale) per request
+    """
+    return predict_lineups_for_slate(requests, get_player_slate(merged_pool(requests)))
+
+
+def merged_pool(requests: List[LineupRequest]) -> np.ndarray:
+    """Sorted unique player IDs across the requests' pools"""
+    return np.unique(np.concatenate([
+        np.asarray(req.available_players, dtype=np.int64) for req in requests
+    ]))
+
+
+def predict_lineups_for_slate(
+    requests: List[LineupRequest],
+    slate: PlayerSlate
+) -> List[Dict[str, Tuple[Dict[str, List[int]], float, str]]]:
+    """predict_lineups_batch over an already fetched slate covering every request's pool"""
+    features = lineup_features(slate)
+    
+    league_strategies: Dict[object, List[str]] = {}
+    for req in requests:
+        names = league_strategies.setdefault(req.league_id, [])
+        names.extend(name for name in req.strategies if name not in names)
+    
+    rankings = {}
+    for league_id, names in league_strategies.items():
+        scores = predictor.registry.score(features, names, league_id)
+        for j, name in enumerate(names):
+            order = np.argsort(-scores[:, j], kind='stable')
+            rankings[(league_id, name)] = (order, scores[order, j])
+    
+    results = []
+    for req in requests:
+        lineups = {}
+        for strategy in req.strategies:
+            order, ranked_scores = rankings[(req.league_id, strategy)]
+            in_pool = np.isin(slate.player_id[order], req.available_players)
+            picked = np.flatnonzero(in_pool)[:len(req.positions)]
+            
+            lineup, expected_score = predictor._assign(
+                slate.player_id[order[picked]].tolist(),
+                ranked_scores[picked].tolist(),
+                req.positions
+            )
+            rationale = predictor._generate_rationale(
+                lineup,
+                stats_from_slate(slate.take(order[picked])),
+                strategy,
+                expected_score
+            )
+            lineups[strategy] = (lineup, expected_score, rationale)
+        results.append(lineups)
+    
+    return results
@@ -0,0 +1,196 @@
+"""
+Live Lineup Subscriptions
+Push re-optimized lineups to subscribers only when a stats change alters the result
+
+Subscribers sharing the same (league, pool, positions, strategy) share one
+group. Stats changes mark the affected groups dirty; after a short debounce all
+dirty groups are recomputed together in one batch call, and a group's
+subscribers are only notified when its optimal lineup actually changed.
+
+Stats changes come from notify_stats_changed() and, for updates other
+workers made (see live_stats.py), from polling the stats version.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class SubscriptionKey:
+    league_id: Optional[str]
+    pool: Tuple[int, ...]  # sorted, unique
+    positions: Tuple[str, ...]
+    strategy: str
+
+    @classmethod
+    def create(cls, league_id, pool: Iterable[int], positions: Iterable[str], strategy: str) -> "SubscriptionKey":
+        return cls(
+            league_id=None if league_id is None else str(league_id),
+            pool=tuple(sorted({int(player_id) for player_id in pool})),
+            positions=tuple(positions),
+            strategy=strategy
+        )
+
+
+class _Group:
+    __slots__ = ('subscribers', 'result', 'pool')
+
+    def __init__(self, key: SubscriptionKey):
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.result: Optional[Dict] = None
+        self.pool = np.asarray(key.pool, dtype=np.int64)
+
+
+class LineupSubscriptionHub:
+    """
+    Debounced fan-out of lineup updates
+
+    `compute_batch` maps a list of keys to one result dict per key; results are
+    compared on their 'positions' entry to decide whether anything changed.
+    A failed recompute or version poll is logged and retried on the next round,
+    so subscribers keep receiving updates.
+    """
+
+    def __init__(
+        self,
+        compute_batch: Callable[[List[SubscriptionKey]], List[Dict]],
+        debounce_ms: float = 250.0,
+        version_fn: Optional[Callable[[], str]] = None,
+        poll_seconds: float = 1.0
+    ):
+        self.compute_batch = compute_batch
+        self.debounce_s = debounce_ms / 1000.0
+        self.version_fn = version_fn
+        self.poll_seconds = poll_seconds
+
+        self._groups: Dict[SubscriptionKey, _Group] = {}
+        self._dirty: Set[SubscriptionKey] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.recomputes = 0
+        self.pushes = 0
+        self.errors = 0
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message: Dict):
+        # Slow consumers only ever need the latest lineup
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    async def subscribe(self, key: SubscriptionKey) -> asyncio.Queue:
+        """Join (or create) the key's group; the current lineup is queued immediately"""
+        self._loop = asyncio.get_running_loop()
+        if self.version_fn is not None and self._poll_task is None:
+            self._poll_task = asyncio.create_task(self._poll_versions())
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        if key not in self._groups:
+            [result] = await asyncio.to_thread(self.compute_batch, [key])
+            self.recomputes += 1
+            # Another subscriber may have created the group while we computed
+            if key not in self._groups:
+                self._groups[key] = _Group(key)
+                self._groups[key].result = result
+
+        group = self._groups[key]
+        group.subscribers.add(queue)
+        self._offer(queue, {'reason': 'initial', **group.result})
+        return queue
+
+    def unsubscribe(self, key: SubscriptionKey, queue: asyncio.Queue):
+        group = self._groups.get(key)
+        if group is None:
+            return
+        group.subscribers.discard(queue)
+        if not group.subscribers:
+            del self._groups[key]
+            self._dirty.discard(key)
+
+    def notify_stats_changed(self, player_ids: Optional[Iterable[int]] = None):
+        """
+        Mark groups whose pool contains any of the players (all groups if None) for recompute
+
+        Safe to call from any thread or event loop; the work is handed to the
+        loop the subscribers live on.
+        """
+        if self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not self._loop:
+            ids = None if player_ids is None else list(player_ids)
+            self._loop.call_soon_threadsafe(self.notify_stats_changed, ids)
+            return
+
+        if player_ids is None:
+            self._dirty.update(self._groups)
+        else:
+            changed = np.asarray(list(player_ids), dtype=np.int64)
+            self._dirty.update(
+                key for key, group in self._groups.items()
+                if np.isin(changed, group.pool).any()
+            )
+
+        if self._dirty and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        # Keys dirtied while a recompute is running are picked up by the next round
+        while self._dirty:
+            await asyncio.sleep(self.debounce_s)
+            keys = [key for key in self._dirty if key in self._groups]
+            self._dirty.clear()
+            if not keys:
+                continue
+
+            try:
+                results = await asyncio.to_thread(self.compute_batch, keys)
+            except Exception as e:
+                # Keep the keys dirty so the next round retries them after the debounce
+                self.errors += 1
+                print(f"⚠️  Lineup re-optimization failed for {len(keys)} subscription(s): {e}")
+                self._dirty.update(key for key in keys if key in self._groups)
+                continue
+            self.recomputes += len(keys)
+
+            for key, result in zip(keys, results):
+                group = self._groups.get(key)
+                if group is None or group.result.get('positions') == result.get('positions'):
+                    continue
+                group.result = result
+                for queue in group.subscribers:
+                    self._offer(queue, {'reason': 'stats-changed', **result})
+                    self.pushes += 1
+
+    async def _poll_versions(self):
+        """Treat a newly published stats version as a change to every player"""
+        last_version = None
+        while True:
+            try:
+                version = await asyncio.to_thread(self.version_fn)
+            except Exception as e:
+                # e.g. the shared live stats file is locked or unreadable; try again next poll
+                self.errors += 1
+                print(f"⚠️  Stats version poll failed: {e}")
+            else:
+                if last_version is not None and version != last_version:
+                    self.notify_stats_changed()
+                last_version = version
+            await asyncio.sleep(self.poll_seconds)
+
+    def stats(self) -> Dict:
+        return {
+            'groups': len(self._groups),
+            'subscribers': sum(len(group.subscribers) for group in self._groups.values()),
+            'recomputes': self.recomputes,
+            'pushes': self.pushes,
+            'errors': self.errors
+        }
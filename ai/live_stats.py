@@ -0,0 +1,234 @@
+"""
+Live Stats Overlay
+In-game stat updates layered over the published player stats
+
+Updates are keyed to the published stats version they were made against, so
+they stop applying once newer stats are published. LiveStatsOverlay keeps them
+in the process; SQLiteLiveStatsOverlay shares them through a SQLite file so an
+update posted to any worker of either service reaches every worker's
+predictions and lineup subscriptions. live_stats_from_env() picks one from
+LIVE_STATS_PATH.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from slate_generator import TRENDING_LABELS, PlayerSlate
+
+
+class LiveStatsOverlay:
+    """
+    In-game stat updates layered over the published stats
+
+    Updates are keyed to the stats version they were made against, so they
+    stop applying once newer stats are published. This in-memory overlay is
+    only seen by its own process; use SQLiteLiveStatsOverlay to share updates
+    across workers and services.
+    """
+
+    FIELDS = ('recent_performance', 'market_value', 'consistency', 'injury_risk', 'trending')
+    RATES = ('consistency', 'injury_risk')
+
+    def __init__(self):
+        self._base_version: Optional[str] = None
+        self._updates: Dict[int, Dict[str, float]] = {}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def _parse(self, players: List[Dict]) -> Dict[int, Dict[str, float]]:
+        """
+        Raises:
+            ValueError: On a non-integer player ID, a non-finite or negative stat,
+                a rate outside 0-1 or an unknown trending label
+        """
+        parsed = {}
+        for player in players:
+            player_id = player['player_id']
+            if isinstance(player_id, bool) or not isinstance(player_id, int) or player_id < 0:
+                raise ValueError(f"player_id must be a non-negative integer, got {player_id!r}")
+            fields = {}
+            for name in self.FIELDS:
+                if name not in player:
+                    continue
+                value = player[name]
+                if name == 'trending':
+                    fields[name] = TRENDING_LABELS.index(value)
+                    continue
+                if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                    raise ValueError(f"{name} for player {player_id} must be a finite number, got {value!r}")
+                if value < 0 or (name in self.RATES and value > 1):
+                    raise ValueError(f"{name} for player {player_id} is out of range: {value!r}")
+                fields[name] = float(value)
+            parsed[player_id] = fields
+        return parsed
+
+    def update(self, players: List[Dict], base_version: str = '') -> List[int]:
+        """
+        Record stat updates, e.g. [{"player_id": 7, "injury_risk": 0.9, "trending": "down"}]
+
+        Args:
+            players: One dict of changed fields per player
+            base_version: Stats version the updates apply on top of
+
+        Returns:
+            IDs of the updated players
+        """
+        parsed = self._parse(players)
+        self._store(base_version, parsed)
+        return list(parsed)
+
+    def _store(self, base_version: str, parsed: Dict[int, Dict[str, float]]):
+        with self._lock:
+            # Newly published stats supersede updates made against older ones
+            if base_version != self._base_version:
+                self._base_version = base_version
+                self._updates = {}
+            for player_id, fields in parsed.items():
+                self._updates.setdefault(player_id, {}).update(fields)
+            self._version += 1
+
+    def updates(self, base_version: str = '') -> Dict[int, Dict[str, float]]:
+        """Updates recorded against `base_version`, by player ID"""
+        with self._lock:
+            return dict(self._updates) if base_version == self._base_version else {}
+
+    def version(self, base_version: str = '') -> int:
+        """Changes whenever an update is recorded against `base_version` (0 without any)"""
+        with self._lock:
+            return self._version if base_version == self._base_version and self._updates else 0
+
+    def apply(self, slate: PlayerSlate, base_version: str = '') -> PlayerSlate:
+        """Copy of the slate with the live updates for `base_version` applied"""
+        updates = self.updates(base_version)
+        if not updates:
+            return slate
+
+        columns = {name: getattr(slate, name).copy() for name in slate.__dataclass_fields__}
+        rows = {int(player_id): row for row, player_id in enumerate(slate.player_id.tolist())}
+        for player_id, fields in updates.items():
+            row = rows.get(player_id)
+            if row is None:
+                continue
+            for name, value in fields.items():
+                columns[name][row] = value
+        return PlayerSlate(**columns)
+
+    def clear(self):
+        with self._lock:
+            self._updates = {}
+            self._version += 1
+
+    def __len__(self) -> int:
+        return len(self._updates)
+
+
+class SQLiteLiveStatsOverlay(LiveStatsOverlay):
+    """
+    Live stat updates shared through a SQLite file (WAL mode)
+
+    Every worker of both services reads the same updates. Readers re-check the
+    file at most every `check_interval` seconds and only reload rows when the
+    update sequence moved. Rows older than `retention_s` are deleted on write.
+    """
+
+    def __init__(self, path: str, check_interval: float = 0.5, retention_s: float = 86400.0):
+        super().__init__()
+        self.path = path
+        self.check_interval = check_interval
+        self.retention_s = retention_s
+        self._local = threading.local()
+        # (base_version, sequence, updates, checked_at)
+        self._cached: Tuple[Optional[str], int, Dict[int, Dict[str, float]], float] = (None, 0, {}, float('-inf'))
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS live_stats ("
+                "base_version TEXT NOT NULL, "
+                "player_id INTEGER NOT NULL, "
+                "field TEXT NOT NULL, "
+                "value REAL NOT NULL, "
+                "seq INTEGER NOT NULL, "
+                "updated_at REAL NOT NULL, "
+                "PRIMARY KEY (base_version, player_id, field))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS live_stats_seq ON live_stats (base_version, seq)")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _store(self, base_version: str, parsed: Dict[int, Dict[str, float]]):
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            seq = connection.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM live_stats").fetchone()[0]
+            connection.executemany(
+                "INSERT OR REPLACE INTO live_stats (base_version, player_id, field, value, seq, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (base_version, player_id, name, value, seq, now)
+                    for player_id, fields in parsed.items()
+                    for name, value in fields.items()
+                ]
+            )
+            connection.execute("DELETE FROM live_stats WHERE updated_at < ?", (now - self.retention_s,))
+        # The writer sees its own update on the next read
+        with self._lock:
+            self._cached = (None, 0, {}, float('-inf'))
+
+    def _read(self, base_version: str) -> Tuple[int, Dict[int, Dict[str, float]]]:
+        now = time.monotonic()
+        with self._lock:
+            cached_base, seq, updates, checked_at = self._cached
+        if cached_base == base_version and now - checked_at < self.check_interval:
+            return seq, updates
+
+        connection = self._connection()
+        latest = connection.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM live_stats WHERE base_version = ?", (base_version,)
+        ).fetchone()[0]
+        if cached_base != base_version or latest != seq:
+            updates = {}
+            for player_id, name, value in connection.execute(
+                "SELECT player_id, field, value FROM live_stats WHERE base_version = ?", (base_version,)
+            ):
+                updates.setdefault(player_id, {})[name] = value
+        with self._lock:
+            self._cached = (base_version, latest, updates, now)
+        return latest, updates
+
+    def updates(self, base_version: str = '') -> Dict[int, Dict[str, float]]:
+        return dict(self._read(base_version)[1])
+
+    def version(self, base_version: str = '') -> int:
+        return self._read(base_version)[0]
+
+    def clear(self):
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM live_stats")
+        with self._lock:
+            self._cached = (None, 0, {}, float('-inf'))
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(DISTINCT player_id) FROM live_stats").fetchone()[0]
+
+
+def live_stats_from_env() -> LiveStatsOverlay:
+    """
+    Overlay selected by LIVE_STATS_PATH
+
+    With a path, updates are shared through that SQLite file by every worker
+    of the lineup and chat services. Without one they stay in this process.
+    """
+    path = os.environ.get('LIVE_STATS_PATH', '')
+    return SQLiteLiveStatsOverlay(path) if path else LiveStatsOverlay()
@@ -0,0 +1,262 @@
+"""
+Latency-aware Model Tier Routing
+Picks the cheapest Gemini model tier that can handle each request in time
+
+Tiers run from cheapest/fastest to most capable. A request's preferred tier is
+the highest of what its intent needs (a quick question vs. a lineup analysis)
+and what its prompt size needs. The router then checks that tier's observed
+p95 latency against the time left before the caller's deadline, and its
+in-flight calls against its concurrency limit. If either fails it falls back
+to cheaper tiers, but never to a tier that cannot take the prompt.
+
+Each tier has one shared model client per process, built from the configured
+transport. With GEMINI_TRANSPORT=replay and GEMINI_REPLAY_MODEL_LATENCY, every
+tier gets its own simulated latency, so routing can be load-tested offline.
+
+Environment:
+    MODEL_TIERS=fast:gemini-1.5-flash-8b,standard:gemini-1.5-flash,pro:gemini-pro
+    MODEL_ROUTING=on|off   (off: every request uses the top tier, as before)
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from model_transport import ModelTransport, shared_transport
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    name: str
+    model: str
+    max_prompt_chars: int  # Longest prompt the tier is trusted with
+    expected_latency_s: float  # Used until enough calls have been observed
+    max_in_flight: int  # Concurrent calls before requests spill to cheaper tiers
+
+
+DEFAULT_TIERS = (
+    ModelTier('fast', 'gemini-1.5-flash-8b', max_prompt_chars=8_000, expected_latency_s=0.8, max_in_flight=32),
+    ModelTier('standard', 'gemini-1.5-flash', max_prompt_chars=32_000, expected_latency_s=1.5, max_in_flight=16),
+    ModelTier('pro', 'gemini-pro', max_prompt_chars=120_000, expected_latency_s=4.0, max_in_flight=8),
+)
+
+# Lowest tier each intent is routed to
+INTENT_TIERS = {
+    'quick': 'fast',
+    'chat': 'standard',
+    'analysis': 'pro',
+    'lineup': 'pro',
+}
+
+# Prompts over this many characters need at least the given tier
+SIZE_TIERS = ((20_000, 'pro'), (4_000, 'standard'))
+
+_LINEUP_WORDS = ('lineup', 'suggest', 'recommend', 'team', 'players')
+_ANALYSIS_WORDS = ('why', 'compare', 'explain', 'analy', 'strategy', 'should i')
+
+# Latency samples kept per tier and the percentile compared with the deadline.
+# Samples expire, so a tier skipped after a slow spell is retried on its prior.
+LATENCY_WINDOW = 200
+LATENCY_MAX_AGE_S = 60.0
+MIN_SAMPLES = 5
+ROUTING_PERCENTILE = 95
+
+
+def intent_of(message: str) -> str:
+    """Rough intent of a chat message: lineup, analysis, quick or chat"""
+    text = message.lower()
+    if any(word in text for word in _LINEUP_WORDS):
+        return 'lineup'
+    if any(word in text for word in _ANALYSIS_WORDS):
+        return 'analysis'
+    return 'quick' if len(text) < 80 else 'chat'
+
+
+@dataclass
+class Route:
+    tier: str
+    model: str
+    reason: str  # 'preferred', 'deadline', 'load' or 'fixed'
+
+
+class _TierState:
+    def __init__(self):
+        self.latencies = np.zeros(LATENCY_WINDOW)
+        self.recorded_at = np.full(LATENCY_WINDOW, -np.inf)
+        self.samples = 0
+        self.in_flight = 0
+        self.routed = 0
+        self.errors = 0
+
+
+class ModelRouter:
+    """
+    Routes requests across model tiers and hands out one shared client per tier
+
+    Args:
+        transport: Source of model clients (live, record or replay)
+        tiers: Cheapest first
+        routing: False pins every request to the top tier
+    """
+
+    def __init__(self, transport: ModelTransport, tiers: Sequence[ModelTier] = DEFAULT_TIERS, routing: bool = True):
+        if not tiers:
+            raise ValueError("At least one model tier is required")
+        self.transport = transport
+        self.tiers = list(tiers)
+        self.routing = routing
+        self._index = {tier.name: i for i, tier in enumerate(self.tiers)}
+        self._state = {tier.name: _TierState() for tier in self.tiers}
+        self._models: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self.fallbacks = 0
+
+    @property
+    def top(self) -> ModelTier:
+        return self.tiers[-1]
+
+    def model(self, tier: str):
+        """The process-wide client for a tier"""
+        model = self._models.get(tier)
+        if model is None:
+            with self._lock:
+                model = self._models.get(tier)
+                if model is None:
+                    model = self.transport.model(self.tiers[self._index[tier]].model)
+                    self._models[tier] = model
+        return model
+
+    def latency(self, tier: str, percentile: float = ROUTING_PERCENTILE) -> float:
+        """Observed latency percentile in seconds (the tier's prior with under MIN_SAMPLES recent calls)"""
+        state = self._state[tier]
+        with self._lock:
+            window = state.latencies[state.recorded_at > time.monotonic() - LATENCY_MAX_AGE_S]
+        if len(window) < MIN_SAMPLES:
+            return self.tiers[self._index[tier]].expected_latency_s
+        return float(np.percentile(window, percentile))
+
+    def _preferred(self, prompt_chars: int, intent: str) -> int:
+        wanted = self._index.get(INTENT_TIERS.get(intent, 'standard'), len(self.tiers) - 1)
+        for threshold, tier in SIZE_TIERS:
+            if prompt_chars > threshold and tier in self._index:
+                wanted = max(wanted, self._index[tier])
+                break
+        return wanted
+
+    def route(self, prompt_chars: int, intent: str = 'chat', deadline_s: Optional[float] = None) -> Route:
+        """
+        Choose a tier for one request
+
+        Args:
+            prompt_chars: Length of the prompt to be sent
+            intent: 'quick', 'chat', 'analysis' or 'lineup' (see intent_of)
+            deadline_s: Seconds left before the caller gives up; None for no deadline
+        """
+        if not self.routing:
+            route = Route(self.top.name, self.top.model, 'fixed')
+        else:
+            preferred = self._preferred(prompt_chars, intent)
+            fits = [i for i in range(preferred, -1, -1) if self.tiers[i].max_prompt_chars >= prompt_chars]
+            fits = fits or [len(self.tiers) - 1]
+            route = None
+            reason = 'preferred'
+            for i in fits:
+                tier = self.tiers[i]
+                if self._state[tier.name].in_flight >= tier.max_in_flight:
+                    reason = 'load'
+                    continue
+                if deadline_s is not None and self.latency(tier.name) > deadline_s:
+                    reason = 'deadline'
+                    continue
+                route = Route(tier.name, tier.model, 'preferred' if i == preferred else reason)
+                break
+            # Nothing fits: the cheapest tier that can take the prompt is the best bet
+            if route is None:
+                tier = self.tiers[fits[-1]]
+                route = Route(tier.name, tier.model, reason)
+
+        with self._lock:
+            self._state[route.tier].routed += 1
+            if route.reason in ('load', 'deadline'):
+                self.fallbacks += 1
+        return route
+
+    @contextmanager
+    def track(self, tier: str):
+        """Count the enclosed model call as in flight and record its latency"""
+        state = self._state[tier]
+        with self._lock:
+            state.in_flight += 1
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException:
+            with self._lock:
+                state.errors += 1
+            raise
+        else:
+            now = time.monotonic()
+            with self._lock:
+                state.latencies[state.samples % LATENCY_WINDOW] = now - start
+                state.recorded_at[state.samples % LATENCY_WINDOW] = now
+                state.samples += 1
+        finally:
+            with self._lock:
+                state.in_flight -= 1
+
+    def stats(self) -> Dict:
+        tiers = {}
+        for tier in self.tiers:
+            state = self._state[tier.name]
+            tiers[tier.name] = {
+                'model': tier.model,
+                'routed': state.routed,
+                'in_flight': state.in_flight,
+                'errors': state.errors,
+                'p50_s': round(self.latency(tier.name, 50), 3),
+                'p95_s': round(self.latency(tier.name, 95), 3)
+            }
+        return {'routing': self.routing, 'fallbacks': self.fallbacks, 'tiers': tiers}
+
+
+def tiers_from_env(spec: Optional[str] = None) -> List[ModelTier]:
+    """
+    Parse MODEL_TIERS ("name:model,..." cheapest first)
+
+    Tiers named like a default tier keep its limits; other tiers get the
+    standard tier's limits.
+    """
+    spec = spec if spec is not None else os.environ.get('MODEL_TIERS', '')
+    if not spec.strip():
+        return list(DEFAULT_TIERS)
+    defaults = {tier.name: tier for tier in DEFAULT_TIERS}
+    tiers = []
+    for item in spec.split(','):
+        name, _, model = item.strip().partition(':')
+        if not name or not model:
+            raise ValueError(f"Invalid MODEL_TIERS entry '{item}'; expected name:model")
+        tiers.append(replace(defaults.get(name, DEFAULT_TIERS[1]), name=name, model=model))
+    return tiers
+
+
+_shared: Dict[str, Optional[ModelRouter]] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_router(api_key: str = '') -> Optional[ModelRouter]:
+    """One router per process and API key, over the shared transport (None without one)"""
+    if api_key not in _shared:
+        with _shared_lock:
+            if api_key not in _shared:
+                transport = shared_transport(api_key)
+                _shared[api_key] = ModelRouter(
+                    transport,
+                    tiers_from_env(),
+                    routing=os.environ.get('MODEL_ROUTING', 'on').lower() not in ('off', '0', 'false')
+                ) if transport is not None else None
+    return _shared[api_key]
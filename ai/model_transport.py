@@ -0,0 +1,505 @@
+"""
+Pluggable Gemini Model Transport
+Live, record-to-disk and replay implementations behind the SDK's model interface
+
+Both services only use a small part of the google-generativeai surface:
+model.generate_content(prompt), model.start_chat(history) and
+chat.send_message(message), each optionally with stream=True. A transport hands
+out model objects with that same interface, so call sites don't change:
+
+    live    the real SDK (needs GEMINI_API_KEY)
+    record  the real SDK, with every exchange appended to a JSONL cassette
+    replay  answers from a cassette with no key or network, with configurable
+            latency, injected errors and streaming chunk timing
+
+Select one with environment variables:
+    GEMINI_TRANSPORT=live|record|replay   (default live)
+    GEMINI_CASSETTE=path.jsonl   (replay: cassettes/gemini_demo.jsonl, record: cassettes/recorded.jsonl)
+    GEMINI_REPLAY_LATENCY=recorded | fixed:800 | uniform:200,1500 | lognormal:800,0.5   (ms)
+    GEMINI_REPLAY_MODEL_LATENCY=gemini-1.5-flash-8b=fixed:300;gemini-pro=lognormal:2500,0.4   (per model)
+    GEMINI_REPLAY_ERROR_RATE=0.05
+    GEMINI_REPLAY_ERROR=unavailable|resource-exhausted|deadline-exceeded
+    GEMINI_REPLAY_CHUNK_MS=40
+    GEMINI_REPLAY_SEED=1
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+TRANSPORT_MODES = ('live', 'record', 'replay')
+
+CASSETTE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cassettes')
+DEFAULT_CASSETTE = os.path.join(CASSETTE_DIR, 'gemini_demo.jsonl')
+DEFAULT_RECORDING = os.path.join(CASSETTE_DIR, 'recorded.jsonl')
+
+# Characters per chunk when a streamed reply has no recorded chunking
+REPLAY_CHUNK_CHARS = 80
+
+
+def prompt_key(kind: str, model: str, prompt: str) -> str:
+    """Cassette key for one exchange; chat history is not part of it"""
+    return hashlib.sha256(f"{kind}\x00{model}\x00{prompt}".encode('utf-8')).hexdigest()[:24]
+
+
+def _prompt_text(prompt) -> str:
+    """Flatten the prompt forms the SDK accepts (str, list of parts) to text"""
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, (list, tuple)):
+        return "\n".join(_prompt_text(part) for part in prompt)
+    if isinstance(prompt, dict):
+        return _prompt_text(prompt.get('parts', prompt.get('text', '')))
+    return str(prompt)
+
+
+class TransportError(Exception):
+    """Injected upstream failure; `code` mirrors the Google API error names"""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+
+
+class CassetteMiss(LookupError):
+    """Strict replay found no recording for a prompt"""
+
+
+@dataclass
+class Chunk:
+    text: str
+
+
+@dataclass
+class ModelReply:
+    """Duck-typed stand-in for a GenerateContentResponse"""
+    text: str
+    chunks: List[Chunk] = field(default_factory=list)
+    _stream: Optional[Iterator[Chunk]] = None
+
+    def __iter__(self) -> Iterator[Chunk]:
+        if self._stream is not None:
+            stream, self._stream = self._stream, None
+            return stream
+        return iter(self.chunks or [Chunk(self.text)])
+
+
+def parse_latency(spec: Optional[str], seed: int = 0) -> Callable[[Optional[float]], float]:
+    """
+    Build a latency sampler (seconds) from a spec string
+
+    The sampler takes the recorded latency in ms (or None) so 'recorded'
+    can replay it. Specs are in milliseconds:
+        recorded, fixed:800, uniform:200,1500, lognormal:<median>,<sigma>
+    """
+    rng = np.random.default_rng(seed)
+    lock = threading.Lock()
+    spec = (spec or 'recorded').strip()
+    kind, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',') if v.strip()]
+
+    def draw(fn):
+        with lock:
+            return fn()
+
+    if kind == 'recorded':
+        return lambda recorded_ms: (recorded_ms or 0.0) / 1000.0
+    if kind == 'fixed' and len(values) == 1:
+        return lambda _: values[0] / 1000.0
+    if kind == 'uniform' and len(values) == 2:
+        return lambda _: draw(lambda: rng.uniform(values[0], values[1])) / 1000.0
+    if kind == 'lognormal' and len(values) == 2:
+        median, sigma = values
+        return lambda _: draw(lambda: median * np.exp(sigma * rng.standard_normal())) / 1000.0
+    raise ValueError(f"Invalid latency spec '{spec}'")
+
+
+class ModelTransport(ABC):
+    """Hands out model objects with the SDK's generate_content / start_chat interface"""
+
+    mode = 'base'
+
+    @abstractmethod
+    def model(self, name: str = 'gemini-pro'):
+        """Model object for `name` with generate_content() and start_chat()"""
+
+    def warm_up(self):
+        """Do expensive setup ahead of the first request (SDK import, cassette load)"""
+
+    def stats(self) -> Dict:
+        return {'mode': self.mode}
+
+
+class LiveTransport(ModelTransport):
+    """The real google-generativeai SDK, imported on first use"""
+
+    mode = 'live'
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self._configured = False
+        self._lock = threading.Lock()
+
+    def _genai(self):
+        import google.generativeai as genai
+        if not self._configured:
+            with self._lock:
+                if not self._configured:
+                    genai.configure(api_key=self.api_key)
+                    self._configured = True
+        return genai
+
+    def model(self, name: str = 'gemini-pro'):
+        return self._genai().GenerativeModel(name)
+
+    def warm_up(self):
+        self._genai()
+
+
+class _CassetteWriter:
+    """Append-only JSONL cassette shared by every recorded model in the process"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.records = 0
+
+    def write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+            self.records += 1
+
+
+class _Recorder:
+    """Times one upstream call and writes it to the cassette, including streamed chunks"""
+
+    def __init__(self, writer: _CassetteWriter, kind: str, model: str, prompt):
+        self.writer = writer
+        self.record = {
+            'key': prompt_key(kind, model, _prompt_text(prompt)),
+            'kind': kind,
+            'model': model,
+            'prompt': _prompt_text(prompt),
+        }
+        self.start = time.perf_counter()
+
+    def _elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.start) * 1000, 1)
+
+    def call(self, fn, stream: bool):
+        try:
+            response = fn()
+        except Exception as e:
+            self.record.update(error=type(e).__name__, message=str(e), latency_ms=self._elapsed_ms())
+            self.writer.write(self.record)
+            raise
+        if not stream:
+            self.record.update(text=response.text, latency_ms=self._elapsed_ms())
+            self.writer.write(self.record)
+            return response
+        return ModelReply(text='', _stream=self._stream(response))
+
+    def _stream(self, response) -> Iterator[Chunk]:
+        chunks = []
+        for chunk in response:
+            chunks.append({'text': chunk.text, 'offset_ms': self._elapsed_ms()})
+            yield Chunk(chunk.text)
+        self.record.update(
+            text=''.join(c['text'] for c in chunks),
+            latency_ms=chunks[0]['offset_ms'] if chunks else self._elapsed_ms(),
+            chunks=chunks
+        )
+        self.writer.write(self.record)
+
+
+class _RecordingChat:
+    def __init__(self, chat, writer: _CassetteWriter, model: str):
+        self._chat = chat
+        self._writer = writer
+        self._model = model
+
+    @property
+    def history(self):
+        return self._chat.history
+
+    def send_message(self, content, stream: bool = False, **kwargs):
+        recorder = _Recorder(self._writer, 'chat', self._model, content)
+        return recorder.call(lambda: self._chat.send_message(content, stream=stream, **kwargs), stream)
+
+
+class _RecordingModel:
+    def __init__(self, model, writer: _CassetteWriter, name: str):
+        self._model = model
+        self._writer = writer
+        self._name = name
+
+    def generate_content(self, contents, stream: bool = False, **kwargs):
+        recorder = _Recorder(self._writer, 'generate', self._name, contents)
+        return recorder.call(lambda: self._model.generate_content(contents, stream=stream, **kwargs), stream)
+
+    def start_chat(self, history=None, **kwargs):
+        return _RecordingChat(self._model.start_chat(history=history or [], **kwargs), self._writer, self._name)
+
+
+class RecordingTransport(ModelTransport):
+    """Wraps another transport and appends every exchange to a JSONL cassette"""
+
+    mode = 'record'
+
+    def __init__(self, inner: ModelTransport, path: str):
+        self.inner = inner
+        self.writer = _CassetteWriter(path)
+
+    def model(self, name: str = 'gemini-pro'):
+        return _RecordingModel(self.inner.model(name), self.writer, name)
+
+    def warm_up(self):
+        self.inner.warm_up()
+
+    def stats(self) -> Dict:
+        return {'mode': self.mode, 'cassette': self.writer.path, 'recorded': self.writer.records}
+
+
+class _ReplayChat:
+    def __init__(self, transport: "ReplayTransport", model: str, history):
+        self._transport = transport
+        self._model = model
+        self.history = list(history or [])
+
+    def send_message(self, content, stream: bool = False, **kwargs):
+        reply = self._transport.respond('chat', self._model, content, stream)
+        self.history.append({'role': 'user', 'parts': [_prompt_text(content)]})
+        self.history.append({'role': 'model', 'parts': [reply.text]})
+        return reply
+
+
+class _ReplayModel:
+    def __init__(self, transport: "ReplayTransport", name: str):
+        self._transport = transport
+        self._name = name
+
+    def generate_content(self, contents, stream: bool = False, **kwargs):
+        return self._transport.respond('generate', self._name, contents, stream)
+
+    def start_chat(self, history=None, **kwargs):
+        return _ReplayChat(self._transport, self._name, history)
+
+
+class ReplayTransport(ModelTransport):
+    """
+    Serve replies from a cassette, offline
+
+    Prompts are matched exactly by key; unknown prompts get a recording of the
+    same kind picked deterministically by prompt hash (or CassetteMiss with
+    strict=True), so load tests with fresh prompts still run.
+
+    Args:
+        path: JSONL cassette written by RecordingTransport (or by hand)
+        latency: Latency spec, see parse_latency(); time to first chunk when streaming
+        model_latency: Model name -> latency spec overriding `latency` for that
+            model, to simulate tiers that answer at different speeds
+        error_rate: Fraction of calls that fail with `error`
+        error: 'unavailable', 'resource-exhausted' or 'deadline-exceeded'
+            (the last one waits `deadline_s` before failing)
+        chunk_ms: Delay between streamed chunks; None replays recorded offsets
+        seed: Seed for latency and error draws
+    """
+
+    mode = 'replay'
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CASSETTE,
+        latency: Optional[str] = 'recorded',
+        model_latency: Optional[Dict[str, str]] = None,
+        error_rate: float = 0.0,
+        error: str = 'unavailable',
+        chunk_ms: Optional[float] = None,
+        deadline_s: float = 30.0,
+        seed: int = 1,
+        strict: bool = False,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        if error not in ('unavailable', 'resource-exhausted', 'deadline-exceeded'):
+            raise ValueError(f"Unknown injected error '{error}'")
+        self.path = path
+        self.latency = parse_latency(latency, seed)
+        self.model_latency = {
+            name: parse_latency(spec, seed + i + 2)
+            for i, (name, spec) in enumerate(sorted((model_latency or {}).items()))
+        }
+        self.error_rate = error_rate
+        self.error = error
+        self.chunk_ms = chunk_ms
+        self.deadline_s = deadline_s
+        self.strict = strict
+        self.sleep = sleep
+
+        self._rng = np.random.default_rng(seed + 1)
+        self._lock = threading.Lock()
+        self._by_key: Optional[Dict[str, Dict]] = None
+        self._by_kind: Dict[str, List[Dict]] = {}
+
+        self.calls = 0
+        self.misses = 0
+        self.injected_errors = 0
+
+    def _load(self):
+        if self._by_key is not None:
+            return
+        with self._lock:
+            if self._by_key is not None:
+                return
+            by_key, by_kind = {}, {}
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if 'error' in record:
+                        continue
+                    record.setdefault('key', prompt_key(record['kind'], record.get('model', 'gemini-pro'), record['prompt']))
+                    by_key[record['key']] = record
+                    by_kind.setdefault(record['kind'], []).append(record)
+            if not by_key:
+                raise ValueError(f"Cassette {self.path} has no replayable records")
+            self._by_kind = by_kind
+            self._by_key = by_key
+
+    def warm_up(self):
+        self._load()
+
+    def model(self, name: str = 'gemini-pro'):
+        self._load()
+        return _ReplayModel(self, name)
+
+    def _find(self, kind: str, model: str, prompt: str) -> Dict:
+        key = prompt_key(kind, model, prompt)
+        record = self._by_key.get(key)
+        if record is not None:
+            return record
+        with self._lock:
+            self.misses += 1
+        if self.strict:
+            raise CassetteMiss(f"No recording for {kind} prompt {key}")
+        candidates = self._by_kind.get(kind) or [r for records in self._by_kind.values() for r in records]
+        return candidates[int(key, 16) % len(candidates)]
+
+    def respond(self, kind: str, model: str, prompt, stream: bool) -> ModelReply:
+        record = self._find(kind, model, _prompt_text(prompt))
+        latency = self.model_latency.get(model, self.latency)
+        with self._lock:
+            self.calls += 1
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+            if fail:
+                self.injected_errors += 1
+
+        if fail:
+            if self.error == 'deadline-exceeded':
+                self.sleep(self.deadline_s)
+                raise TransportError('DeadlineExceeded', "Deadline exceeded (injected)")
+            self.sleep(latency(record.get('latency_ms')) * 0.1)
+            code = 'ServiceUnavailable' if self.error == 'unavailable' else 'ResourceExhausted'
+            raise TransportError(code, "Injected upstream failure")
+
+        self.sleep(latency(record.get('latency_ms')))
+        text = record['text']
+        if not stream:
+            return ModelReply(text=text)
+        return ModelReply(text=text, _stream=self._stream(record))
+
+    def _stream(self, record: Dict) -> Iterator[Chunk]:
+        chunks = record.get('chunks')
+        if not chunks:
+            text = record['text']
+            chunks = [{'text': text[i:i + REPLAY_CHUNK_CHARS]} for i in range(0, len(text), REPLAY_CHUNK_CHARS)] or [{'text': ''}]
+        previous = chunks[0].get('offset_ms', 0.0)
+        for i, chunk in enumerate(chunks):
+            if i:
+                if self.chunk_ms is not None:
+                    self.sleep(self.chunk_ms / 1000.0)
+                else:
+                    offset = chunk.get('offset_ms', previous)
+                    self.sleep(max(offset - previous, 0.0) / 1000.0)
+                    previous = offset
+            yield Chunk(chunk['text'])
+
+    def stats(self) -> Dict:
+        return {
+            'mode': self.mode,
+            'cassette': self.path,
+            'calls': self.calls,
+            'misses': self.misses,
+            'injected_errors': self.injected_errors
+        }
+
+
+def parse_model_latency(spec: Optional[str]) -> Dict[str, str]:
+    """Parse 'model=spec;model=spec' into model name -> latency spec"""
+    specs = {}
+    for item in (spec or '').split(';'):
+        if not item.strip():
+            continue
+        name, _, latency = item.partition('=')
+        if not name.strip() or not latency.strip():
+            raise ValueError(f"Invalid model latency '{item}'; expected model=spec")
+        specs[name.strip()] = latency.strip()
+    return specs
+
+
+def transport_mode() -> str:
+    mode = os.getenv('GEMINI_TRANSPORT', 'live').lower()
+    if mode not in TRANSPORT_MODES:
+        raise ValueError(f"GEMINI_TRANSPORT must be one of {', '.join(TRANSPORT_MODES)}, not '{mode}'")
+    return mode
+
+
+def transport_from_env(api_key: str = '') -> Optional[ModelTransport]:
+    """
+    Build the transport selected by GEMINI_TRANSPORT
+
+    Returns:
+        None when live or record mode has no API key (callers fall back as before)
+    """
+    mode = transport_mode()
+    cassette = os.getenv('GEMINI_CASSETTE', DEFAULT_RECORDING if mode == 'record' else DEFAULT_CASSETTE)
+
+    if mode == 'replay':
+        chunk_ms = os.getenv('GEMINI_REPLAY_CHUNK_MS')
+        return ReplayTransport(
+            cassette,
+            latency=os.getenv('GEMINI_REPLAY_LATENCY', 'recorded'),
+            model_latency=parse_model_latency(os.getenv('GEMINI_REPLAY_MODEL_LATENCY')),
+            error_rate=float(os.getenv('GEMINI_REPLAY_ERROR_RATE', '0')),
+            error=os.getenv('GEMINI_REPLAY_ERROR', 'unavailable'),
+            chunk_ms=float(chunk_ms) if chunk_ms else None,
+            seed=int(os.getenv('GEMINI_REPLAY_SEED', '1'))
+        )
+    if not api_key:
+        return None
+    live = LiveTransport(api_key)
+    return RecordingTransport(live, cassette) if mode == 'record' else live
+
+
+_shared: Dict[str, Optional[ModelTransport]] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_transport(api_key: str = '') -> Optional[ModelTransport]:
+    """One transport per process and API key, so cassettes are loaded and appended to once"""
+    if api_key not in _shared:
+        with _shared_lock:
+            if api_key not in _shared:
+                _shared[api_key] = transport_from_env(api_key)
+    return _shared[api_key]
@@ -0,0 +1,462 @@
+"""
+Field Ownership Analytics
+Player ownership, pair stacks and lineup uniqueness across a contest's entries
+
+Entries are ingested in batches, either as packed (entries, slots) player-ID
+matrices padded with -1 (the settlement scorer's format) or as bitset rows over
+a fixed player universe. All counts are kept incrementally, so a batch costs
+time proportional to its own size:
+
+- ownership: per-player appearance counts, one bincount over dense player indexes
+- stacks: every in-lineup pair encoded as lo << 32 | hi; a batch's codes are
+  counted once and merged into a sorted code table
+- duplicates: an order-independent 64-bit hash of each lineup's player set,
+  counted the same way
+
+Uniqueness of a lineup is how many field entries share its exact player set,
+plus -sum(log10(ownership)): minus the log10 chance that an entry drawing players
+at field ownership would contain all of them. Higher is more contrarian. ownership() also serves as
+the leverage signal for lineup optimization.
+
+ContestFields holds the fields of recent contests in one process;
+SQLiteContestFields shares them through a SQLite file so entries posted to any
+worker count towards every worker's field. contest_fields_from_env() picks one
+from CONTEST_STORE_PATH.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from settlement_scorer import EMPTY_SLOT
+
+# Ownership assumed for players nobody has picked yet (a fraction of one entry)
+UNOWNED_FLOOR = 0.5
+
+# Bits set per byte value, for popcounts over bitset rows
+_POPCOUNT8 = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.int64)
+
+_MIX_MULTIPLIER = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """Bijective 64-bit mix so summed player hashes do not collide on small IDs"""
+    with np.errstate(over='ignore'):
+        z = values.astype(np.uint64) * _MIX_GAMMA + _MIX_GAMMA
+        z = (z ^ (z >> np.uint64(30))) * _MIX_MULTIPLIER
+        return z ^ (z >> np.uint64(31))
+
+
+def _merge_counts(
+    codes: np.ndarray,
+    counts: np.ndarray,
+    new_codes: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Add occurrences of new_codes to a sorted (codes, counts) table"""
+    unique, added = np.unique(new_codes, return_counts=True)
+    positions = np.searchsorted(codes, unique)
+    hit = positions < len(codes)
+    hit[hit] = codes[positions[hit]] == unique[hit]
+    counts[positions[hit]] += added[hit]
+    if not hit.all():
+        codes = np.insert(codes, positions[~hit], unique[~hit])
+        counts = np.insert(counts, positions[~hit], added[~hit])
+    return codes, counts
+
+
+def bitsets_to_lineups(bitsets: np.ndarray, universe: Sequence[int]) -> np.ndarray:
+    """
+    Convert bitset rows to a packed (entries, slots) player-ID matrix
+
+    Args:
+        bitsets: (entries, bytes) uint8, bit j (big-endian within each byte) set
+            when universe[j] is in the lineup
+        universe: Player ID for every bit position
+    """
+    universe = np.asarray(universe, dtype=np.int64)
+    bitsets = np.ascontiguousarray(bitsets, dtype=np.uint8)
+    sizes = _POPCOUNT8[bitsets].sum(axis=1)
+    rows, columns = np.nonzero(np.unpackbits(bitsets, axis=1, count=len(universe)))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    slot = np.arange(len(rows)) - np.repeat(starts, sizes)
+
+    packed = np.full((len(bitsets), int(sizes.max(initial=0))), EMPTY_SLOT, dtype=np.int64)
+    packed[rows, slot] = universe[columns]
+    return packed
+
+
+def _check_lineups(lineups) -> np.ndarray:
+    """
+    Raises:
+        ValueError: If the batch is not an (entries, slots) matrix or a lineup
+            lists the same player twice (it would count twice towards ownership)
+    """
+    lineups = np.asarray(lineups, dtype=np.int64)
+    if lineups.ndim != 2:
+        raise ValueError("Lineups must be an (entries, slots) matrix")
+    ordered = np.sort(lineups, axis=1)
+    repeated = (ordered[:, 1:] == ordered[:, :-1]) & (ordered[:, 1:] != EMPTY_SLOT)
+    if repeated.any():
+        row = int(np.nonzero(repeated.any(axis=1))[0][0])
+        player_id = int(ordered[row, 1:][repeated[row]][0])
+        raise ValueError(f"Lineup {row} lists player {player_id} more than once")
+    return lineups
+
+
+class FieldOwnership:
+    """Incremental ownership, stack and duplicate counts for one contest field"""
+
+    def __init__(self):
+        self.entries = 0
+        self._lock = threading.Lock()
+        # Dense index <-> player ID, plus a sorted view for vectorized lookups
+        self._player_ids = np.empty(0, dtype=np.int64)
+        self._sorted_ids = np.empty(0, dtype=np.int64)
+        self._sorted_dense = np.empty(0, dtype=np.int64)
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._pair_codes = np.empty(0, dtype=np.int64)
+        self._pair_counts = np.empty(0, dtype=np.int64)
+        self._lineup_keys = np.empty(0, dtype=np.uint64)
+        self._lineup_counts = np.empty(0, dtype=np.int64)
+
+    def _lookup(self, player_ids: np.ndarray) -> np.ndarray:
+        """Dense indexes for player IDs, -1 where unknown"""
+        if not len(self._sorted_ids):
+            return np.full(player_ids.shape, -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self._sorted_ids, player_ids), len(self._sorted_ids) - 1)
+        return np.where(self._sorted_ids[positions] == player_ids, self._sorted_dense[positions], -1)
+
+    def _dense(self, player_ids: np.ndarray) -> np.ndarray:
+        """Dense indexes, registering new players"""
+        dense = self._lookup(player_ids)
+        new_ids = np.unique(player_ids[(dense < 0) & (player_ids != EMPTY_SLOT)])
+        if len(new_ids):
+            self._player_ids = np.concatenate([self._player_ids, new_ids])
+            self._counts = np.concatenate([self._counts, np.zeros(len(new_ids), dtype=np.int64)])
+            order = np.argsort(self._player_ids, kind='stable')
+            self._sorted_ids, self._sorted_dense = self._player_ids[order], order
+            dense = self._lookup(player_ids)
+        return np.where(player_ids == EMPTY_SLOT, EMPTY_SLOT, dense)
+
+    @staticmethod
+    def _lineup_key(dense: np.ndarray) -> np.ndarray:
+        with np.errstate(over='ignore'):
+            return np.where(dense >= 0, _mix64(dense), np.uint64(0)).sum(axis=1, dtype=np.uint64)
+
+    def ingest(self, lineups: np.ndarray):
+        """
+        Add a batch of entries: (entries, slots) player IDs padded with -1
+
+        Raises:
+            ValueError: If any lineup repeats a player; nothing is added then
+        """
+        lineups = _check_lineups(lineups)
+        if not len(lineups):
+            return
+
+        with self._lock:
+            dense = np.sort(self._dense(lineups), axis=1)
+            picked = dense[dense >= 0]
+            self._counts += np.bincount(picked, minlength=len(self._counts))
+
+            slots = dense.shape[1]
+            first, second = np.triu_indices(slots, 1)
+            lo, hi = dense[:, first], dense[:, second]
+            valid = (lo >= 0) & (lo != hi)
+            self._pair_codes, self._pair_counts = _merge_counts(
+                self._pair_codes, self._pair_counts, (lo[valid] << 32) | hi[valid]
+            )
+            self._lineup_keys, self._lineup_counts = _merge_counts(
+                self._lineup_keys, self._lineup_counts, self._lineup_key(dense)
+            )
+            self.entries += len(lineups)
+
+    def ingest_bitsets(self, bitsets: np.ndarray, universe: Sequence[int]):
+        """Add a batch of entries given as bitset rows over `universe` (see bitsets_to_lineups)"""
+        self.ingest(bitsets_to_lineups(bitsets, universe))
+
+    def ownership(self, player_ids: Sequence[int]) -> np.ndarray:
+        """Share of entries containing each player (0 for players nobody picked)"""
+        player_ids = np.asarray(player_ids, dtype=np.int64)
+        with self._lock:
+            if not self.entries:
+                return np.zeros(len(player_ids))
+            dense = self._lookup(player_ids)
+            counts = np.where(dense >= 0, self._counts[np.maximum(dense, 0)], 0)
+            return counts / self.entries
+
+    def top_owned(self, k: int = 20) -> List[Dict]:
+        with self._lock:
+            order = np.argsort(-self._counts, kind='stable')[:k]
+            return [
+                {'playerId': int(self._player_ids[i]), 'count': int(self._counts[i]),
+                 'ownership': float(self._counts[i] / max(self.entries, 1))}
+                for i in order
+            ]
+
+    def stacks(self, k: int = 20) -> List[Dict]:
+        """Most common player pairs across the field"""
+        with self._lock:
+            order = np.argsort(-self._pair_counts, kind='stable')[:k]
+            codes = self._pair_codes[order]
+            a, b = self._player_ids[codes >> 32], self._player_ids[codes & 0xFFFFFFFF]
+            return [
+                {'players': sorted((int(x), int(y))), 'count': int(count),
+                 'frequency': float(count / max(self.entries, 1))}
+                for x, y, count in zip(a, b, self._pair_counts[order])
+            ]
+
+    def uniqueness(self, lineups: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Uniqueness of each lineup against the field
+
+        Returns:
+            Dictionary of per-lineup arrays: 'duplicates' (field entries with the
+            same player set), 'ownershipSum' and 'logUniqueness'
+
+        Raises:
+            ValueError: If any lineup repeats a player
+        """
+        lineups = _check_lineups(np.atleast_2d(lineups))
+        with self._lock:
+            dense = self._lookup(lineups)
+            known = dense >= 0
+            counts = np.where(known, self._counts[np.maximum(dense, 0)], 0).astype(np.float64)
+            entries = max(self.entries, 1)
+
+            # A lineup with an unseen player cannot duplicate any entry
+            keys = self._lineup_key(dense)
+            positions = np.minimum(np.searchsorted(self._lineup_keys, keys), max(len(self._lineup_keys) - 1, 0))
+            duplicates = np.zeros(len(lineups), dtype=np.int64)
+            if len(self._lineup_keys):
+                match = (self._lineup_keys[positions] == keys) & (known | (lineups == EMPTY_SLOT)).all(axis=1)
+                duplicates[match] = self._lineup_counts[positions[match]]
+
+        filled = lineups != EMPTY_SLOT
+        ownership = np.where(filled, counts / entries, 0.0)
+        floored = np.maximum(counts, UNOWNED_FLOOR) / entries
+        return {
+            'duplicates': duplicates,
+            'ownershipSum': ownership.sum(axis=1),
+            'logUniqueness': np.where(filled, -np.log10(np.minimum(floored, 1.0)), 0.0).sum(axis=1)
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': self.entries,
+                'players': len(self._player_ids),
+                'pairs': len(self._pair_codes),
+                'distinct_lineups': len(self._lineup_keys)
+            }
+
+
+class ContestFields:
+    """
+    Field ownership per contest, kept in this process
+
+    At most `max_contests` fields are held (the least recently used goes
+    first), and a contest that received no entries for `idle_ttl_s` is
+    dropped. Only this process sees the entries; use SQLiteContestFields to
+    share them across workers.
+    """
+
+    def __init__(self, max_contests: int = 256, idle_ttl_s: float = 86400.0):
+        if max_contests < 1:
+            raise ValueError("max_contests must be at least 1")
+        self.max_contests = max_contests
+        self.idle_ttl_s = idle_ttl_s
+        self._lock = threading.Lock()
+        # contest ID -> (field, last ingest time), least recently used first
+        self._fields: "OrderedDict[str, Tuple[FieldOwnership, float]]" = OrderedDict()
+        self.evicted = 0
+
+    def _evict(self, now: float):
+        idle = [key for key, (_, last_ingest) in self._fields.items() if now - last_ingest > self.idle_ttl_s]
+        for key in idle:
+            del self._fields[key]
+        self.evicted += len(idle)
+        while len(self._fields) > self.max_contests:
+            self._fields.popitem(last=False)
+            self.evicted += 1
+
+    def get(self, contest_id) -> Optional[FieldOwnership]:
+        """The contest's field, or None if it has no entries (or was evicted)"""
+        key = str(contest_id)
+        with self._lock:
+            self._evict(time.time())
+            if key not in self._fields:
+                return None
+            self._fields.move_to_end(key)
+            return self._fields[key][0]
+
+    def ingest(self, contest_id, lineups: np.ndarray) -> FieldOwnership:
+        """
+        Add a batch of entries to the contest's field, creating it if needed
+
+        Raises:
+            ValueError: If the batch is malformed or a lineup repeats a player
+        """
+        lineups = _check_lineups(lineups)
+        key = str(contest_id)
+        now = time.time()
+        with self._lock:
+            field = self._fields[key][0] if key in self._fields else FieldOwnership()
+            self._fields[key] = (field, now)
+            self._fields.move_to_end(key)
+            self._evict(now)
+        field.ingest(lineups)
+        return field
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def stats(self) -> Dict:
+        return {
+            'contests': len(self),
+            'max_contests': self.max_contests,
+            'idle_ttl_s': self.idle_ttl_s,
+            'evicted': self.evicted
+        }
+
+
+class SQLiteContestFields(ContestFields):
+    """
+    Contest entries shared through a SQLite file (WAL mode)
+
+    Every entry batch is stored once; each worker folds the batches it has not
+    seen yet into its own FieldOwnership, re-checking the file at most every
+    `check_interval` seconds per contest. Idle and least recently used
+    contests are deleted from the file on write (see ContestFields for the
+    limits); workers drop their copy when they notice.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_contests: int = 256,
+        idle_ttl_s: float = 86400.0,
+        check_interval: float = 0.5
+    ):
+        super().__init__(max_contests, idle_ttl_s)
+        self.path = path
+        self.check_interval = check_interval
+        self._local = threading.local()
+        # contest ID -> (field, first batch seq, last applied seq, checked_at), least recently used first
+        self._cached: "OrderedDict[str, Tuple[FieldOwnership, int, int, float]]" = OrderedDict()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS contests ("
+                "contest_id TEXT PRIMARY KEY, "
+                "first_seq INTEGER NOT NULL, "
+                "last_ingest REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS contest_batches ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "contest_id TEXT NOT NULL, "
+                "slots INTEGER NOT NULL, "
+                "lineups BLOB NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS contest_batches_contest ON contest_batches (contest_id, seq)")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _sync(self, key: str, force: bool = False) -> Optional[FieldOwnership]:
+        """Local field for the contest with every stored batch applied"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cached.get(key)
+            if cached is not None and not force and now - cached[3] < self.check_interval:
+                self._cached.move_to_end(key)
+                return cached[0]
+
+            connection = self._connection()
+            row = connection.execute(
+                "SELECT first_seq FROM contests WHERE contest_id = ? AND last_ingest >= ?",
+                (key, time.time() - self.idle_ttl_s)
+            ).fetchone()
+            if row is None:
+                self._cached.pop(key, None)
+                return None
+            # A contest evicted and started again has new batches only
+            if cached is None or cached[1] != row[0]:
+                cached = (FieldOwnership(), row[0], 0, now)
+            field, first_seq, last_seq, _ = cached
+            for seq, slots, blob in connection.execute(
+                "SELECT seq, slots, lineups FROM contest_batches WHERE contest_id = ? AND seq > ? ORDER BY seq",
+                (key, last_seq)
+            ):
+                field.ingest(np.frombuffer(blob, dtype='<i8').reshape(-1, slots))
+                last_seq = seq
+            self._cached[key] = (field, first_seq, last_seq, now)
+            self._cached.move_to_end(key)
+            while len(self._cached) > self.max_contests:
+                self._cached.popitem(last=False)
+            return field
+
+    def get(self, contest_id) -> Optional[FieldOwnership]:
+        return self._sync(str(contest_id))
+
+    def ingest(self, contest_id, lineups: np.ndarray) -> FieldOwnership:
+        lineups = _check_lineups(lineups)
+        key = str(contest_id)
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            seq = connection.execute(
+                "INSERT INTO contest_batches (contest_id, slots, lineups) VALUES (?, ?, ?)",
+                (key, lineups.shape[1], np.ascontiguousarray(lineups, dtype='<i8').tobytes())
+            ).lastrowid
+            connection.execute(
+                "INSERT INTO contests (contest_id, first_seq, last_ingest) VALUES (?, ?, ?) "
+                "ON CONFLICT (contest_id) DO UPDATE SET last_ingest = excluded.last_ingest",
+                (key, seq, now)
+            )
+            evicted = [row[0] for row in connection.execute(
+                "SELECT contest_id FROM contests WHERE last_ingest < ? OR contest_id IN "
+                "(SELECT contest_id FROM contests ORDER BY last_ingest DESC LIMIT -1 OFFSET ?)",
+                (now - self.idle_ttl_s, self.max_contests)
+            )]
+            for evicted_id in evicted:
+                connection.execute("DELETE FROM contests WHERE contest_id = ?", (evicted_id,))
+                connection.execute("DELETE FROM contest_batches WHERE contest_id = ?", (evicted_id,))
+        with self._lock:
+            self.evicted += len(evicted)
+            for evicted_id in evicted:
+                self._cached.pop(evicted_id, None)
+        return self._sync(key, force=True)
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM contests").fetchone()[0]
+
+
+def contest_fields_from_env(prefix: str = 'CONTEST', **defaults) -> ContestFields:
+    """
+    Contest fields selected by CONTEST_STORE_PATH, bounded by CONTEST_MAX_CONTESTS
+    and CONTEST_IDLE_TTL_S
+
+    With a path, entries are shared through that SQLite file by every worker.
+    Without one they stay in this process.
+    """
+    kwargs = dict(defaults)
+    for name, cast in (('max_contests', int), ('idle_ttl_s', float)):
+        value = os.environ.get(f"{prefix}_{name.upper()}")
+        if value is not None:
+            kwargs[name] = cast(value)
+    path = os.environ.get(f"{prefix}_STORE_PATH", '')
+    return SQLiteContestFields(path, **kwargs) if path else ContestFields(**kwargs)
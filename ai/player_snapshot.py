@@ -0,0 +1,246 @@
+"""
+Memory-mapped Columnar Player Snapshot
+One read-only file of player stats that every worker process maps and shares
+
+Layout (all sections 64-byte aligned):
+    magic 'FFFSNAP1' | uint32 header length | JSON header | columns...
+
+Numeric columns are fixed width, names and teams are stored as a string table
+(int64 offsets + UTF-8 bytes), and an id->row index (sorted ids + rows) supports
+vectorized lookups. Readers get zero-copy NumPy views over the mapping, so
+opening a snapshot is O(1) and the pages are shared through the OS page cache.
+New snapshots are published by writing a temp file and os.replace()-ing it over
+the old one; readers pick up the new inode on their next refresh while
+in-flight requests keep using the old mapping.
+
+Usage:
+    python player_snapshot.py build --players 1000000 --out players.snap
+    python player_snapshot.py info players.snap
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from slate_generator import PlayerSlate, generate_slate
+
+MAGIC = b'FFFSNAP1'
+ALIGNMENT = 64
+
+# Column name -> on-disk dtype for the numeric PlayerSlate fields
+NUMERIC_COLUMNS: Dict[str, str] = {
+    'player_id': '<i8',
+    'position': 'i1',
+    'recent_performance': '<f8',
+    'market_value': '<f8',
+    'consistency': '<f8',
+    'injury_risk': '<f8',
+    'trending': 'i1',
+}
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _string_table(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype='<i8')
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def write_snapshot(
+    path: str,
+    slate: PlayerSlate,
+    names: Optional[Sequence[str]] = None,
+    teams: Optional[Sequence[str]] = None,
+    version: Optional[str] = None
+) -> str:
+    """
+    Write a snapshot and atomically publish it at `path`
+
+    Returns:
+        The snapshot version recorded in the header
+    """
+    version = version or f"{int(time.time() * 1000)}-{len(slate)}"
+    order = np.argsort(slate.player_id, kind='stable')
+
+    arrays: Dict[str, np.ndarray] = {
+        name: np.ascontiguousarray(getattr(slate, name), dtype=dtype)
+        for name, dtype in NUMERIC_COLUMNS.items()
+    }
+    arrays['index_ids'] = arrays['player_id'][order]
+    arrays['index_rows'] = order.astype('<i8')
+    for label, values in (('name', names), ('team', teams)):
+        if values is not None:
+            arrays[f'{label}_offsets'], arrays[f'{label}_bytes'] = _string_table(values)
+
+    # Header size depends on the offsets it contains, so fix a generous size first
+    columns = {}
+    header_size = _align(len(MAGIC) + 4 + 256 + 96 * len(arrays))
+    offset = header_size
+    for name, array in arrays.items():
+        columns[name] = {'dtype': array.dtype.str, 'offset': offset, 'count': int(array.size)}
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps({
+        'version': version,
+        'rows': len(slate),
+        'created_at': time.time(),
+        'columns': columns
+    }).encode('utf-8')
+    if len(MAGIC) + 4 + len(header) > header_size:
+        raise ValueError("Snapshot header overflow")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.snapshot-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for name, array in arrays.items():
+                f.seek(columns[name]['offset'])
+                f.write(array.tobytes())
+            f.truncate(offset)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    return version
+
+
+class PlayerSnapshot:
+    """Read-only view over a snapshot file; all columns are zero-copy memmap views"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a player snapshot")
+        (header_len,) = struct.unpack_from('<I', self._mmap, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(self._mmap[start:start + header_len])
+
+        self.version: str = header['version']
+        self.rows: int = header['rows']
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.frombuffer(self._mmap, dtype=spec['dtype'], count=spec['count'], offset=spec['offset'])
+            for name, spec in header['columns'].items()
+        }
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def lookup_rows(self, player_ids) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Map player IDs to row numbers
+
+        Returns:
+            Tuple of (rows, found) where rows is only meaningful where found is True
+        """
+        ids = np.asarray(player_ids, dtype=np.int64)
+        index_ids = self.columns['index_ids']
+        positions = np.searchsorted(index_ids, ids)
+        positions = np.minimum(positions, max(len(index_ids) - 1, 0))
+        found = index_ids[positions] == ids if len(index_ids) else np.zeros(len(ids), dtype=bool)
+        return self.columns['index_rows'][positions], found
+
+    def slate(self, rows: Optional[np.ndarray] = None) -> PlayerSlate:
+        """Columns for the given rows (copied), or zero-copy views of the whole snapshot"""
+        if rows is None:
+            return PlayerSlate(**{name: self.columns[name] for name in NUMERIC_COLUMNS})
+        return PlayerSlate(**{name: self.columns[name][rows] for name in NUMERIC_COLUMNS})
+
+    def _string(self, label: str, row: int) -> Optional[str]:
+        offsets = self.columns.get(f'{label}_offsets')
+        if offsets is None:
+            return None
+        start, end = offsets[row], offsets[row + 1]
+        return self.columns[f'{label}_bytes'][start:end].tobytes().decode('utf-8')
+
+    def name(self, row: int) -> Optional[str]:
+        return self._string('name', row)
+
+    def team(self, row: int) -> Optional[str]:
+        return self._string('team', row)
+
+
+class SnapshotReader:
+    """
+    Shared handle that follows atomic swaps of a snapshot path
+
+    current() re-stats the path at most every `check_interval` seconds and
+    reopens it when the inode changes. While the path is missing or unreadable
+    it keeps the last snapshot it opened, or returns None if there was none.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot: Optional[PlayerSnapshot] = None
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[PlayerSnapshot]:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._snapshot
+
+        with self._lock:
+            self._checked_at = now
+            try:
+                inode = os.stat(self.path).st_ino
+                if self._snapshot is None or self._snapshot.inode != inode:
+                    self._snapshot = PlayerSnapshot(self.path)
+            except (OSError, ValueError):
+                pass
+            return self._snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect player snapshots")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="Publish a snapshot of the synthetic slate")
+    build.add_argument('--players', type=int, default=100000)
+    build.add_argument('--seed', type=int, default=None)
+    build.add_argument('--out', default='players.snap')
+
+    info = commands.add_parser('info', help="Print a snapshot's header")
+    info.add_argument('path')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        kwargs = {'seed': args.seed} if args.seed is not None else {}
+        slate = generate_slate(n_players=args.players, **kwargs)
+        version = write_snapshot(args.out, slate)
+        print(f"✅ Published {len(slate):,} players to {args.out} (version {version})")
+    else:
+        snapshot = PlayerSnapshot(args.path)
+        size_mb = os.path.getsize(args.path) / 1e6
+        print(f"{args.path}: version {snapshot.version}, {len(snapshot):,} rows, {size_mb:.1f} MB")
+        for name, column in snapshot.columns.items():
+            print(f"  {name:<20} {column.dtype.str:<5} {column.size:,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+"""
+Precomputed League Lineups
+Offline stage that scores each league's pool and stores its best lineups per strategy
+
+Most predict-lineup traffic for a league repeats the same pool, positions and one
+of a few strategies. This job builds those answers ahead of time whenever the
+stats change: for every configured league it fetches the pool's stats once,
+scores every strategy in one pass, and stores the scored pool plus the best
+lineup per strategy. Each league's artifact is a JSON file published atomically
+(temp file + os.replace) and stamped with the stats version it was built from.
+
+The lineup service reads artifacts through PrecomputedLineups. A hit is served
+only if the stats version matches and the strategy still has the same
+definition. Anything else falls through to the live path, so a stale or
+missing artifact costs a recomputation, never a wrong answer.
+
+Leagues file (JSON list):
+    [{"leagueId": 1, "availablePlayers": [1, 2, ...], "positions": ["PG", "SG", "SF", "PF", "C"],
+      "strategies": ["balanced", "high-risk", "conservative"]}]
+
+Usage:
+    python precompute.py run --leagues leagues.json --out precomputed
+    python precompute.py watch --leagues leagues.json --out precomputed --interval 5
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from strategies import Strategy
+
+ARTIFACT_FORMAT = 1
+
+DEFAULT_STRATEGIES = ('balanced', 'high-risk', 'conservative')
+
+# League IDs become file names, so only plain identifiers get artifacts
+_LEAGUE_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def pool_key(player_ids: Sequence[int]) -> str:
+    """Order-insensitive key for a player pool (lineups depend only on its members)"""
+    ids = np.unique(np.asarray(player_ids, dtype=np.int64))
+    return hashlib.blake2b(ids.tobytes(), digest_size=12).hexdigest()
+
+
+def strategy_fingerprint(strategy: Strategy) -> str:
+    """Changes whenever a strategy's weights, modifiers or floor change"""
+    definition = json.dumps(strategy.to_dict(), sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(definition.encode(), digest_size=8).hexdigest()
+
+
+def artifact_path(directory: str, league_id) -> Optional[str]:
+    league = str(league_id)
+    if not _LEAGUE_ID_RE.match(league):
+        return None
+    return os.path.join(directory, f"league-{league}.json")
+
+
+def write_artifact(path: str, artifact: Dict):
+    """Publish an artifact atomically so readers never see a partial file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.league-', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(artifact, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class PrecomputedLineups:
+    """
+    Reader for a directory of league artifacts
+
+    Each league's file is re-stat'ed at most every `check_interval` seconds and
+    reparsed only when it was replaced, so a lookup is a dictionary probe.
+    """
+
+    def __init__(self, directory: str, check_interval: float = 1.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        # league -> (checked_at, file identity, {(pool key, positions): lineups})
+        self._leagues: Dict[str, Tuple[float, Optional[Tuple[int, int]], Dict]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _index(self, league_id) -> Dict:
+        league = str(league_id)
+        now = time.monotonic()
+        cached = self._leagues.get(league)
+        if cached is not None and now - cached[0] < self.check_interval:
+            return cached[2]
+
+        with self._lock:
+            path = artifact_path(self.directory, league)
+            try:
+                stat = os.stat(path) if path else None
+                identity = (stat.st_ino, stat.st_mtime_ns) if stat else None
+            except FileNotFoundError:
+                identity = None
+
+            cached = self._leagues.get(league)
+            if cached is not None and cached[1] == identity:
+                index = cached[2]
+            elif identity is None:
+                index = {}
+            else:
+                with open(path, encoding='utf-8') as f:
+                    artifact = json.load(f)
+                index = {
+                    (entry['poolKey'], tuple(entry['positions'])): (artifact['statsVersion'], entry['lineups'])
+                    for entry in artifact.get('entries', [])
+                } if artifact.get('format') == ARTIFACT_FORMAT else {}
+            self._leagues[league] = (now, identity, index)
+            return index
+
+    def lookup(
+        self,
+        league_id,
+        available_players: Sequence[int],
+        positions: Sequence[str],
+        strategies: Dict[str, str],
+        stats_version: str
+    ) -> Optional[Dict[str, Tuple[Dict[str, List[int]], float, str]]]:
+        """
+        Precomputed lineups for a request, or None unless every strategy is current
+
+        Args:
+            strategies: Strategy name -> strategy_fingerprint of its current definition
+            stats_version: Version of the stats the live path would use
+
+        Returns:
+            Dictionary of strategy -> (lineup, expected_score, rationale), as the live path returns
+        """
+        found = self._index(league_id).get((pool_key(available_players), tuple(positions)))
+        if found is None or found[0] != stats_version:
+            self.misses += 1
+            return None
+
+        results = {}
+        for name, fingerprint in strategies.items():
+            lineup = found[1].get(name)
+            if lineup is None or lineup['fingerprint'] != fingerprint:
+                self.misses += 1
+                return None
+            results[name] = (lineup['positions'], lineup['expectedScore'], lineup['rationale'])
+        self.hits += 1
+        return results
+
+    def stats(self) -> Dict:
+        return {
+            'directory': self.directory,
+            'leagues_loaded': sum(1 for _, _, index in self._leagues.values() if index),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+def build_league_artifact(league: Dict, version: str) -> Dict:
+    """Score one league's pool and pick its best lineup for every strategy"""
+    from lineup_engine import LineupRequest, get_player_slate, predict_lineups_for_slate, predictor
+
+    league_id = league['leagueId']
+    strategies = list(league.get('strategies') or DEFAULT_STRATEGIES)
+    pool = np.unique(np.asarray(league['availablePlayers'], dtype=np.int64))
+    positions = list(league['positions'])
+
+    slate = get_player_slate(pool)
+    scores = predictor.score_strategies(slate, strategies, league_id)
+    request = LineupRequest(pool.tolist(), positions, strategies, league_id)
+    lineups = predict_lineups_for_slate([request], slate)[0]
+
+    return {
+        'poolKey': pool_key(pool),
+        'positions': positions,
+        'scoredPool': {
+            'playerId': slate.player_id.tolist(),
+            'scores': {name: np.round(scores[:, j], 4).tolist() for j, name in enumerate(strategies)}
+        },
+        'lineups': {
+            name: {
+                'positions': lineup,
+                'expectedScore': expected_score,
+                'rationale': rationale,
+                'fingerprint': strategy_fingerprint(predictor.registry.get(name, league_id))
+            }
+            for name, (lineup, expected_score, rationale) in lineups.items()
+        }
+    }
+
+
+def precompute(leagues: List[Dict], out_dir: str) -> Dict[str, int]:
+    """
+    Build and publish artifacts for every configured league
+
+    A league may list several pools (one entry per pool/positions pair); they
+    all go into that league's single artifact.
+
+    Returns:
+        League ID -> number of (pool, positions) entries written
+    """
+    from lineup_engine import stats_version
+
+    version = stats_version()
+    by_league: Dict[str, List[Dict]] = {}
+    for league in leagues:
+        by_league.setdefault(str(league['leagueId']), []).append(league)
+
+    written = {}
+    for league_id, configs in by_league.items():
+        path = artifact_path(out_dir, league_id)
+        if path is None:
+            print(f"⚠️  Skipping league {league_id!r}: not a valid artifact name")
+            continue
+        entries = [build_league_artifact(config, version) for config in configs]
+        write_artifact(path, {
+            'format': ARTIFACT_FORMAT,
+            'leagueId': configs[0]['leagueId'],
+            'statsVersion': version,
+            'createdAt': time.time(),
+            'entries': entries
+        })
+        written[league_id] = len(entries)
+    return written
+
+
+def _load_leagues(path: str) -> List[Dict]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute per-league lineup artifacts")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, description in (
+        ('run', "Build every league's artifact once"),
+        ('watch', "Rebuild whenever the stats version or the leagues file changes")
+    ):
+        command = commands.add_parser(name, help=description)
+        command.add_argument('--leagues', required=True, help="JSON list of league pools")
+        command.add_argument('--out', default=os.environ.get('PRECOMPUTE_DIR', 'precomputed'))
+        if name == 'watch':
+            command.add_argument('--interval', type=float, default=5.0, help="Seconds between checks")
+    args = parser.parse_args()
+
+    from lineup_engine import stats_version
+
+    built_for = None
+    while True:
+        current = (stats_version(), os.stat(args.leagues).st_mtime_ns)
+        if current != built_for:
+            start = time.perf_counter()
+            written = precompute(_load_leagues(args.leagues), args.out)
+            elapsed = time.perf_counter() - start
+            print(f"✅ Stats {current[0]}: wrote {len(written)} league artifacts "
+                  f"({sum(written.values())} pools) to {args.out} in {elapsed:.2f}s")
+            built_for = current
+        if args.command == 'run':
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
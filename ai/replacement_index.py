@@ -0,0 +1,168 @@
+"""
+Replacement Player Index
+Nearest same-position substitutes for injured or slumping players, under a value cap
+
+Player feature vectors (performance, value, consistency, trend) are standardized
+and stored per position as contiguous float32 blocks sorted by market value. A
+value cap is then just a prefix of the block (binary search), and distances to
+every remaining candidate come from one BLAS matrix-vector product using
+|x - q|^2 = |x|^2 - 2 x.q + |q|^2 with precomputed norms. The k nearest are
+picked with argpartition, so a query is sub-millisecond for full-league slates
+without re-running lineup optimization.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from slate_generator import PlayerSlate
+
+# Feature columns used for PlayerSlate-based indexes
+SLATE_FEATURES = ('recent_performance', 'market_value', 'consistency', 'trend')
+
+
+def slate_features(slate: PlayerSlate) -> np.ndarray:
+    """(n_players, len(SLATE_FEATURES)) feature matrix; trend is -1 (down) to 1 (up)"""
+    return np.column_stack([
+        slate.recent_performance,
+        slate.market_value,
+        slate.consistency,
+        slate.trending.astype(np.float64) - 1.0
+    ]).astype(np.float64)
+
+
+@dataclass
+class Replacement:
+    player_id: int
+    distance: float
+    value: float
+
+
+class _PositionBlock:
+    __slots__ = ('ids', 'features', 'norms', 'values', 'risk')
+
+    def __init__(self, ids, features, values, risk):
+        order = np.argsort(values, kind='stable')
+        self.ids = ids[order]
+        self.features = np.ascontiguousarray(features[order], dtype=np.float32)
+        self.norms = np.einsum('ij,ij->i', self.features, self.features)
+        self.values = values[order]
+        self.risk = None if risk is None else risk[order]
+
+
+class ReplacementIndex:
+    """
+    Per-position nearest-neighbour index over standardized player features
+
+    Args:
+        player_ids: (n,) player IDs
+        positions: (n,) position labels or codes
+        features: (n, f) raw feature matrix
+        values: (n,) market values used for the cap
+        risk: Optional (n,) injury risk used by max_risk
+        weights: Optional (f,) per-feature importance applied after standardizing
+    """
+
+    def __init__(
+        self,
+        player_ids: np.ndarray,
+        positions: np.ndarray,
+        features: np.ndarray,
+        values: np.ndarray,
+        risk: Optional[np.ndarray] = None,
+        weights: Optional[Sequence[float]] = None
+    ):
+        player_ids = np.asarray(player_ids, dtype=np.int64)
+        positions = np.asarray(positions)
+        features = np.asarray(features, dtype=np.float64).reshape(len(player_ids), -1)
+        values = np.asarray(values, dtype=np.float64)
+        risk = None if risk is None else np.asarray(risk, dtype=np.float64)
+
+        self.mean = features.mean(axis=0) if len(features) else np.zeros(features.shape[1])
+        std = features.std(axis=0) if len(features) else np.ones(features.shape[1])
+        self.scale = np.where(std > 0, std, 1.0)
+        if weights is not None:
+            self.scale = self.scale / np.asarray(weights, dtype=np.float64)
+
+        standardized = (features - self.mean) / self.scale
+        self._blocks: Dict = {}
+        for position in np.unique(positions):
+            rows = np.flatnonzero(positions == position)
+            self._blocks[position.item()] = _PositionBlock(
+                player_ids[rows],
+                standardized[rows],
+                values[rows],
+                None if risk is None else risk[rows]
+            )
+        self.size = len(player_ids)
+
+    @classmethod
+    def from_slate(cls, slate: PlayerSlate, weights: Optional[Sequence[float]] = None) -> "ReplacementIndex":
+        return cls(
+            slate.player_id,
+            slate.position,
+            slate_features(slate),
+            slate.market_value,
+            risk=slate.injury_risk,
+            weights=weights
+        )
+
+    def __len__(self) -> int:
+        return self.size
+
+    def query(
+        self,
+        features: np.ndarray,
+        position,
+        k: int = 3,
+        max_value: Optional[float] = None,
+        exclude: Iterable[int] = (),
+        max_risk: Optional[float] = None
+    ) -> List[Replacement]:
+        """
+        The k players at `position` closest to the given raw feature vector
+
+        Args:
+            features: (f,) raw features of the player being replaced
+            position: Position label or code, as given to the constructor
+            k: Number of substitutes
+            max_value: Only consider players valued at or below this
+            exclude: Player IDs to skip (the player being replaced, current lineup)
+            max_risk: Only consider players with injury risk at or below this
+
+        Returns:
+            Substitutes ordered from most to least similar
+        """
+        block = self._blocks.get(position)
+        if block is None or k <= 0:
+            return []
+
+        end = len(block.ids) if max_value is None else int(np.searchsorted(block.values, max_value, side='right'))
+        if end == 0:
+            return []
+
+        query = ((np.asarray(features, dtype=np.float64) - self.mean) / self.scale).astype(np.float32)
+        distances = block.norms[:end] - 2.0 * (block.features[:end] @ query) + np.dot(query, query)
+        if max_risk is not None and block.risk is not None:
+            distances = np.where(block.risk[:end] <= max_risk, distances, np.inf)
+
+        # Over-fetch so excluded players can be dropped after selection
+        exclude = set(int(player_id) for player_id in exclude)
+        want = min(k + len(exclude), end)
+        nearest = np.argpartition(distances, want - 1)[:want] if want < end else np.arange(end)
+        nearest = nearest[np.lexsort((nearest, distances[nearest]))]
+
+        results = []
+        for row in nearest:
+            player_id = int(block.ids[row])
+            if player_id in exclude or not np.isfinite(distances[row]):
+                continue
+            results.append(Replacement(
+                player_id=player_id,
+                distance=float(np.sqrt(max(distances[row], 0.0))),
+                value=float(block.values[row])
+            ))
+            if len(results) == k:
+                break
+        return results
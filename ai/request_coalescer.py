@@ -0,0 +1,141 @@
+"""
+Micro-batching Request Coalescer
+Merges concurrent requests into one batch call and fans the results back out
+"""
+
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+
+class _Pending:
+    """A submitted item waiting for its batch result"""
+
+    __slots__ = ('item', 'result', 'error', 'event', 'lead')
+
+    def __init__(self, item: Any):
+        self.item = item
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.event = threading.Event()
+        self.lead = False
+
+
+class RequestCoalescer:
+    """
+    Leader/follower micro-batcher for threaded request handlers
+
+    The first caller to arrive while nothing is running becomes the leader and
+    executes the batch; callers arriving meanwhile queue up and are served by
+    the next batch. A lone request at low load runs immediately with no added
+    wait. Once concurrent traffic is observed, the leader also holds the batch
+    open for up to `window_ms` (or until `max_batch` requests) to grow it.
+    If a batch raises, its items are rerun one at a time, so an error only
+    reaches the request that caused it.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], List[Any]],
+        window_ms: float = 2.0,
+        max_batch: int = 64
+    ):
+        """
+        Args:
+            handler: Called with a list of items, returns one result per item in order
+            window_ms: Maximum time a batch is held open under load
+            max_batch: Batch size that closes the window early
+        """
+        self.handler = handler
+        self.window_s = window_ms / 1000.0
+        self.max_batch = max_batch
+
+        self._cond = threading.Condition()
+        self._queue: List[_Pending] = []
+        self._busy = False
+        self._last_batch_size = 0
+
+        self.batches = 0
+        self.items = 0
+        self.isolated = 0  # Failed batches rerun item by item
+
+    def submit(self, item: Any) -> Any:
+        """Run `item` through the handler as part of a batch and return its result"""
+        pending = _Pending(item)
+
+        with self._cond:
+            self._queue.append(pending)
+            if not self._busy:
+                self._busy = True
+                pending.lead = True
+            elif len(self._queue) >= self.max_batch:
+                self._cond.notify_all()
+
+        if not pending.lead:
+            pending.event.wait()
+
+        # Either we arrived first or a finishing leader promoted us
+        if pending.lead:
+            self._lead()
+
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _lead(self):
+        with self._cond:
+            under_load = self._last_batch_size > 1 or len(self._queue) > 1
+            if under_load and self.window_s > 0:
+                deadline = time.monotonic() + self.window_s
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+            batch = self._queue[:self.max_batch]
+            del self._queue[:self.max_batch]
+
+        try:
+            results = self.handler([pending.item for pending in batch])
+            for pending, result in zip(batch, results):
+                pending.result = result
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].error = e
+            else:
+                # Rerun items one by one so a bad item only fails its own request
+                self.isolated += 1
+                for pending in batch:
+                    try:
+                        pending.result = self.handler([pending.item])[0]
+                    except Exception as item_error:
+                        pending.error = item_error
+        except BaseException as e:
+            for pending in batch:
+                pending.error = e
+
+        with self._cond:
+            self.batches += 1
+            self.items += len(batch)
+            self._last_batch_size = len(batch)
+
+            # Hand leadership to the oldest waiting request, if any
+            if self._queue:
+                self._queue[0].lead = True
+                self._queue[0].event.set()
+            else:
+                self._busy = False
+
+        for pending in batch:
+            pending.lead = False
+            pending.event.set()
+
+    def stats(self) -> dict:
+        """Batch counters"""
+        return {
+            'batches': self.batches,
+            'requests': self.items,
+            'isolated_failures': self.isolated,
+            'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0
+        }
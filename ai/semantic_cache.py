@@ -0,0 +1,229 @@
+"""
+Semantic Response Cache for the Gemini chat assistant
+Serves repeated questions ("suggest a balanced lineup") from memory instead of
+making a new Gemini call, using a local hashing vectorizer and LSH buckets
+"""
+
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+class HashingVectorizer:
+    """Stateless text vectorizer: hashed word, word-bigram and char-trigram features"""
+
+    def __init__(self, n_features: int = 256):
+        self.n_features = n_features
+
+    def _features(self, text: str) -> List[str]:
+        words = _TOKEN_RE.findall(text.lower())
+        features = [f"w:{w}" for w in words]
+        features.extend(f"b:{a}_{b}" for a, b in zip(words, words[1:]))
+        for word in words:
+            padded = f"#{word}#"
+            features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return features
+
+    def transform(self, text: str) -> np.ndarray:
+        """
+        Vectorize a message into an L2-normalized float32 vector
+
+        crc32 is used instead of hash() so vectors are stable across processes.
+        """
+        vector = np.zeros(self.n_features, dtype=np.float32)
+        features = self._features(text)
+        if not features:
+            return vector
+
+        hashes = np.fromiter(
+            (zlib.crc32(f.encode('utf-8')) for f in features),
+            dtype=np.uint32,
+            count=len(features)
+        )
+        indices = (hashes % self.n_features).astype(np.intp)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, indices, signs)
+
+        norm = float(np.linalg.norm(vector))
+        if norm > 0:
+            vector /= norm
+        return vector
+
+
+@dataclass
+class CacheHit:
+    """A cached response together with how closely it matched"""
+    response: str
+    similarity: float
+    cached_message: str
+    age_seconds: float
+
+
+class SemanticCache:
+    """
+    Nearest-neighbor cache over recent (message, preference-state) pairs
+
+    Vectors live in one preallocated matrix. Random-hyperplane LSH tables,
+    keyed by preference scope, narrow each lookup to a few hundred candidate
+    rows which are then re-ranked by exact cosine similarity, so lookup cost
+    stays flat as the cache grows. Eviction is LRU with an optional TTL.
+    Putting a message already cached in the same scope replaces its entry.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 10000,
+        threshold: float = 0.9,
+        ttl_seconds: Optional[float] = 3600.0,
+        n_features: int = 256,
+        n_tables: int = 16,
+        n_bits: int = 12,
+        seed: int = 2024
+    ):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.vectorizer = HashingVectorizer(n_features)
+
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((n_tables * n_bits, n_features)).astype(np.float32)
+        self._bit_weights = (1 << np.arange(n_bits)).astype(np.int64)
+
+        self._vectors = np.zeros((capacity, n_features), dtype=np.float32)
+        self._messages: List[Optional[str]] = [None] * capacity
+        self._responses: List[Optional[str]] = [None] * capacity
+        self._created_at = np.zeros(capacity, dtype=np.float64)
+        self._slot_keys: List[Optional[Tuple[Tuple[str, int], ...]]] = [None] * capacity
+        self._exact: Dict[Tuple[str, str], int] = {}  # (scope, message) -> slot
+
+        self._buckets: List[Dict[Tuple[str, int], Set[int]]] = [{} for _ in range(n_tables)]
+        self._lru: "OrderedDict[int, None]" = OrderedDict()
+        self._free_slots = list(range(capacity - 1, -1, -1))
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _bucket_keys(self, vector: np.ndarray, scope: str) -> Tuple[Tuple[str, int], ...]:
+        bits = (self._planes @ vector > 0).reshape(self.n_tables, self.n_bits)
+        codes = bits.astype(np.int64) @ self._bit_weights
+        return tuple((scope, int(code)) for code in codes)
+
+    def _evict(self, slot: int):
+        for table, key in zip(self._buckets, self._slot_keys[slot]):
+            members = table.get(key)
+            if members is not None:
+                members.discard(slot)
+                if not members:
+                    del table[key]
+        self._exact.pop((self._slot_keys[slot][0][0], self._messages[slot]), None)
+        self._slot_keys[slot] = None
+        self._messages[slot] = None
+        self._responses[slot] = None
+        self._lru.pop(slot, None)
+        self._free_slots.append(slot)
+
+    def _is_expired(self, slot: int, now: float) -> bool:
+        return self.ttl_seconds is not None and now - self._created_at[slot] > self.ttl_seconds
+
+    def lookup(self, message: str, scope: str = "") -> Optional[CacheHit]:
+        """
+        Find the most similar cached message within the same preference scope
+
+        Returns:
+            CacheHit if a live entry is at or above the similarity threshold, else None
+        """
+        vector = self.vectorizer.transform(message)
+        now = time.time()
+
+        with self._lock:
+            keys = self._bucket_keys(vector, scope)
+            candidates: Set[int] = set()
+            for table, key in zip(self._buckets, keys):
+                members = table.get(key)
+                if members:
+                    candidates.update(members)
+
+            if not candidates:
+                self.misses += 1
+                return None
+
+            rows = np.fromiter(candidates, dtype=np.intp, count=len(candidates))
+            similarities = self._vectors[rows] @ vector
+            # Best match first; expired entries are evicted and the next one tried
+            for best in np.argsort(-similarities, kind='stable'):
+                slot = int(rows[best])
+                similarity = float(similarities[best])
+                if similarity < self.threshold:
+                    break
+                if self._is_expired(slot, now):
+                    self._evict(slot)
+                    continue
+
+                self._lru.move_to_end(slot)
+                self.hits += 1
+                return CacheHit(
+                    response=self._responses[slot],
+                    similarity=similarity,
+                    cached_message=self._messages[slot],
+                    age_seconds=float(now - self._created_at[slot])
+                )
+
+            self.misses += 1
+            return None
+
+    def put(self, message: str, response: str, scope: str = ""):
+        """Cache a response, evicting the least recently used entry when full"""
+        vector = self.vectorizer.transform(message)
+
+        with self._lock:
+            existing = self._exact.get((scope, message))
+            if existing is not None:
+                self._evict(existing)
+            if not self._free_slots:
+                oldest = next(iter(self._lru))
+                self._evict(oldest)
+
+            slot = self._free_slots.pop()
+            keys = self._bucket_keys(vector, scope)
+            for table, key in zip(self._buckets, keys):
+                table.setdefault(key, set()).add(slot)
+
+            self._vectors[slot] = vector
+            self._messages[slot] = message
+            self._responses[slot] = response
+            self._created_at[slot] = time.time()
+            self._slot_keys[slot] = keys
+            self._exact[(scope, message)] = slot
+            self._lru[slot] = None
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            for slot in list(self._lru):
+                self._evict(slot)
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    def stats(self) -> Dict:
+        """Cache size and hit statistics"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self),
+            'capacity': self.capacity,
+            'threshold': self.threshold,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0
+        }
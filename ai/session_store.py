@@ -0,0 +1,199 @@
+"""
+Session State Storage for the Gemini chat service
+Keeps chat preferences, compacted history and metadata outside the worker process
+so any uvicorn worker or replica can pick up a conversation
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+
+# Only the most recent turns are persisted; older context is dropped
+MAX_HISTORY_TURNS = 20
+MAX_TURN_CHARS = 2000
+
+
+@dataclass
+class SessionState:
+    session_id: str
+    preferences: Dict
+    history: List[Dict[str, str]] = field(default_factory=list)  # [{'role': 'user'|'model', 'text': ...}]
+    metadata: Dict = field(default_factory=dict)
+    version: int = 0
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, payload: str) -> "SessionState":
+        return cls(**json.loads(payload))
+
+
+def compact_history(history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Keep the last MAX_HISTORY_TURNS turns, each truncated to MAX_TURN_CHARS"""
+    return [
+        {'role': turn['role'], 'text': turn['text'][:MAX_TURN_CHARS]}
+        for turn in history[-MAX_HISTORY_TURNS:]
+    ]
+
+
+def worker_for_session(session_id: str, workers: int) -> int:
+    """
+    Map a session to a worker index with jump consistent hashing
+
+    Growing from n to n+1 workers only moves ~1/(n+1) of the sessions, so a
+    front proxy routing on this keeps most conversations on a warm worker.
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    key = zlib.crc32(session_id.encode('utf-8')) | (zlib.adler32(session_id.encode('utf-8')) << 32)
+    bucket, candidate = -1, 0
+    while candidate < workers:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return bucket
+
+
+class SessionStore(ABC):
+    """Interface for session state backends"""
+
+    backend = "base"
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[SessionState]:
+        ...
+
+    @abstractmethod
+    def version(self, session_id: str) -> Optional[int]:
+        """Current stored version, or None if the session does not exist"""
+
+    @abstractmethod
+    def save(self, state: SessionState) -> int:
+        """Persist state and return its new version"""
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        ...
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local store; the default for a single worker"""
+
+    backend = "memory"
+
+    def __init__(self):
+        self._states: Dict[str, str] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> Optional[SessionState]:
+        payload = self._states.get(session_id)
+        return SessionState.from_json(payload) if payload is not None else None
+
+    def version(self, session_id: str) -> Optional[int]:
+        return self._versions.get(session_id)
+
+    def save(self, state: SessionState) -> int:
+        with self._lock:
+            state.version = self._versions.get(state.session_id, 0) + 1
+            self._states[state.session_id] = state.to_json()
+            self._versions[state.session_id] = state.version
+        return state.version
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._states.pop(session_id, None)
+            self._versions.pop(session_id, None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    File-backed store shared by every worker on the same host
+
+    Connections are opened lazily, one per thread and process. A connection
+    must never cross fork() (gunicorn preloads the app in the master), so one
+    opened under another PID is abandoned and the worker reconnects.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, "
+                "version INTEGER NOT NULL, "
+                "state TEXT NOT NULL, "
+                "updated_at REAL NOT NULL)"
+            )
+            connection.commit()
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def load(self, session_id: str) -> Optional[SessionState]:
+        row = self._connection().execute(
+            "SELECT state, version FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        state = SessionState.from_json(row[0])
+        state.version = row[1]
+        return state
+
+    def version(self, session_id: str) -> Optional[int]:
+        row = self._connection().execute(
+            "SELECT version FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def save(self, state: SessionState) -> int:
+        connection = self._connection()
+        # The write lock is held until commit, so the SELECT sees this upsert's version
+        # (no RETURNING, which needs SQLite 3.35+)
+        with connection:
+            connection.execute(
+                "INSERT INTO sessions (session_id, version, state, updated_at) VALUES (?, 1, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET "
+                "version = version + 1, state = excluded.state, updated_at = excluded.updated_at",
+                (state.session_id, state.to_json(), time.time())
+            )
+            row = connection.execute(
+                "SELECT version FROM sessions WHERE session_id = ?", (state.session_id,)
+            ).fetchone()
+        state.version = row[0]
+        return state.version
+
+    def delete(self, session_id: str):
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+
+def create_session_store() -> SessionStore:
+    """
+    Build the store selected by SESSION_BACKEND ('memory' or 'sqlite')
+
+    The SQLite file defaults to sessions.db and can be moved with SESSION_DB_PATH.
+    """
+    backend = os.getenv("SESSION_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteSessionStore(os.getenv("SESSION_DB_PATH", "sessions.db"))
+    if backend != "memory":
+        raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+    return InMemorySessionStore()
@@ -0,0 +1,208 @@
+"""
+Bulk Contest Settlement Scorer
+Scores every submitted lineup and splits the top-3 prize pool (60% / 25% / 15%)
+
+Inputs are packed arrays: final fantasy points per player slot (float) and the
+submitted lineups as an (entries, slots) int32 matrix of indices into the points
+array, padded with -1 for empty slots. Totals are one vectorized gather-sum and
+the winners come from a partial selection (argpartition), so a 1M-entry contest
+settles in well under a second.
+
+Payouts follow Settlement.determineWinners: the 1st, 2nd and 3rd entries of
+the sorted order get 60%, 25% and 15%, with no splitting between tied entries.
+Entries are ranked by total (highest first), then by entry index, so ties are
+deterministic; the contract's bubble sort keeps tied entries in key order.
+
+Usage:
+    python settlement_scorer.py --points points.npy --lineups lineups.npy --prize-pool 1000
+    python settlement_scorer.py --synthetic 1000000 --slots 9
+"""
+
+import argparse
+import base64
+import json
+import time
+from dataclasses import dataclass, asdict
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# Matches Settlement.determineWinners in contracts/Settlement.cdc
+PRIZE_SPLIT = (0.60, 0.25, 0.15)
+
+EMPTY_SLOT = -1
+
+# Fantasy points carry at most a few decimals; rounding totals makes ties exact
+TOTAL_DECIMALS = 6
+
+
+@dataclass
+class Payout:
+    entry: int  # Row in the lineups matrix
+    rank: int  # 1-based place in the sorted order
+    total: float
+    share: float  # Fraction of the prize pool
+    amount: float
+
+
+def pack_lineups(lineups: Sequence[Sequence[int]], slots: Optional[int] = None) -> np.ndarray:
+    """
+    Pack ragged lineups into an (entries, slots) int64 matrix padded with -1
+
+    int64 holds any player ID (on-chain moment IDs are UInt64 but stay below 2**63).
+
+    Raises:
+        ValueError: If a lineup is longer than `slots` or holds a value outside int64
+    """
+    slots = slots or max((len(lineup) for lineup in lineups), default=0)
+    packed = np.full((len(lineups), slots), EMPTY_SLOT, dtype=np.int64)
+    for row, lineup in enumerate(lineups):
+        if len(lineup) > slots:
+            raise ValueError(f"Lineup {row} has {len(lineup)} players, more than {slots} slots")
+        try:
+            packed[row, :len(lineup)] = lineup
+        except OverflowError:
+            raise ValueError(f"Lineup {row} has a player ID outside the int64 range") from None
+    return packed
+
+
+def decode_array(data: str, dtype: str, columns: Optional[int] = None) -> np.ndarray:
+    """Decode a base64 little-endian packed array (optionally reshaped to `columns` wide)"""
+    array = np.frombuffer(base64.b64decode(data), dtype=dtype)
+    if columns:
+        if array.size % columns:
+            raise ValueError(f"Packed array of {array.size} values is not a multiple of {columns} slots")
+        array = array.reshape(-1, columns)
+    return array
+
+
+def encode_array(array: np.ndarray, dtype: str) -> str:
+    return base64.b64encode(np.ascontiguousarray(array, dtype=dtype).tobytes()).decode('ascii')
+
+
+def lineup_totals(points: np.ndarray, lineups: np.ndarray) -> np.ndarray:
+    """
+    Total points for every lineup
+
+    Args:
+        points: (n_players,) final fantasy points
+        lineups: (n_entries, n_slots) indices into points, -1 for empty slots
+
+    Returns:
+        (n_entries,) float64 totals
+    """
+    points = np.asarray(points, dtype=np.float64)
+    lineups = np.asarray(lineups)
+    if lineups.ndim != 2:
+        raise ValueError("lineups must be a 2-D (entries, slots) array")
+    if lineups.size and (lineups.max() >= len(points) or lineups.min() < EMPTY_SLOT):
+        raise ValueError("lineups reference players outside the points array")
+
+    # Empty slots gather a trailing zero instead of being masked
+    padded = np.append(points, 0.0)
+    totals = padded[np.where(lineups == EMPTY_SLOT, len(points), lineups)].sum(axis=1)
+    # Same players in a different slot order must tie exactly despite float summation order
+    return np.round(totals, TOTAL_DECIMALS, out=totals)
+
+
+def rank_winners(
+    totals: np.ndarray,
+    prize_pool: float = 1.0,
+    split: Sequence[float] = PRIZE_SPLIT
+) -> List[Payout]:
+    """
+    Pick the paid places and pay each its share of the prize pool
+
+    Returns:
+        Payouts ordered by rank. Places beyond the number of entries go unpaid,
+        as on-chain.
+    """
+    totals = np.asarray(totals, dtype=np.float64)
+    places = min(len(split), len(totals))
+    if places == 0:
+        return []
+
+    # Everyone scoring at least the last paid place's total is a candidate
+    top = np.argpartition(totals, len(totals) - places)[len(totals) - places:]
+    cutoff = totals[top].min()
+    candidates = np.flatnonzero(totals >= cutoff)
+    candidates = candidates[np.lexsort((candidates, -totals[candidates]))][:places]
+
+    return [
+        Payout(
+            entry=int(entry),
+            rank=place + 1,
+            total=float(totals[entry]),
+            share=split[place],
+            amount=split[place] * prize_pool
+        )
+        for place, entry in enumerate(candidates)
+    ]
+
+
+def settle_contest(
+    points: np.ndarray,
+    lineups: np.ndarray,
+    prize_pool: float = 1.0,
+    split: Sequence[float] = PRIZE_SPLIT
+) -> dict:
+    """
+    Score all lineups and compute payouts
+
+    Returns:
+        Dict with 'entries', 'payouts' (list of Payout dicts), 'totals'
+        (the float64 totals array) and 'unallocated' (share of the pool with no
+        entry to pay)
+    """
+    totals = lineup_totals(points, lineups)
+    payouts = rank_winners(totals, prize_pool, split)
+    paid = sum(payout.share for payout in payouts)
+    return {
+        'entries': len(totals),
+        'payouts': [asdict(payout) for payout in payouts],
+        'totals': totals,
+        'unallocated': round(max(sum(split) - paid, 0.0), 12)
+    }
+
+
+def synthetic_contest(n_entries: int, n_slots: int = 9, n_players: int = 500, seed: int = 7):
+    """Random points and lineups for load tests and benchmarks"""
+    rng = np.random.default_rng(seed)
+    points = np.round(rng.gamma(4.0, 6.0, n_players), 1)
+    lineups = rng.integers(0, n_players, (n_entries, n_slots), dtype=np.int32)
+    return points, lineups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Settle a contest from packed points and lineups")
+    parser.add_argument('--points', help=".npy file of final fantasy points per player slot")
+    parser.add_argument('--lineups', help=".npy file of (entries, slots) int32 lineups, -1 padded")
+    parser.add_argument('--synthetic', type=int, help="Settle a random contest with this many entries")
+    parser.add_argument('--slots', type=int, default=9, help="Slots per synthetic lineup")
+    parser.add_argument('--prize-pool', type=float, default=1.0)
+    parser.add_argument('--totals-out', help="Write every entry's total to this .npy file")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        points, lineups = synthetic_contest(args.synthetic, args.slots)
+    elif args.points and args.lineups:
+        points, lineups = np.load(args.points), np.load(args.lineups, mmap_mode='r')
+    else:
+        parser.error("Provide --points and --lineups, or --synthetic")
+
+    start = time.perf_counter()
+    result = settle_contest(points, lineups, args.prize_pool)
+    elapsed = time.perf_counter() - start
+
+    if args.totals_out:
+        np.save(args.totals_out, result['totals'])
+    print(json.dumps({
+        'entries': result['entries'],
+        'payouts': result['payouts'],
+        'unallocated': result['unallocated'],
+        'seconds': round(elapsed, 3)
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
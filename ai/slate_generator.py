@@ -0,0 +1,152 @@
+"""
+Synthetic Player Slate Generator
+Deterministic, thread-safe mock player data for the AI services, load tests and benchmarks
+
+Every value is a pure function of (seed, player_id, field), computed with a
+counter-based SplitMix64 hash over NumPy uint64 arrays. Nothing touches the
+global `random` state, the same player always gets the same stats, and a slate
+of millions of players is generated in a single vectorized pass.
+
+Usage:
+    python slate_generator.py --players 1000000 --out slate.npz
+"""
+
+import argparse
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_SEED = 20241101
+
+POSITIONS = ("PG", "SG", "SF", "PF", "C")
+TRENDING_LABELS = ("down", "stable", "up")
+
+# Field ranges matching the original mock data in app.py
+STAT_RANGES: Dict[str, Tuple[float, float]] = {
+    'recent_performance': (40.0, 95.0),
+    'market_value': (50.0, 2000.0),
+    'consistency': (0.3, 0.95),
+    'injury_risk': (0.0, 0.4),
+}
+
+# Cumulative probabilities for down / stable / up (up is twice as likely)
+TRENDING_CDF = np.array([0.25, 0.5, 1.0])
+
+# Independent stream per generated field
+_STREAMS = ('recent_performance', 'market_value', 'consistency', 'injury_risk', 'trending', 'position')
+
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    """SplitMix64 finalizer; uint64 arithmetic wraps modulo 2**64"""
+    x = x + _GOLDEN_GAMMA
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def counter_uniforms(player_ids: np.ndarray, stream: int, seed: int = DEFAULT_SEED) -> np.ndarray:
+    """
+    Uniform [0, 1) draws keyed on (seed, player_id, stream)
+
+    Args:
+        player_ids: Integer player IDs (any order, duplicates allowed)
+        stream: Field index; each stream is independent of the others
+        seed: Slate seed
+
+    Returns:
+        float64 array with one draw per player ID
+    """
+    with np.errstate(over='ignore'):
+        ids = np.asarray(player_ids, dtype=np.int64).astype(np.uint64)
+        key = _splitmix64(np.uint64(seed & 0xFFFFFFFFFFFFFFFF) ^ (np.uint64(stream) * _GOLDEN_GAMMA))
+        bits = _splitmix64(_splitmix64(ids ^ key) + np.uint64(stream))
+    return (bits >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+@dataclass
+class PlayerSlate:
+    """Columnar player stats; one row per player"""
+    player_id: np.ndarray  # int64
+    position: np.ndarray  # int8 index into POSITIONS
+    recent_performance: np.ndarray  # float64, 0-100
+    market_value: np.ndarray  # float64
+    consistency: np.ndarray  # float64, 0-1
+    injury_risk: np.ndarray  # float64, 0-1
+    trending: np.ndarray  # int8 index into TRENDING_LABELS
+
+    def __len__(self) -> int:
+        return len(self.player_id)
+
+    def take(self, rows: np.ndarray) -> "PlayerSlate":
+        """Select a subset of rows"""
+        return PlayerSlate(**{name: getattr(self, name)[rows] for name in self.__dataclass_fields__})
+
+    def to_npz(self, path: str):
+        np.savez(path, **{name: getattr(self, name) for name in self.__dataclass_fields__})
+
+    @classmethod
+    def from_npz(cls, path: str) -> "PlayerSlate":
+        with np.load(path) as data:
+            return cls(**{name: data[name] for name in cls.__dataclass_fields__})
+
+
+def _scaled(player_ids: np.ndarray, field: str, seed: int) -> np.ndarray:
+    low, high = STAT_RANGES[field]
+    return low + counter_uniforms(player_ids, _STREAMS.index(field), seed) * (high - low)
+
+
+def generate_slate(
+    player_ids: Optional[Iterable[int]] = None,
+    n_players: Optional[int] = None,
+    seed: int = DEFAULT_SEED
+) -> PlayerSlate:
+    """
+    Generate stats for the given player IDs, or for IDs 1..n_players
+
+    Safe to call from any thread; results depend only on the IDs and seed.
+    """
+    if player_ids is None:
+        if n_players is None:
+            raise ValueError("Provide player_ids or n_players")
+        ids = np.arange(1, n_players + 1, dtype=np.int64)
+    else:
+        ids = np.asarray(player_ids, dtype=np.int64) if isinstance(player_ids, (list, tuple, np.ndarray)) \
+            else np.fromiter(player_ids, dtype=np.int64)
+
+    trending = np.searchsorted(
+        TRENDING_CDF,
+        counter_uniforms(ids, _STREAMS.index('trending'), seed),
+        side='right'
+    ).astype(np.int8)
+    position = (
+        counter_uniforms(ids, _STREAMS.index('position'), seed) * len(POSITIONS)
+    ).astype(np.int8)
+
+    return PlayerSlate(
+        player_id=ids,
+        position=position,
+        recent_performance=_scaled(ids, 'recent_performance', seed),
+        market_value=_scaled(ids, 'market_value', seed),
+        consistency=_scaled(ids, 'consistency', seed),
+        injury_risk=_scaled(ids, 'injury_risk', seed),
+        trending=trending
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic player slate")
+    parser.add_argument('--players', type=int, default=100000, help="Number of players (IDs 1..N)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--out', default='slate.npz', help="Output .npz path")
+    args = parser.parse_args()
+
+    slate = generate_slate(n_players=args.players, seed=args.seed)
+    slate.to_npz(args.out)
+    print(f"✅ Wrote {len(slate):,} players to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+"""
+Lineup Strategy Registry
+Strategies as weight vectors over a player feature matrix, scored together in one matrix product
+
+A strategy is a linear scoring rule (feature weights), an optional floor, and
+modifiers that multiply the score where feature conditions hold. Scoring k
+strategies over n players is a single (n x f) @ (f x k) product followed by
+vectorized floors and modifiers, so asking for several strategies costs about
+the same as asking for one. Leagues can register their own strategies, which
+take precedence over the global ones with the same name.
+
+League strategies are kept in a JSON file when the registry has a path, so
+every worker and the precompute job see the same set. Writes are serialized
+with a lock file and published atomically (temp file + os.replace). Readers
+reload the file when it changes, checking at most every `check_interval`
+seconds.
+"""
+
+import fcntl
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+STORE_FORMAT = 1
+
+_OPERATORS = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+}
+
+
+@dataclass(frozen=True)
+class Modifier:
+    """Multiply the score by `factor` for players meeting every condition"""
+    conditions: Tuple[Tuple[str, str, float], ...]  # (feature, operator, threshold)
+    factor: float
+
+
+@dataclass(frozen=True)
+class Strategy:
+    name: str
+    weights: Dict[str, float]
+    modifiers: Tuple[Modifier, ...] = ()
+    floor: Optional[float] = None  # Clamp applied before modifiers
+    description: str = ""
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'weights': dict(self.weights),
+            'modifiers': [
+                {'conditions': [list(c) for c in m.conditions], 'factor': m.factor}
+                for m in self.modifiers
+            ],
+            'floor': self.floor,
+            'description': self.description
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Strategy":
+        """
+        Build a strategy from its JSON form, casting every number to float
+
+        Raises:
+            ValueError, TypeError, KeyError, IndexError: If `data` is malformed
+        """
+        if not isinstance(data.get('weights'), dict):
+            raise TypeError("weights must be an object of feature -> weight")
+        return cls(
+            name=data['name'],
+            weights={k: float(v) for k, v in data['weights'].items()},
+            modifiers=tuple(
+                Modifier(
+                    conditions=tuple((c[0], c[1], float(c[2])) for c in m['conditions']),
+                    factor=float(m['factor'])
+                )
+                for m in data.get('modifiers', [])
+            ),
+            floor=float(data['floor']) if data.get('floor') is not None else None,
+            description=str(data.get('description', ''))
+        )
+
+
+@contextmanager
+def _file_lock(path: str):
+    with open(path, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class StrategyRegistry:
+    """
+    Global and per-league strategies over a fixed, named feature set
+
+    Args:
+        feature_names: Feature columns strategies may weight
+        default: Strategy used for unknown names
+        path: JSON file shared by every process for league strategies; None keeps them in memory
+        check_interval: Seconds between checks of `path` for other processes' writes
+    """
+
+    def __init__(
+        self,
+        feature_names: Sequence[str],
+        default: str = 'balanced',
+        path: Optional[str] = None,
+        check_interval: float = 1.0
+    ):
+        self.feature_names = tuple(feature_names)
+        self.default = default
+        self.path = path
+        self.check_interval = check_interval
+        self._global: Dict[str, Strategy] = {}
+        self._leagues: Dict[str, Dict[str, Strategy]] = {}
+        self._lock = threading.Lock()
+        self._file_identity: Optional[Tuple[int, int]] = None
+        self._checked_at = float('-inf')
+
+    def _validate(self, strategy: Strategy):
+        if not isinstance(strategy.name, str) or not strategy.name:
+            raise ValueError("Strategy name must be a non-empty string")
+        numbers = list(strategy.weights.values()) + [m.factor for m in strategy.modifiers]
+        numbers += [c[2] for m in strategy.modifiers for c in m.conditions]
+        if strategy.floor is not None:
+            numbers.append(strategy.floor)
+        if not all(math.isfinite(value) for value in numbers):
+            raise ValueError(f"Strategy '{strategy.name}' has a non-finite weight, factor, threshold or floor")
+        features = set(self.feature_names)
+        unknown = [name for name in strategy.weights if name not in features]
+        for modifier in strategy.modifiers:
+            for feature, op, _ in modifier.conditions:
+                if feature not in features:
+                    unknown.append(feature)
+                if op not in _OPERATORS:
+                    raise ValueError(f"Unknown operator '{op}' in strategy '{strategy.name}'")
+        if unknown:
+            raise ValueError(f"Unknown features in strategy '{strategy.name}': {', '.join(sorted(set(unknown)))}")
+
+    def _load(self):
+        """Reload league strategies if the shared file changed (caller holds _lock)"""
+        try:
+            stat = os.stat(self.path)
+            identity = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            identity = None
+        if identity == self._file_identity:
+            return
+
+        leagues: Dict[str, Dict[str, Strategy]] = {}
+        if identity is not None:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            for league, strategies in data.get('leagues', {}).items():
+                for entry in strategies:
+                    # A strategy that no longer validates (e.g. a removed feature) is skipped
+                    try:
+                        strategy = Strategy.from_dict(entry)
+                        self._validate(strategy)
+                    except (ValueError, KeyError, TypeError, IndexError):
+                        continue
+                    leagues.setdefault(league, {})[strategy.name] = strategy
+        self._leagues = leagues
+        self._file_identity = identity
+
+    def _refresh(self):
+        if self.path is None:
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            self._load()
+
+    def _save(self):
+        """Publish every league strategy atomically (caller holds _lock and the file lock)"""
+        payload = {
+            'format': STORE_FORMAT,
+            'leagues': {
+                league: [strategy.to_dict() for strategy in strategies.values()]
+                for league, strategies in self._leagues.items()
+            }
+        }
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.strategies-', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        stat = os.stat(self.path)
+        self._file_identity = (stat.st_ino, stat.st_mtime_ns)
+
+    def register(self, strategy: Strategy, league_id=None):
+        """Add or replace a strategy, globally or for one league"""
+        self._validate(strategy)
+        with self._lock:
+            if league_id is None:
+                self._global[strategy.name] = strategy
+            elif self.path is None:
+                self._leagues.setdefault(str(league_id), {})[strategy.name] = strategy
+            else:
+                # Read-modify-write under the file lock so concurrent workers don't drop each other's writes
+                with _file_lock(self.path + '.lock'):
+                    self._load()
+                    self._leagues.setdefault(str(league_id), {})[strategy.name] = strategy
+                    self._save()
+
+    def get(self, name: str, league_id=None) -> Strategy:
+        """League strategy, else global strategy, else the default strategy"""
+        if league_id is not None:
+            self._refresh()
+            league = self._leagues.get(str(league_id), {})
+            if name in league:
+                return league[name]
+        return self._global.get(name) or self._global[self.default]
+
+    def names(self, league_id=None) -> List[str]:
+        names = dict.fromkeys(self._global)
+        if league_id is not None:
+            self._refresh()
+            names.update(dict.fromkeys(self._leagues.get(str(league_id), {})))
+        return list(names)
+
+    def weight_matrix(self, strategies: Sequence[Strategy]) -> np.ndarray:
+        """(n_features, n_strategies) weight matrix"""
+        index = {name: i for i, name in enumerate(self.feature_names)}
+        weights = np.zeros((len(self.feature_names), len(strategies)))
+        for j, strategy in enumerate(strategies):
+            for name, weight in strategy.weights.items():
+                weights[index[name], j] = weight
+        return weights
+
+    def score(self, features: np.ndarray, names: Sequence[str], league_id=None) -> np.ndarray:
+        """
+        Score every player under every requested strategy
+
+        Args:
+            features: (n_players, n_features) matrix in feature_names order
+            names: Strategy names to score
+            league_id: League whose custom strategies take precedence
+
+        Returns:
+            (n_players, len(names)) score matrix
+        """
+        strategies = [self.get(name, league_id) for name in names]
+        scores = features @ self.weight_matrix(strategies)
+
+        index = {name: i for i, name in enumerate(self.feature_names)}
+        for j, strategy in enumerate(strategies):
+            if strategy.floor is not None:
+                np.maximum(scores[:, j], strategy.floor, out=scores[:, j])
+            for modifier in strategy.modifiers:
+                mask = np.ones(len(features), dtype=bool)
+                for feature, op, threshold in modifier.conditions:
+                    mask &= _OPERATORS[op](features[:, index[feature]], threshold)
+                scores[mask, j] *= modifier.factor
+
+        return scores
@@ -2,6 +2,9 @@
 """
 Quick test script for Gemini AI integration
 Tests basic functionality without starting the full server
+
+Run with --offline to skip the live API checks; the replay transport test
+exercises the chat service against the recorded cassette either way.
 """
 
 import os
@@ -95,6 +98,40 @@ def test_service_import():
         print(f"❌ Failed to import service: {e}")
         return False
 
+def test_replay_transport():
+    """Run the chat assistant against the recorded demo cassette (no key or network)"""
+    print("\n📼 Testing replay transport...")
+    
+    try:
+        import asyncio
+        from gemini_chat_service import GeminiFantasyAssistant
+        from model_transport import ReplayTransport, TransportError
+        
+        transport = ReplayTransport(latency="fixed:5", chunk_ms=1)
+        assistant = GeminiFantasyAssistant("", cache=None, transport=transport)
+        result = assistant.chat("Suggest a balanced lineup for me")
+        
+        if "error" in result or len(result["lineup_data"]["players"]) != 5:
+            print(f"❌ Unexpected replay result: {result}")
+            return False
+        print(f"✅ Replayed chat response: {result['response'][:60]}...")
+        
+        chunks = list(transport.model().generate_content("Predict an optimal balanced lineup", stream=True))
+        print(f"✅ Streamed {len(chunks)} chunk(s)")
+        
+        failing = ReplayTransport(latency="fixed:1", error_rate=1.0)
+        try:
+            failing.model().generate_content("Predict an optimal balanced lineup")
+            print("❌ Error injection did not raise")
+            return False
+        except TransportError as e:
+            print(f"✅ Injected error: {e.code}")
+        
+        return True
+    except Exception as e:
+        print(f"❌ Replay transport failed: {e}")
+        return False
+
 def main():
     print("🧪 Flow Fantasy Fusion - Gemini AI Test Suite")
     print("=" * 50)
@@ -102,10 +139,13 @@ def main():
     results = []
     
     # Run tests
-    results.append(("API Key Configuration", test_api_key()))
+    # Without a key the live checks are skipped; replay still exercises the service
+    offline = "--offline" in sys.argv
+    results.append(("API Key Configuration", None if offline else test_api_key()))
     results.append(("Package Imports", test_imports()))
     results.append(("Service Import", test_service_import()))
-    results.append(("Gemini Connection", test_gemini_connection()))
+    results.append(("Replay Transport", test_replay_transport()))
+    results.append(("Gemini Connection", None if offline else test_gemini_connection()))
     
     # Summary
     print("\n" + "=" * 50)
@@ -113,10 +153,10 @@ def main():
     print("=" * 50)
     
     passed = sum(1 for _, result in results if result)
-    total = len(results)
+    total = sum(1 for _, result in results if result is not None)
     
     for test_name, result in results:
-        status = "✅ PASS" if result else "❌ FAIL"
+        status = "⏭️  SKIP" if result is None else "✅ PASS" if result else "❌ FAIL"
         print(f"{status} - {test_name}")
     
     print("=" * 50)
@@ -0,0 +1,11 @@
+"""Put the service modules (flat imports, as the services run them) on sys.path"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the services' module-level state in memory, whatever the developer's shell exports
+os.environ['STRATEGY_STORE_PATH'] = ''
+os.environ['LIVE_STATS_PATH'] = ''
+os.environ['CONTEST_STORE_PATH'] = ''
@@ -0,0 +1,133 @@
+import threading
+
+import pytest
+
+from admission import AdmissionController, Overloaded
+
+LINEUP_REQUEST = {
+    'leagueId': 'test-admission',
+    'playerAddress': '0xadmission',
+    'availablePlayers': list(range(1, 21)),
+    'positions': ['PG', 'SG', 'SF', 'PF', 'C'],
+}
+
+
+def test_session_bucket_rejects_with_retry_after():
+    controller = AdmissionController(session_rate=0.5, session_burst=1)
+    with controller.slot('s1'):
+        pass
+    with pytest.raises(Overloaded) as excinfo:
+        controller.acquire('s1')
+    assert excinfo.value.reason == "Too many requests for this session"
+    assert excinfo.value.retry_after_header == '2'
+    assert controller.stats()['rejected']['session-rate'] == 1
+
+
+def test_league_bucket_is_shared_by_sessions():
+    controller = AdmissionController(league_rate=0.001, league_burst=2)
+    controller.release(controller.acquire('a', league_id=1))
+    controller.release(controller.acquire('b', league_id=1))
+    with pytest.raises(Overloaded):
+        controller.acquire('c', league_id=1)
+    controller.release(controller.acquire('c', league_id=2))
+
+
+def test_queue_is_fair_across_sessions():
+    controller = AdmissionController(concurrency=1, session_rate=100, session_burst=100, max_queued_per_session=3)
+    holder = controller.acquire('holder')
+    order = []
+    tickets = [
+        controller.try_admit(session, notify=lambda session=session: order.append(session))
+        for session in ['busy', 'busy', 'busy', 'quiet']
+    ]
+    assert not any(ticket.granted for ticket in tickets)
+
+    controller.release(holder)
+    for _ in range(4):
+        granted = next(ticket for ticket in tickets if ticket.granted)
+        controller.release(granted)
+
+    # The quiet session's first request is not stuck behind the busy session's backlog
+    assert order.index('quiet') < 2
+
+
+def test_full_queue_rejects_immediately():
+    controller = AdmissionController(concurrency=1, max_queue=1, session_rate=100, session_burst=100)
+    held = controller.acquire('a')
+    queued = controller.try_admit('b')
+    with pytest.raises(Overloaded):
+        controller.try_admit('c')
+    controller.cancel(queued)
+    controller.release(held)
+
+
+def test_blocked_waiter_gets_the_released_slot():
+    controller = AdmissionController(concurrency=1, session_rate=100, session_burst=100)
+    held = controller.acquire('a')
+    acquired = threading.Event()
+
+    def wait():
+        controller.release(controller.acquire('b'))
+        acquired.set()
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    assert not acquired.wait(0.05)
+    controller.release(held)
+    assert acquired.wait(5)
+    thread.join()
+
+
+def test_predict_lineup_falls_back_when_gemini_admission_rejects(monkeypatch):
+    import app
+
+    def reject(*args, **kwargs):
+        raise Overloaded("Too many requests for this session", 3.0)
+
+    gemini_calls = []
+    monkeypatch.setattr(app, 'get_router', lambda: object())
+    monkeypatch.setattr(app.gemini_admission, 'acquire', reject)
+    monkeypatch.setattr(app, 'predict_lineup_with_gemini', lambda *args: gemini_calls.append(args))
+
+    response = app.app.test_client().post('/api/ai/predict-lineup', json=LINEUP_REQUEST)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['lineup']['aiMethod'] == 'rule-based'
+    assert sum(len(ids) for ids in body['lineup']['positions'].values()) == 5
+    assert gemini_calls == []
+
+
+def test_interactive_class_gets_the_weighted_share():
+    controller = AdmissionController(
+        concurrency=1, session_rate=100, session_burst=100, max_queue=100, max_queued_per_session=50
+    )
+    holder = controller.acquire('holder')
+    order = []
+    tickets = []
+    for _ in range(20):
+        for session, priority in (('batch-job', 'batch'), ('chat', 'interactive')):
+            tickets.append(controller.try_admit(
+                session, priority=priority, notify=lambda priority=priority: order.append(priority)
+            ))
+    assert controller.stats()['queued_by_class'] == {'interactive': 20, 'batch': 20}
+
+    controller.release(holder)
+    for _ in range(len(tickets)):
+        controller.release(next(ticket for ticket in tickets if ticket.granted))
+
+    # Both backlogged: four interactive grants for every batch one until chat drains
+    assert order[:20].count('interactive') == 16
+    assert order[20:].count('batch') == 16
+    assert controller.stats()['admitted_by_class'] == {'interactive': 21, 'batch': 20}
+
+
+def test_class_weights_are_validated(monkeypatch):
+    with pytest.raises(ValueError):
+        AdmissionController(class_weights={'batch': 0})
+    with pytest.raises(ValueError):
+        AdmissionController().try_admit('s1', priority='urgent')
+
+    monkeypatch.setenv('ADMISSION_CLASS_WEIGHTS', 'interactive=9, batch=3')
+    from admission import admission_from_env
+    assert admission_from_env().class_weights == {'interactive': 9.0, 'batch': 3.0}
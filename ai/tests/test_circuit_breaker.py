@@ -0,0 +1,147 @@
+import pytest
+
+import circuit_breaker
+from circuit_breaker import (
+    CLOSED, DEFAULT_SLOW_CALL_S, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen, breaker_from_env
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def _breaker(**overrides):
+    settings = dict(window_s=10.0, buckets=10, min_calls=4, error_rate=0.5, slow_call_s=2.0,
+                    slow_rate=0.75, cooldown_s=5.0)
+    settings.update(overrides)
+    return CircuitBreaker('test', **settings)
+
+
+def _calls(breaker, outcomes, latency_s=0.1):
+    for success in outcomes:
+        breaker.record(success, latency_s, breaker.allow())
+
+
+def test_default_slow_threshold_is_inside_the_deadlines():
+    assert DEFAULT_SLOW_CALL_S < 8.0
+    assert CircuitBreaker('x').slow_call_s == DEFAULT_SLOW_CALL_S
+
+
+def test_opens_on_error_rate_after_min_calls(clock):
+    breaker = _breaker()
+    # Too few calls to judge, then under the error rate
+    _calls(breaker, [False, False, False])
+    assert breaker.state == CLOSED
+    breaker = _breaker()
+    _calls(breaker, [False, True, True, True, False])
+    assert breaker.state == CLOSED
+    _calls(breaker, [False])
+    assert breaker.state == OPEN and breaker.is_open
+    assert breaker.allow() is None
+    with pytest.raises(CircuitOpen) as excinfo:
+        with breaker.guard():
+            pass
+    assert excinfo.value.retry_in == pytest.approx(5.0)
+    assert breaker.stats()['rejected'] == 2
+
+
+def test_opens_on_slow_calls(clock):
+    breaker = _breaker()
+    _calls(breaker, [True, True, True], latency_s=2.5)
+    assert breaker.state == CLOSED
+    _calls(breaker, [True], latency_s=3.0)
+    assert breaker.state == OPEN
+    assert breaker.trips == 1
+
+
+def test_old_outcomes_leave_the_window(clock):
+    breaker = _breaker()
+    _calls(breaker, [False, False, False])
+    clock[0] += 11.0
+    _calls(breaker, [False, True, True, True])
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_closes_or_reopens(clock):
+    breaker = _breaker()
+    _calls(breaker, [False] * 4)
+    clock[0] += 5.0
+    assert breaker.state == HALF_OPEN and not breaker.is_open
+
+    probe = breaker.allow()
+    assert probe is not None
+    assert breaker.allow() is None and breaker.is_open
+    breaker.record(False, 0.1, probe)
+    assert breaker.state == OPEN and breaker.trips == 2
+
+    clock[0] += 5.0
+    breaker.record(True, 0.1, breaker.allow())
+    assert breaker.state == CLOSED
+    assert breaker.stats()['window_calls'] == 0
+
+
+def test_slow_probe_reopens(clock):
+    breaker = _breaker()
+    _calls(breaker, [False] * 4)
+    clock[0] += 5.0
+    breaker.record(True, 2.5, breaker.allow())
+    assert breaker.state == OPEN
+
+
+def test_results_from_before_a_state_change_are_ignored(clock):
+    breaker = _breaker()
+    straggler = breaker.allow()
+    _calls(breaker, [False] * 4)
+    assert breaker.state == OPEN
+
+    clock[0] += 5.0
+    probe = breaker.allow()
+    # A call started while closed finishes during the half-open probe: it must not close the breaker
+    breaker.record(True, 0.1, straggler)
+    assert breaker.allow() is None
+    assert breaker.stats()['stale_results'] == 1
+
+    breaker.record(False, 0.1, probe)
+    assert breaker.state == OPEN
+
+    clock[0] += 5.0
+    late_probe_failure = probe
+    recovery = breaker.allow()
+    breaker.record(True, 0.1, recovery)
+    assert breaker.state == CLOSED
+    # A failed probe from an earlier half-open period cannot reopen it
+    breaker.record(False, 0.1, late_probe_failure)
+    assert breaker.state == CLOSED
+    assert breaker.stats()['window_failures'] == 0
+
+
+def test_guard_records_exceptions_and_latency(clock):
+    breaker = _breaker(min_calls=2)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            with breaker.guard():
+                raise RuntimeError("upstream")
+    assert breaker.state == OPEN
+
+    clock[0] += 5.0
+    with breaker.guard():
+        clock[0] += 0.5
+    assert breaker.state == CLOSED
+
+
+def test_breaker_from_env(monkeypatch):
+    breaker = breaker_from_env('x', slow_call_s=2.0)
+    assert breaker.slow_call_s == 2.0
+    monkeypatch.setenv('GEMINI_BREAKER_SLOW_CALL_S', '1.5')
+    monkeypatch.setenv('GEMINI_BREAKER_HALF_OPEN_PROBES', '3')
+    breaker = breaker_from_env('x', slow_call_s=2.0)
+    assert breaker.slow_call_s == 1.5 and breaker.half_open_probes == 3
+
+
+def test_lineup_breaker_trips_before_the_lineup_deadline():
+    import app
+
+    assert app.gemini_breaker.slow_call_s <= app.LINEUP_DEADLINE_S / 4
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from feature_store import FANTASY_WEIGHTS, PERFORMANCE_SCALE, GameLogStore, fantasy_points, synthetic_game_logs
+
+PLAYERS = np.arange(1, 201)
+GAMES = 12
+
+
+def _by_game(logs, first, last):
+    keep = (logs['game_time'] >= first) & (logs['game_time'] < last)
+    return {name: column[keep] for name, column in logs.items()}
+
+
+def _assert_same_stats(left, right):
+    for field in ('recent_performance', 'consistency', 'injury_risk'):
+        np.testing.assert_allclose(getattr(left, field), getattr(right, field), rtol=1e-9, atol=1e-9)
+    np.testing.assert_array_equal(left.trending, right.trending)
+
+
+def test_incremental_batches_match_one_bulk_load():
+    logs = synthetic_game_logs(PLAYERS, GAMES)
+    bulk = GameLogStore()
+    bulk.append(logs)
+
+    incremental = GameLogStore()
+    for first, last in ((0, 1), (1, 4), (4, 5), (5, 9), (9, GAMES)):
+        incremental.append(_by_game(logs, first, last))
+
+    assert incremental.rows == bulk.rows == len(PLAYERS) * GAMES
+    _assert_same_stats(incremental.materialize(PLAYERS), bulk.materialize(PLAYERS))
+
+
+def test_recent_performance_is_the_ewma_over_played_games():
+    logs = synthetic_game_logs(PLAYERS, GAMES)
+    store = GameLogStore()
+    store.append(logs)
+    slate = store.materialize(PLAYERS)
+
+    fp = fantasy_points({stat: logs[stat] for stat in FANTASY_WEIGHTS})
+    for row, player in enumerate(PLAYERS[:20]):
+        mine = (logs['player_id'] == player) & (logs['minutes'] > 0)
+        points = fp[mine][np.argsort(logs['game_time'][mine])]
+        if not len(points):
+            continue
+        weights = store.decay ** np.arange(len(points))[::-1]
+        expected = np.clip(np.dot(weights, points) / weights.sum() / PERFORMANCE_SCALE * 100.0, 0.0, 100.0)
+        assert slate.recent_performance[row] == pytest.approx(expected)
+
+
+def test_out_of_order_games_are_rejected():
+    store = GameLogStore()
+    store.append(synthetic_game_logs(PLAYERS, 2, first_game=5))
+    with pytest.raises(ValueError):
+        store.append(synthetic_game_logs(PLAYERS, 1, first_game=3))
+
+
+def test_reader_applies_published_segments(tmp_path):
+    logs = synthetic_game_logs(PLAYERS, GAMES)
+    writer = GameLogStore(str(tmp_path))
+    reader = GameLogStore(str(tmp_path), check_interval=0.0)
+
+    writer.append(_by_game(logs, 0, 6))
+    writer.append(_by_game(logs, 6, GAMES))
+    reader.refresh(force=True)
+
+    assert reader.version == writer.version
+    _assert_same_stats(reader.materialize(PLAYERS), writer.materialize(PLAYERS))
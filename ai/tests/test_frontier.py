@@ -0,0 +1,111 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from frontier import efficient_frontier, player_moments
+
+
+def _brute_force_best(ids, mean, variance, groups, slots, risk_aversion):
+    """Best mean - risk_aversion * variance over every lineup, by enumeration"""
+    per_group = [
+        itertools.combinations(np.flatnonzero(groups == group).tolist(), k)
+        for group, k in slots.items()
+    ]
+    best = -np.inf
+    for picks in itertools.product(*per_group):
+        rows = [row for pick in picks for row in pick]
+        best = max(best, mean[rows].sum() - risk_aversion * variance[rows].sum())
+    return best
+
+
+def _lambdas(frontier):
+    """Every breakpoint, the middle of every range and a few values past the last one"""
+    values = [0.0]
+    for point in frontier.points:
+        values.append(point.lambda_min)
+        if np.isfinite(point.lambda_max):
+            values.append((point.lambda_min + point.lambda_max) / 2)
+    last = frontier.points[-1].lambda_min
+    values.extend([last * 2 + 1.0, 1e6])
+    return values
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_single_group_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n, k = 10, 3
+    mean, variance = player_moments(rng.uniform(10, 50, n), rng.uniform(0, 1, n), rng.uniform(0, 0.3, n))
+    ids = np.arange(100, 100 + n)
+    groups = np.zeros(n, dtype=np.int64)
+
+    frontier = efficient_frontier(ids, mean, variance, slots=k)
+
+    for risk_aversion in _lambdas(frontier):
+        point = frontier.at_lambda(risk_aversion)
+        assert len(point.player_ids) == k
+        objective = point.mean - risk_aversion * point.variance
+        best = _brute_force_best(ids, mean, variance, groups, {0: k}, risk_aversion)
+        assert objective == pytest.approx(best, rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_position_groups_match_brute_force(seed):
+    rng = np.random.default_rng(100 + seed)
+    groups = np.array(['G'] * 5 + ['F'] * 4 + ['C'] * 3)
+    slots = {'G': 2, 'F': 2, 'C': 1}
+    n = len(groups)
+    mean = rng.uniform(5, 40, n)
+    variance = rng.uniform(1, 200, n)
+    ids = np.arange(n)
+
+    frontier = efficient_frontier(ids, mean, variance, groups, slots)
+
+    for risk_aversion in _lambdas(frontier):
+        point = frontier.at_lambda(risk_aversion)
+        picked = groups[point.player_ids]
+        assert {group: int((picked == group).sum()) for group in slots} == slots
+        objective = point.mean - risk_aversion * point.variance
+        best = _brute_force_best(ids, mean, variance, groups, slots, risk_aversion)
+        assert objective == pytest.approx(best, rel=1e-9, abs=1e-9)
+
+
+def test_points_trade_score_for_variance():
+    rng = np.random.default_rng(7)
+    mean, variance = rng.uniform(10, 50, 30), rng.uniform(1, 300, 30)
+    frontier = efficient_frontier(np.arange(30), mean, variance, slots=5)
+
+    means = [point.mean for point in frontier.points]
+    variances = [point.variance for point in frontier.points]
+    assert means == sorted(means, reverse=True)
+    assert variances == sorted(variances, reverse=True)
+    assert frontier.points[0].mean == pytest.approx(np.sort(mean)[-5:].sum())
+    assert frontier.points[-1].variance == pytest.approx(np.sort(variance)[:5].sum())
+    assert frontier.pick(1.0) is frontier.points[0]
+    assert frontier.pick(0.0) is frontier.points[-1]
+
+
+def test_too_few_players_for_a_group():
+    with pytest.raises(ValueError):
+        efficient_frontier([1, 2], [1.0, 2.0], [1.0, 1.0], ['G', 'F'], {'G': 2})
+
+
+@pytest.mark.parametrize('pool', [5, ['x'], [1.5, 2], [True, 2], [2 ** 70], [-1, 2]])
+def test_endpoint_rejects_malformed_pools(pool):
+    import app
+
+    response = app.app.test_client().post('/api/ai/frontier', json={'availablePlayers': pool, 'positions': ['PG']})
+    assert response.status_code == 400
+    assert 'availablePlayers' in response.get_json()['error']
+
+
+def test_endpoint_accepts_id_strings():
+    import app
+
+    client = app.app.test_client()
+    as_ints = client.post('/api/ai/frontier', json={'availablePlayers': list(range(1, 30)), 'positions': ['PG', 'C']})
+    as_strings = client.post('/api/ai/frontier', json={
+        'availablePlayers': [str(i) for i in range(1, 30)], 'positions': ['PG', 'C']
+    })
+    assert as_ints.status_code == 200
+    assert as_strings.get_json() == as_ints.get_json()
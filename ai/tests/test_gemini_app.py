@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip('fastapi')
+
+import gemini_app
+from session_store import InMemorySessionStore
+
+
+class SlowAssistant:
+    """Stands in for GeminiFantasyAssistant, whose constructor primes the model chat"""
+
+    def __init__(self, api_key, state=None):
+        time.sleep(0.3)
+        self.state = state
+        self.state_version = state.version if state else None
+
+    def export_state(self, session_id):
+        from session_store import SessionState
+        return SessionState(session_id, {'risk_appetite': 'balanced'})
+
+
+def test_cold_sessions_are_built_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(gemini_app, 'GeminiFantasyAssistant', SlowAssistant)
+    monkeypatch.setattr(gemini_app, 'session_store', InMemorySessionStore())
+    monkeypatch.setattr(gemini_app, 'chat_sessions', type(gemini_app.chat_sessions)())
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        first, second = await asyncio.gather(gemini_app.load_session('a'), gemini_app.load_session('b'))
+        await gemini_app.store_session('a', first)
+        ticking.cancel()
+        return first, second, ticks
+
+    started = time.perf_counter()
+    first, second, ticks = asyncio.run(scenario())
+    elapsed = time.perf_counter() - started
+
+    # Both sessions were built concurrently while the loop kept serving other work
+    assert elapsed < 0.55
+    assert ticks >= 10
+    assert gemini_app.chat_sessions['a'] is first and gemini_app.chat_sessions['b'] is second
+    assert first.state_version == 1
+
+
+def test_stale_local_assistant_is_rebuilt_from_the_store(monkeypatch):
+    monkeypatch.setattr(gemini_app, 'GeminiFantasyAssistant', SlowAssistant)
+    store = InMemorySessionStore()
+    monkeypatch.setattr(gemini_app, 'session_store', store)
+    monkeypatch.setattr(gemini_app, 'chat_sessions', type(gemini_app.chat_sessions)())
+
+    local = gemini_app.get_session('s1')
+    gemini_app.save_session('s1', local)
+    assert gemini_app.get_session('s1') is local
+
+    # Another worker saved a newer version
+    store.save(local.export_state('s1'))
+    rebuilt = gemini_app.get_session('s1')
+    assert rebuilt is not local and rebuilt.state_version == 2
@@ -0,0 +1,21 @@
+import pytest
+
+from lineup_engine import MAX_PLAYER_ID, parse_player_ids
+
+
+def test_parse_player_ids_accepts_ints_and_int_strings():
+    assert parse_player_ids([1, "2", MAX_PLAYER_ID]) == [1, 2, MAX_PLAYER_ID]
+
+
+@pytest.mark.parametrize("values", [
+    "1,2,3",
+    [1, "x"],
+    [1, 2.5],
+    [True],
+    [None],
+    [-1],
+    [MAX_PLAYER_ID + 1],
+])
+def test_parse_player_ids_rejects_bad_input(values):
+    with pytest.raises(ValueError):
+        parse_player_ids(values)
@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+
+from lineup_subscriptions import LineupSubscriptionHub, SubscriptionKey
+
+KEY_A = SubscriptionKey.create(1, [3, 1, 2, 2], ['PG', 'C'], 'balanced')
+KEY_B = SubscriptionKey.create(1, [10, 11], ['PG', 'C'], 'balanced')
+
+
+class FakeEngine:
+    """compute_batch stub: a key's lineup is its pool shifted by the current offset"""
+
+    def __init__(self):
+        self.offset = 0
+        self.batches = []
+        self.fail = 0
+
+    def __call__(self, keys):
+        self.batches.append(list(keys))
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("engine down")
+        return [{'positions': [player + self.offset for player in key.pool]} for key in keys]
+
+
+def _run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, timeout=5))
+
+
+def test_key_normalizes_the_pool():
+    assert KEY_A.pool == (1, 2, 3)
+    assert KEY_A.league_id == '1'
+    assert KEY_A == SubscriptionKey.create('1', [2, 3, 1], ['PG', 'C'], 'balanced')
+
+
+def test_identical_subscriptions_share_one_group_and_fan_out():
+    async def scenario():
+        engine = FakeEngine()
+        hub = LineupSubscriptionHub(engine, debounce_ms=20)
+        first, second = await hub.subscribe(KEY_A), await hub.subscribe(KEY_A)
+        other = await hub.subscribe(KEY_B)
+        assert (await first.get())['reason'] == 'initial'
+        assert (await second.get())['positions'] == [1, 2, 3]
+        await other.get()
+        assert len(engine.batches) == 2
+        assert hub.stats()['groups'] == 2 and hub.stats()['subscribers'] == 3
+
+        engine.offset = 100
+        hub.notify_stats_changed([2])
+        update = await first.get()
+        assert update == {'reason': 'stats-changed', 'positions': [101, 102, 103]}
+        assert (await second.get())['positions'] == [101, 102, 103]
+        # Only the group whose pool holds player 2 was recomputed or notified
+        assert engine.batches[-1] == [KEY_A]
+        assert other.empty()
+        assert hub.stats()['pushes'] == 2
+
+    _run(scenario())
+
+
+def test_changes_within_the_debounce_are_recomputed_in_one_batch():
+    async def scenario():
+        engine = FakeEngine()
+        hub = LineupSubscriptionHub(engine, debounce_ms=50)
+        queue_a, queue_b = await hub.subscribe(KEY_A), await hub.subscribe(KEY_B)
+        await queue_a.get(), await queue_b.get()
+
+        engine.offset = 1
+        for player_id in (1, 10, 3, 11):
+            hub.notify_stats_changed([player_id])
+        await queue_a.get(), await queue_b.get()
+        assert len(engine.batches) == 3
+        assert set(engine.batches[-1]) == {KEY_A, KEY_B}
+
+    _run(scenario())
+
+
+def test_unchanged_lineups_are_not_pushed():
+    async def scenario():
+        engine = FakeEngine()
+        hub = LineupSubscriptionHub(engine, debounce_ms=10)
+        queue = await hub.subscribe(KEY_A)
+        await queue.get()
+
+        hub.notify_stats_changed()
+        await asyncio.sleep(0.1)
+        assert len(engine.batches) == 2
+        assert queue.empty() and hub.stats()['pushes'] == 0
+
+    _run(scenario())
+
+
+def test_failed_recompute_is_retried_and_updates_continue():
+    async def scenario():
+        engine = FakeEngine()
+        hub = LineupSubscriptionHub(engine, debounce_ms=10)
+        queue = await hub.subscribe(KEY_A)
+        await queue.get()
+
+        engine.fail, engine.offset = 1, 5
+        hub.notify_stats_changed([1])
+        assert (await queue.get())['positions'] == [6, 7, 8]
+        assert hub.stats()['errors'] == 1
+
+        engine.offset = 9
+        hub.notify_stats_changed([1])
+        assert (await queue.get())['positions'] == [10, 11, 12]
+
+    _run(scenario())
+
+
+def test_version_poll_survives_errors_and_triggers_recompute():
+    async def scenario():
+        versions = iter(['v1', RuntimeError("locked"), 'v1', 'v2'])
+
+        def version_fn():
+            value = next(versions, 'v2')
+            if isinstance(value, Exception):
+                raise value
+            return value
+
+        engine = FakeEngine()
+        hub = LineupSubscriptionHub(engine, debounce_ms=5, version_fn=version_fn, poll_seconds=0.01)
+        queue = await hub.subscribe(KEY_A)
+        await queue.get()
+
+        engine.offset = 2
+        assert (await queue.get())['positions'] == [3, 4, 5]
+        assert hub.stats()['errors'] == 1
+        hub._poll_task.cancel()
+
+    _run(scenario())
+
+
+def test_unsubscribe_drops_the_group():
+    async def scenario():
+        engine = FakeEngine()
+        hub = LineupSubscriptionHub(engine, debounce_ms=10)
+        queue = await hub.subscribe(KEY_A)
+        hub.unsubscribe(KEY_A, queue)
+        hub.unsubscribe(KEY_A, queue)
+        assert hub.stats()['groups'] == 0
+
+        hub.notify_stats_changed([1])
+        await asyncio.sleep(0.05)
+        assert len(engine.batches) == 1
+
+    _run(scenario())
+
+
+def test_subscribe_endpoint_validates_messages():
+    pytest.importorskip('fastapi')
+    import gemini_app
+
+    with pytest.raises(ValueError):
+        gemini_app.subscription_key({'availablePlayers': [1, 2.5], 'positions': ['PG']})
+    with pytest.raises(ValueError):
+        gemini_app.subscription_key({'availablePlayers': [1, 2], 'positions': 'PG'})
+    with pytest.raises(ValueError):
+        gemini_app.subscription_key({'availablePlayers': [1], 'positions': ['PG'], 'optimizationGoal': ['x']})
+    key = gemini_app.subscription_key({'leagueId': 4, 'availablePlayers': ['2', 1], 'positions': ['PG']})
+    assert key == SubscriptionKey.create(4, [1, 2], ['PG'], 'balanced')
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from live_stats import LiveStatsOverlay, SQLiteLiveStatsOverlay, live_stats_from_env
+from slate_generator import generate_slate
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def overlay(request, tmp_path):
+    if request.param == 'memory':
+        return LiveStatsOverlay()
+    return SQLiteLiveStatsOverlay(str(tmp_path / "live.db"), check_interval=0.0)
+
+
+def test_updates_apply_to_their_base_version(overlay):
+    slate = generate_slate(np.array([5, 7, 9]))
+    assert overlay.update([{'player_id': 7, 'injury_risk': 0.9, 'trending': 'down'}], 'v1') == [7]
+    assert overlay.version('v1') > 0 and overlay.version('v2') == 0
+
+    updated = overlay.apply(slate, 'v1')
+    assert updated.injury_risk[1] == 0.9 and updated.trending[1] == 0
+    assert updated.injury_risk[0] == slate.injury_risk[0]
+    assert slate.injury_risk[1] != 0.9
+    assert overlay.apply(slate, 'v2') is slate
+
+
+def test_newer_base_version_supersedes_updates():
+    overlay = LiveStatsOverlay()
+    overlay.update([{'player_id': 7, 'injury_risk': 0.9}], 'v1')
+    overlay.update([{'player_id': 8, 'injury_risk': 0.1}], 'v2')
+    assert overlay.updates('v1') == {}
+    assert overlay.updates('v2') == {8: {'injury_risk': 0.1}}
+
+
+@pytest.mark.parametrize('player', [
+    {'player_id': 7, 'injury_risk': float('nan')},
+    {'player_id': 7, 'recent_performance': float('inf')},
+    {'player_id': 7, 'consistency': 1.5},
+    {'player_id': 7, 'market_value': -3},
+    {'player_id': 7, 'market_value': '12'},
+    {'player_id': 7, 'trending': 'sideways'},
+    {'player_id': 7.5, 'injury_risk': 0.1},
+    {'player_id': True, 'injury_risk': 0.1},
+])
+def test_invalid_updates_are_rejected(overlay, player):
+    with pytest.raises(ValueError):
+        overlay.update([player], 'v1')
+    assert overlay.updates('v1') == {}
+
+
+def test_sqlite_updates_are_shared(tmp_path):
+    path = str(tmp_path / "live.db")
+    writer = SQLiteLiveStatsOverlay(path, check_interval=0.0)
+    reader = SQLiteLiveStatsOverlay(path, check_interval=0.0)
+    writer.update([{'player_id': 7, 'recent_performance': 12.0}], 'v1')
+    before = reader.version('v1')
+    writer.update([{'player_id': 7, 'injury_risk': 0.5}], 'v1')
+    assert reader.version('v1') > before
+    assert reader.updates('v1') == {7: {'recent_performance': 12.0, 'injury_risk': 0.5}}
+
+    writer.clear()
+    assert reader.updates('v1') == {} and len(reader) == 0
+
+
+def test_overlay_from_env(tmp_path, monkeypatch):
+    monkeypatch.delenv('LIVE_STATS_PATH', raising=False)
+    assert type(live_stats_from_env()) is LiveStatsOverlay
+    monkeypatch.setenv('LIVE_STATS_PATH', str(tmp_path / "live.db"))
+    assert isinstance(live_stats_from_env(), SQLiteLiveStatsOverlay)
+
+
+@pytest.mark.parametrize('players', [
+    [{'player_id': 'abc', 'injury_risk': 0.1}],
+    [{'player_id': 7, 'injury_risk': 'NaN'}],
+    [{'injury_risk': 0.1}],
+])
+def test_stats_endpoint_rejects_malformed_updates(players):
+    pytest.importorskip('httpx')
+    from fastapi.testclient import TestClient
+
+    import gemini_app
+
+    response = TestClient(gemini_app.app).post('/api/stats/updates', json={'players': players})
+    assert response.status_code == 400
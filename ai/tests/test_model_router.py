@@ -0,0 +1,178 @@
+import pytest
+
+import model_router
+from model_router import (
+    DEFAULT_TIERS, LATENCY_MAX_AGE_S, MIN_SAMPLES, ModelRouter, ModelTier, intent_of, tiers_from_env
+)
+from model_transport import ModelTransport
+
+
+class StubReply:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubChat:
+    def __init__(self, model, history):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, content, stream=False):
+        reply = f"{self.model.name} reply {len(self.history) // 2}"
+        self.history += [{'role': 'user', 'parts': [content]}, {'role': 'model', 'parts': [reply]}]
+        return StubReply(reply)
+
+
+class StubModel:
+    def __init__(self, name):
+        self.name = name
+        self.chats = []
+
+    def start_chat(self, history=None):
+        chat = StubChat(self, history)
+        self.chats.append(chat)
+        return chat
+
+
+class StubTransport(ModelTransport):
+    mode = 'stub'
+
+    def __init__(self):
+        self.built = []
+
+    def model(self, name='gemini-pro'):
+        self.built.append(name)
+        return StubModel(name)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [5000.0]
+    monkeypatch.setattr(model_router.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def _observe(router, tier, latency_s, clock, calls=MIN_SAMPLES):
+    for _ in range(calls):
+        with router.track(tier):
+            clock[0] += latency_s
+
+
+@pytest.mark.parametrize('message, intent', [
+    ('Suggest a lineup for tonight', 'lineup'),
+    ('Why is Curry better than Lillard?', 'analysis'),
+    ('hi', 'quick'),
+    ('tell me something about the weather in the arena and the crowd and the halftime show tonight ok', 'chat'),
+])
+def test_intent_of(message, intent):
+    assert intent_of(message) == intent
+
+
+@pytest.mark.parametrize('prompt_chars, intent, tier', [
+    (100, 'quick', 'fast'),
+    (100, 'chat', 'standard'),
+    (100, 'lineup', 'pro'),
+    (5_000, 'quick', 'standard'),
+    (25_000, 'quick', 'pro'),
+    (100, 'unknown', 'standard'),
+])
+def test_routes_to_the_preferred_tier(prompt_chars, intent, tier):
+    route = ModelRouter(StubTransport()).route(prompt_chars, intent, deadline_s=10.0)
+    assert (route.tier, route.reason) == (tier, 'preferred')
+
+
+def test_falls_back_when_the_tier_is_too_slow_for_the_deadline(clock):
+    router = ModelRouter(StubTransport())
+    # The pro prior (4s) already misses a 3s deadline
+    route = router.route(100, 'lineup', deadline_s=3.0)
+    assert (route.tier, route.reason) == ('standard', 'deadline')
+
+    _observe(router, 'standard', 3.5, clock)
+    route = router.route(100, 'lineup', deadline_s=3.0)
+    assert (route.tier, route.reason) == ('fast', 'deadline')
+    assert router.fallbacks == 2
+
+    # Slow samples expire, so the tier is tried again on its prior
+    clock[0] += LATENCY_MAX_AGE_S + 1
+    assert router.route(100, 'lineup', deadline_s=3.0).tier == 'standard'
+
+
+def test_falls_back_when_the_tier_is_full():
+    tiers = [ModelTier('fast', 'f', 8_000, 0.5, 4), ModelTier('pro', 'p', 120_000, 1.0, 1)]
+    router = ModelRouter(StubTransport(), tiers)
+    with router.track('pro'):
+        route = router.route(100, 'lineup')
+        assert (route.tier, route.reason) == ('fast', 'load')
+    assert router.route(100, 'lineup').tier == 'pro'
+
+
+def test_never_falls_back_to_a_tier_that_cannot_take_the_prompt(clock):
+    router = ModelRouter(StubTransport())
+    _observe(router, 'pro', 9.0, clock)
+    route = router.route(40_000, 'quick', deadline_s=3.0)
+    assert (route.tier, route.reason) == ('pro', 'deadline')
+    # A prompt too long for every tier still goes to the top one
+    assert router.route(500_000, 'quick').tier == 'pro'
+
+
+def test_routing_off_pins_the_top_tier():
+    route = ModelRouter(StubTransport(), routing=False).route(10, 'quick', deadline_s=0.1)
+    assert (route.tier, route.model, route.reason) == ('pro', 'gemini-pro', 'fixed')
+
+
+def test_track_records_latency_and_errors(clock):
+    router = ModelRouter(StubTransport())
+    _observe(router, 'fast', 0.2, clock, calls=MIN_SAMPLES - 1)
+    # Too few samples: still the prior
+    assert router.latency('fast') == DEFAULT_TIERS[0].expected_latency_s
+    _observe(router, 'fast', 0.2, clock, calls=1)
+    assert router.latency('fast') == pytest.approx(0.2)
+
+    with pytest.raises(RuntimeError):
+        with router.track('fast'):
+            raise RuntimeError("model failed")
+    stats = router.stats()['tiers']['fast']
+    assert stats['errors'] == 1 and stats['in_flight'] == 0
+    assert stats['p95_s'] == pytest.approx(0.2)
+
+
+def test_one_model_client_per_tier():
+    transport = StubTransport()
+    router = ModelRouter(transport)
+    assert router.model('fast') is router.model('fast')
+    router.model('pro')
+    assert transport.built == ['gemini-1.5-flash-8b', 'gemini-pro']
+
+
+def test_tiers_from_env():
+    assert tiers_from_env('') == list(DEFAULT_TIERS)
+    fast, custom = tiers_from_env('fast:flash-lite, custom:my-model')
+    assert (fast.model, fast.max_in_flight) == ('flash-lite', DEFAULT_TIERS[0].max_in_flight)
+    assert (custom.name, custom.max_prompt_chars) == ('custom', DEFAULT_TIERS[1].max_prompt_chars)
+    with pytest.raises(ValueError):
+        tiers_from_env('fast')
+    with pytest.raises(ValueError):
+        ModelRouter(StubTransport(), tiers=[])
+
+
+def test_chat_keeps_its_history_when_the_tier_changes():
+    from gemini_chat_service import GeminiFantasyAssistant
+
+    transport = StubTransport()
+    assistant = GeminiFantasyAssistant('', cache=None, transport=transport)
+    assert assistant.tier == 'fast'
+
+    quick = assistant.chat('hi')
+    assert quick['model_tier'] == 'fast' and 'error' not in quick
+    lineup = assistant.chat('Suggest a lineup for tonight')
+    assert lineup['model_tier'] == 'pro'
+
+    # The pro chat was started from the fast chat's history: system prompt and the first exchange
+    pro_chat = assistant.chat_session
+    assert pro_chat.model.name == 'gemini-pro'
+    texts = [turn['parts'][0] for turn in pro_chat.history]
+    assert texts[0] == assistant.system_context
+    assert texts[3] == 'gemini-1.5-flash-8b reply 1'
+    assert 'hi' in texts[2]
+    assert texts[-1] == lineup['response'] == 'gemini-pro reply 2'
+    assert [turn['text'] for turn in assistant.history[::2]] == ['hi', 'Suggest a lineup for tonight']
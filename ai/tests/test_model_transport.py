@@ -0,0 +1,200 @@
+import json
+
+import pytest
+
+from model_transport import (
+    DEFAULT_CASSETTE, CassetteMiss, ModelTransport, RecordingTransport, ReplayTransport, TransportError,
+    parse_latency, parse_model_latency, transport_from_env
+)
+
+
+class FakeReply:
+    def __init__(self, text):
+        self.text = text
+
+    def __iter__(self):
+        return iter(FakeReply(part) for part in self.text.split('|'))
+
+
+class FakeModel:
+    """Upstream model that echoes prompts, standing in for the SDK"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def generate_content(self, contents, stream=False):
+        if contents == 'boom':
+            raise RuntimeError("upstream down")
+        return FakeReply(f"{self.name} says a|b|c to {contents}")
+
+    def start_chat(self, history=None):
+        return FakeChat(self, history)
+
+
+class FakeChat:
+    def __init__(self, model, history):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, content, stream=False):
+        return self.model.generate_content(f"chat:{content}", stream)
+
+
+class FakeTransport(ModelTransport):
+    mode = 'fake'
+
+    def model(self, name='gemini-pro'):
+        return FakeModel(name)
+
+
+class Sleeps(list):
+    def __call__(self, seconds):
+        self.append(round(seconds, 6))
+
+
+def test_transport_is_abstract():
+    with pytest.raises(TypeError):
+        ModelTransport()
+
+    class Incomplete(ModelTransport):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.parametrize('spec, recorded_ms, expected', [
+    ('recorded', 250.0, 0.25),
+    ('recorded', None, 0.0),
+    ('fixed:800', 250.0, 0.8),
+])
+def test_latency_specs(spec, recorded_ms, expected):
+    assert parse_latency(spec)(recorded_ms) == pytest.approx(expected)
+
+
+def test_random_latency_specs_are_seeded_and_bounded():
+    uniform = [parse_latency('uniform:200,400', seed=3)(None) for _ in range(3)]
+    assert uniform[0] == parse_latency('uniform:200,400', seed=3)(None)
+    draws = parse_latency('uniform:200,400', seed=3)
+    assert all(0.2 <= draws(None) <= 0.4 for _ in range(100))
+    assert parse_latency('lognormal:800,0.5', seed=1)(None) > 0
+    for bad in ('fixed', 'uniform:1', 'gaussian:1,2'):
+        with pytest.raises(ValueError):
+            parse_latency(bad)
+    assert parse_model_latency("fast=fixed:1; slow=fixed:9") == {'fast': 'fixed:1', 'slow': 'fixed:9'}
+    with pytest.raises(ValueError):
+        parse_model_latency("fast")
+
+
+def test_replay_latency_per_model():
+    sleeps = Sleeps()
+    transport = ReplayTransport(latency='fixed:800', model_latency={'gemini-flash': 'fixed:100'}, sleep=sleeps)
+    prompt = "Predict an optimal balanced lineup"
+    assert transport.model().generate_content(prompt).text
+    transport.model('gemini-flash').generate_content(prompt)
+    assert sleeps == [0.8, 0.1]
+    assert transport.stats()['calls'] == 2
+
+
+def test_injected_errors():
+    sleeps = Sleeps()
+    failing = ReplayTransport(latency='fixed:500', error_rate=1.0, error='resource-exhausted', sleep=sleeps)
+    with pytest.raises(TransportError) as excinfo:
+        failing.model().generate_content("anything")
+    assert excinfo.value.code == 'ResourceExhausted'
+    assert sleeps == [0.05]
+
+    deadline = ReplayTransport(error_rate=1.0, error='deadline-exceeded', deadline_s=2.5, sleep=sleeps)
+    with pytest.raises(TransportError) as excinfo:
+        deadline.model().start_chat().send_message("hi")
+    assert excinfo.value.code == 'DeadlineExceeded'
+    assert sleeps[-1] == 2.5
+    assert deadline.stats()['injected_errors'] == 1
+
+    with pytest.raises(ValueError):
+        ReplayTransport(error='teapot')
+
+
+def test_error_rate_is_roughly_honoured_and_seeded():
+    def failures(seed):
+        transport = ReplayTransport(latency='fixed:0', error_rate=0.3, seed=seed, sleep=lambda _: None)
+        outcome = []
+        for _ in range(400):
+            try:
+                transport.model().generate_content("x")
+                outcome.append(False)
+            except TransportError:
+                outcome.append(True)
+        return outcome
+
+    assert failures(7) == failures(7)
+    assert 0.2 < sum(failures(7)) / 400 < 0.4
+
+
+def test_streaming_replays_chunks_with_timing():
+    sleeps = Sleeps()
+    transport = ReplayTransport(latency='fixed:300', chunk_ms=40, sleep=sleeps)
+    reply = transport.model().generate_content("Predict an optimal balanced lineup", stream=True)
+    chunks = [chunk.text for chunk in reply]
+    full = transport.model().generate_content("Predict an optimal balanced lineup").text
+    assert ''.join(chunks) == full
+    assert len(chunks) >= 2
+    assert sleeps[0] == 0.3
+    assert sleeps[1:len(chunks)] == [0.04] * (len(chunks) - 1)
+
+
+def test_record_then_replay_round_trip(tmp_path):
+    cassette = str(tmp_path / "recorded.jsonl")
+    recorder = RecordingTransport(FakeTransport(), cassette)
+    model = recorder.model('gemini-pro')
+    recorded = model.generate_content("lineup please").text
+    streamed = [chunk.text for chunk in model.generate_content("stream please", stream=True)]
+    chat_reply = model.start_chat().send_message("hello").text
+    with pytest.raises(RuntimeError):
+        model.generate_content("boom")
+    assert recorder.stats()['recorded'] == 4
+
+    records = [json.loads(line) for line in open(cassette, encoding='utf-8')]
+    assert [record['kind'] for record in records] == ['generate', 'generate', 'chat', 'generate']
+    assert records[1]['chunks'][0]['text'] == 'gemini-pro says a'
+    assert records[3]['error'] == 'RuntimeError'
+
+    sleeps = Sleeps()
+    replay = ReplayTransport(cassette, strict=True, chunk_ms=5, sleep=sleeps)
+    replayed = replay.model('gemini-pro')
+    assert replayed.generate_content("lineup please").text == recorded
+    assert [chunk.text for chunk in replayed.generate_content("stream please", stream=True)] == streamed
+    chat = replayed.start_chat()
+    assert chat.send_message("hello").text == chat_reply
+    assert [turn['role'] for turn in chat.history] == ['user', 'model']
+
+    # Errors are not replayed, and strict mode refuses unknown prompts
+    with pytest.raises(CassetteMiss):
+        replayed.generate_content("boom")
+    with pytest.raises(CassetteMiss):
+        replay.model('other-model').generate_content("lineup please")
+
+
+def test_unknown_prompts_fall_back_deterministically():
+    transport = ReplayTransport(latency='fixed:0', sleep=lambda _: None)
+    first = transport.model().generate_content("a prompt nobody recorded").text
+    assert first == transport.model().generate_content("a prompt nobody recorded").text
+    assert transport.stats()['misses'] == 2
+
+
+def test_transport_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv('GEMINI_TRANSPORT', 'replay')
+    monkeypatch.setenv('GEMINI_REPLAY_LATENCY', 'fixed:5')
+    monkeypatch.setenv('GEMINI_REPLAY_ERROR_RATE', '0.5')
+    transport = transport_from_env()
+    assert isinstance(transport, ReplayTransport)
+    assert transport.path == DEFAULT_CASSETTE and transport.error_rate == 0.5
+
+    monkeypatch.setenv('GEMINI_TRANSPORT', 'record')
+    assert transport_from_env('') is None
+    monkeypatch.setenv('GEMINI_CASSETTE', str(tmp_path / "out.jsonl"))
+    assert isinstance(transport_from_env('key'), RecordingTransport)
+
+    monkeypatch.setenv('GEMINI_TRANSPORT', 'carrier-pigeon')
+    with pytest.raises(ValueError):
+        transport_from_env('key')
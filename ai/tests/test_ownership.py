@@ -0,0 +1,237 @@
+import itertools
+from collections import Counter
+
+import numpy as np
+import pytest
+
+import ownership
+from ownership import (
+    UNOWNED_FLOOR, ContestFields, FieldOwnership, SQLiteContestFields, bitsets_to_lineups, contest_fields_from_env
+)
+from settlement_scorer import EMPTY_SLOT, pack_lineups
+
+FIELD = [
+    [1, 2, 3],
+    [3, 2, 1],
+    [1, 4, 5],
+    [6, 7],
+    [2, 3, 4],
+]
+
+
+def _field(lineups=FIELD, batches=1):
+    field = FieldOwnership()
+    for batch in np.array_split(np.arange(len(lineups)), batches):
+        field.ingest(pack_lineups([lineups[i] for i in batch], slots=3))
+    return field
+
+
+def test_ownership_is_the_share_of_entries_with_the_player():
+    field = _field()
+    ownership = field.ownership([1, 2, 3, 4, 5, 6, 7, 99])
+    assert ownership.tolist() == pytest.approx([3 / 5, 3 / 5, 3 / 5, 2 / 5, 1 / 5, 1 / 5, 1 / 5, 0.0])
+    assert field.stats() == {'entries': 5, 'players': 7, 'pairs': 9, 'distinct_lineups': 4}
+    assert FieldOwnership().ownership([1, 2]).tolist() == [0.0, 0.0]
+
+
+def test_batches_add_up_to_one_ingest():
+    whole, split = _field(), _field(batches=3)
+    ids = list(range(10))
+    assert split.ownership(ids).tolist() == whole.ownership(ids).tolist()
+    assert split.stacks(50) == whole.stacks(50)
+    assert split.top_owned(50) == whole.top_owned(50)
+    assert split.stats() == whole.stats()
+
+
+def test_matches_brute_force_on_a_random_field():
+    rng = np.random.default_rng(7)
+    lineups = [rng.choice(np.arange(100, 140), size=rng.integers(3, 7), replace=False).tolist() for _ in range(400)]
+    field = FieldOwnership()
+    for start in range(0, len(lineups), 64):
+        field.ingest(pack_lineups(lineups[start:start + 64], slots=6))
+
+    players = Counter(player for lineup in lineups for player in lineup)
+    ids = sorted(players)
+    assert field.ownership(ids).tolist() == pytest.approx([players[i] / len(lineups) for i in ids])
+    assert max(field.ownership(ids)) <= 1.0
+
+    pairs = Counter(pair for lineup in lineups for pair in itertools.combinations(sorted(lineup), 2))
+    assert {tuple(stack['players']): stack['count'] for stack in field.stacks(len(pairs))} == pairs
+    top = field.stacks(5)
+    assert [stack['count'] for stack in top] == sorted(pairs.values(), reverse=True)[:5]
+
+
+def test_top_owned_and_stacks_order_by_count():
+    field = _field()
+    top = field.top_owned(3)
+    assert [player['playerId'] for player in top] == [1, 2, 3]
+    assert top[0] == {'playerId': 1, 'count': 3, 'ownership': pytest.approx(0.6)}
+    stacks = field.stacks(2)
+    assert stacks[0] == {'players': [2, 3], 'count': 3, 'frequency': pytest.approx(0.6)}
+    assert stacks[1]['players'] == [1, 2] and stacks[1]['count'] == 2
+
+
+@pytest.mark.parametrize('lineup', [[1, 2, 1], [5, 5], [7, EMPTY_SLOT, 7]])
+def test_rejects_lineups_that_repeat_a_player(lineup):
+    field = _field()
+    before = field.stats()
+    with pytest.raises(ValueError, match='more than once'):
+        field.ingest(pack_lineups([[8, 9, 10], lineup], slots=3))
+    # The whole batch is refused, so nothing was counted
+    assert field.stats() == before
+    with pytest.raises(ValueError, match='more than once'):
+        field.uniqueness(pack_lineups([lineup], slots=3))
+
+
+def test_padding_is_not_a_duplicate():
+    field = FieldOwnership()
+    field.ingest(np.array([[1, EMPTY_SLOT, EMPTY_SLOT], [EMPTY_SLOT, 2, EMPTY_SLOT]]))
+    assert field.ownership([1, 2, EMPTY_SLOT]).tolist() == [0.5, 0.5, 0.0]
+    assert field.stacks() == []
+
+
+def test_rejects_non_matrix_batches():
+    with pytest.raises(ValueError):
+        FieldOwnership().ingest(np.array([1, 2, 3]))
+    field = FieldOwnership()
+    field.ingest(np.empty((0, 3), dtype=np.int64))
+    assert field.entries == 0
+
+
+def test_uniqueness_counts_exact_duplicates_in_any_order():
+    field = _field()
+    result = field.uniqueness(pack_lineups([[2, 1, 3], [1, 4, 5], [1, 2], [1, 2, 99], [6, 7]]))
+    assert result['duplicates'].tolist() == [2, 1, 0, 0, 1]
+    assert result['ownershipSum'].tolist() == pytest.approx([1.8, 1.2, 1.2, 1.2, 0.4])
+
+
+def test_log_uniqueness_floors_unowned_players():
+    field = _field()
+    result = field.uniqueness(pack_lineups([[1, 2, 3], [1, 2, 99]]))
+    expected_owned = -3 * np.log10(0.6)
+    expected_unseen = -2 * np.log10(0.6) - np.log10(UNOWNED_FLOOR / 5)
+    assert result['logUniqueness'].tolist() == pytest.approx([expected_owned, expected_unseen])
+    # Rarer lineups score higher
+    assert result['logUniqueness'][1] > result['logUniqueness'][0]
+
+
+def test_bitsets_match_packed_lineups():
+    universe = [101, 102, 103, 104, 105, 106, 107, 108, 109]
+    lineups = [[101, 103, 109], [102, 108], [104, 105, 106, 107]]
+    bitsets = np.zeros((len(lineups), 2), dtype=np.uint8)
+    for row, lineup in enumerate(lineups):
+        bits = np.zeros(16, dtype=np.uint8)
+        bits[[universe.index(player) for player in lineup]] = 1
+        bitsets[row] = np.packbits(bits)
+
+    assert bitsets_to_lineups(bitsets, universe).tolist() == pack_lineups(lineups).tolist()
+    from_bits, from_ids = FieldOwnership(), FieldOwnership()
+    from_bits.ingest_bitsets(bitsets, universe)
+    from_ids.ingest(pack_lineups(lineups))
+    assert from_bits.ownership(universe).tolist() == from_ids.ownership(universe).tolist()
+    assert from_bits.stacks(50) == from_ids.stacks(50)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(ownership.time, 'time', lambda: now[0])
+    return now
+
+
+def _stores(tmp_path, **limits):
+    """Two workers' views of one contest file"""
+    path = str(tmp_path / 'contests.db')
+    return (SQLiteContestFields(path, check_interval=0.0, **limits),
+            SQLiteContestFields(path, check_interval=0.0, **limits))
+
+
+def test_contest_fields_create_on_ingest():
+    contests = ContestFields()
+    assert contests.get('c-1') is None
+    field = contests.ingest('c-1', pack_lineups(FIELD[:2], slots=3))
+    contests.ingest('c-1', pack_lineups(FIELD[2:], slots=3))
+    assert contests.get('c-1') is field and field.entries == 5
+    with pytest.raises(ValueError):
+        contests.ingest('c-2', pack_lineups([[1, 1]]))
+    assert contests.get('c-2') is None
+
+
+def test_contest_fields_drop_least_recently_used(clock):
+    contests = ContestFields(max_contests=2)
+    for contest_id in ('a', 'b'):
+        contests.ingest(contest_id, pack_lineups([[1, 2]]))
+    contests.get('a')
+    contests.ingest('c', pack_lineups([[1, 2]]))
+    assert contests.get('b') is None
+    assert contests.get('a') is not None and contests.get('c') is not None
+    assert contests.stats()['contests'] == 2 and contests.stats()['evicted'] == 1
+
+
+def test_contest_fields_expire_idle_contests(clock):
+    contests = ContestFields(idle_ttl_s=60.0)
+    contests.ingest('quiet', pack_lineups([[1, 2]]))
+    clock[0] += 30
+    contests.ingest('busy', pack_lineups([[1, 2]]))
+    clock[0] += 31
+    assert contests.get('quiet') is None
+    assert contests.get('busy') is not None
+    assert len(contests) == 1
+
+
+def test_sqlite_entries_reach_every_worker(tmp_path):
+    first, second = _stores(tmp_path)
+    first.ingest('c-1', pack_lineups(FIELD[:3], slots=3))
+    second.ingest('c-1', pack_lineups(FIELD[3:], slots=3))
+    whole = _field()
+    for store in (first, second):
+        field = store.get('c-1')
+        assert field.ownership(range(10)).tolist() == whole.ownership(range(10)).tolist()
+        assert field.stacks(50) == whole.stacks(50)
+    assert second.get('other') is None
+    # Refused batches are never stored
+    with pytest.raises(ValueError):
+        first.ingest('c-1', pack_lineups([[4, 4]]))
+    assert second.get('c-1').entries == 5
+
+
+def test_sqlite_bounds_the_file(tmp_path, clock):
+    first, second = _stores(tmp_path, max_contests=2, idle_ttl_s=60.0)
+    first.ingest('a', pack_lineups([[1, 2]]))
+    assert second.get('a').entries == 1
+    clock[0] += 1
+    first.ingest('b', pack_lineups([[1, 2]]))
+    clock[0] += 1
+    first.ingest('c', pack_lineups([[1, 2]]))
+    assert len(first) == 2 and first.stats()['evicted'] == 1
+    # The other worker notices the eviction
+    assert second.get('a') is None
+
+    clock[0] += 61
+    assert second.get('b') is None
+    # A contest started again after eviction does not keep its old entries
+    first.ingest('a', pack_lineups([[3, 4]]))
+    assert second.get('a').ownership([1, 3]).tolist() == [0.0, 1.0]
+
+
+def test_contest_fields_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv('CONTEST_MAX_CONTESTS', '7')
+    monkeypatch.setenv('CONTEST_IDLE_TTL_S', '90')
+    contests = contest_fields_from_env()
+    assert type(contests) is ContestFields and (contests.max_contests, contests.idle_ttl_s) == (7, 90.0)
+    monkeypatch.setenv('CONTEST_STORE_PATH', str(tmp_path / 'contests.db'))
+    assert isinstance(contest_fields_from_env(), SQLiteContestFields)
+
+
+def test_entries_endpoint_rejects_repeated_players():
+    import app
+
+    client = app.app.test_client()
+    response = client.post('/api/ai/contests/dup-test/entries', json={'lineups': [[1, 2, 3], [4, 4, 5]]})
+    assert response.status_code == 400
+    assert 'more than once' in response.get_json()['error']
+    assert client.get('/api/ai/contests/dup-test/ownership').status_code == 404
+
+    assert client.post('/api/ai/contests/dup-test/entries', json={'lineups': [[1, 2, 3]]}).status_code == 200
+    response = client.post('/api/ai/contests/dup-test/uniqueness', json={'lineups': [[1, 1, 2]]})
+    assert response.status_code == 400
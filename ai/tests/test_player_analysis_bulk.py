@@ -0,0 +1,63 @@
+import pytest
+
+import app
+
+URL = '/api/ai/player-analysis/bulk'
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+def test_columns_line_up_with_the_requested_players(client):
+    response = client.post(URL, json={'playerIds': [42, 7, 19]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['count'] == 3 and body['statsVersion'] == app.stats_version()
+    columns = body['columns']
+    assert columns['playerId'] == [42, 7, 19]
+    assert all(len(column) == 3 for column in columns.values())
+
+    single = client.post('/api/ai/player-analysis', json={'playerId': 7}).get_json()
+    assert columns['score'][1] == pytest.approx(single['score'], abs=0.01)
+
+
+def test_matching_if_none_match_is_not_modified(client, monkeypatch):
+    first = client.post(URL, json={'playerIds': [42, 7, 19]})
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    def no_fetch(player_ids):
+        raise AssertionError("stats were fetched for a 304")
+
+    monkeypatch.setattr(app, 'get_player_slate', no_fetch)
+    for header in (etag, f'"other", {etag}', f'W/{etag}', '*'):
+        revalidated = client.post(URL, json={'playerIds': [42, 7, 19]}, headers={'If-None-Match': header})
+        assert revalidated.status_code == 304
+        assert revalidated.data == b''
+        assert revalidated.headers['ETag'] == etag
+
+
+def test_etag_changes_with_the_players_or_the_stats(client, monkeypatch):
+    etag = client.post(URL, json={'playerIds': [42, 7, 19]}).headers['ETag']
+
+    reordered = client.post(URL, json={'playerIds': [7, 42, 19]}, headers={'If-None-Match': etag})
+    assert reordered.status_code == 200 and reordered.headers['ETag'] != etag
+
+    monkeypatch.setattr(app, 'stats_version', lambda: 'new-stats')
+    updated = client.post(URL, json={'playerIds': [42, 7, 19]}, headers={'If-None-Match': etag})
+    assert updated.status_code == 200
+    assert updated.get_json()['statsVersion'] == 'new-stats'
+    assert updated.headers['ETag'] != etag
+
+
+@pytest.mark.parametrize('payload', [{}, {'playerIds': []}, {'playerIds': 'abc'}, {'playerIds': [1, 'x']},
+                                     {'playerIds': [True]}])
+def test_rejects_malformed_requests(client, payload):
+    assert client.post(URL, json=payload).status_code == 400
+
+
+def test_rejects_too_many_players(client):
+    ids = list(range(1, app.BULK_ANALYSIS_MAX_IDS + 2))
+    assert client.post(URL, json={'playerIds': ids}).status_code == 400
@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+
+from player_snapshot import NUMERIC_COLUMNS, PlayerSnapshot, SnapshotReader, write_snapshot
+from slate_generator import generate_slate
+
+
+def test_round_trip_is_exact(tmp_path):
+    path = str(tmp_path / "players.snap")
+    slate = generate_slate(np.array([9, 3, 2 ** 40, 7], dtype=np.int64))
+    names = ["Nine", "Three", "Big", "Sevén"]
+    version = write_snapshot(path, slate, names=names, teams=["A", "B", "C", "D"], version="v1")
+
+    snapshot = PlayerSnapshot(path)
+    assert version == snapshot.version == "v1"
+    assert len(snapshot) == 4
+    restored = snapshot.slate()
+    for name in NUMERIC_COLUMNS:
+        np.testing.assert_array_equal(getattr(restored, name), getattr(slate, name))
+        assert getattr(restored, name).dtype == getattr(slate, name).dtype
+    assert [snapshot.name(row) for row in range(4)] == names
+    assert snapshot.team(3) == "D"
+
+
+def test_lookup_rows_by_player_id(tmp_path):
+    path = str(tmp_path / "players.snap")
+    slate = generate_slate(np.array([9, 3, 5], dtype=np.int64))
+    write_snapshot(path, slate)
+
+    rows, found = PlayerSnapshot(path).lookup_rows([5, 4, 9, 100])
+    assert found.tolist() == [True, False, True, False]
+    assert rows[found].tolist() == [2, 0]
+
+
+def test_reader_follows_atomic_swaps(tmp_path):
+    path = str(tmp_path / "players.snap")
+    reader = SnapshotReader(path, check_interval=0.0)
+    assert reader.current() is None
+
+    write_snapshot(path, generate_slate(n_players=3), version="v1")
+    assert reader.current().version == "v1"
+
+    write_snapshot(path, generate_slate(n_players=5), version="v2")
+    assert reader.current().version == "v2"
+
+    # A missing or corrupt file keeps the last good snapshot
+    os.unlink(path)
+    assert reader.current().version == "v2"
+    with open(path, "wb") as f:
+        f.write(b"not a snapshot")
+    assert reader.current().version == "v2"
@@ -0,0 +1,140 @@
+import json
+import os
+
+import pytest
+
+import precompute
+from lineup_engine import predictor, stats_version
+from precompute import (
+    ARTIFACT_FORMAT, DEFAULT_STRATEGIES, PrecomputedLineups, artifact_path, pool_key, strategy_fingerprint,
+    write_artifact
+)
+from strategies import Strategy
+
+POSITIONS = ['PG', 'SG', 'SF', 'PF', 'C']
+POOL = list(range(1, 41))
+
+LEAGUES = [
+    {'leagueId': 'alpha', 'availablePlayers': POOL, 'positions': POSITIONS},
+    {'leagueId': 'alpha', 'availablePlayers': POOL[:20], 'positions': POSITIONS[:3], 'strategies': ['balanced']},
+    {'leagueId': 7, 'availablePlayers': POOL, 'positions': POSITIONS, 'strategies': ['conservative']},
+    {'leagueId': '../escape', 'availablePlayers': POOL, 'positions': POSITIONS},
+]
+
+
+def _fingerprints(names=DEFAULT_STRATEGIES, league_id=None):
+    return {name: strategy_fingerprint(predictor.registry.get(name, league_id)) for name in names}
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    written = precompute.precompute(LEAGUES, str(tmp_path))
+    return tmp_path, written
+
+
+def test_writes_one_artifact_per_valid_league(artifacts):
+    directory, written = artifacts
+    assert written == {'alpha': 2, '7': 1}
+    assert sorted(os.listdir(directory)) == ['league-7.json', 'league-alpha.json']
+
+    with open(directory / 'league-alpha.json', encoding='utf-8') as f:
+        artifact = json.load(f)
+    assert artifact['format'] == ARTIFACT_FORMAT and artifact['statsVersion'] == stats_version()
+    full = artifact['entries'][0]
+    assert full['poolKey'] == pool_key(POOL) and set(full['lineups']) == set(DEFAULT_STRATEGIES)
+    assert full['scoredPool']['playerId'] == POOL
+
+
+def test_hit_matches_the_live_lineups(artifacts):
+    from lineup_engine import LineupRequest, predict_lineups_batch
+
+    reader = PrecomputedLineups(str(artifacts[0]))
+    # Pool order and duplicates do not matter
+    found = reader.lookup('alpha', POOL[::-1] + [1], POSITIONS, _fingerprints(), stats_version())
+    [live] = predict_lineups_batch([LineupRequest(POOL, POSITIONS, list(DEFAULT_STRATEGIES), 'alpha')])
+    assert set(found) == set(DEFAULT_STRATEGIES)
+    for name in DEFAULT_STRATEGIES:
+        lineup, expected_score, rationale = found[name]
+        assert lineup == live[name][0]
+        assert expected_score == pytest.approx(live[name][1])
+    assert reader.stats()['hits'] == 1
+
+
+@pytest.mark.parametrize('league_id, pool, positions, names, version', [
+    ('alpha', POOL, POSITIONS, DEFAULT_STRATEGIES, 'older-stats'),       # stale stats version
+    ('alpha', POOL[:30], POSITIONS, DEFAULT_STRATEGIES, None),           # pool never precomputed
+    ('alpha', POOL, POSITIONS[:4], DEFAULT_STRATEGIES, None),            # other positions
+    ('alpha', POOL[:20], POSITIONS[:3], ['conservative'], None),         # strategy not in that entry
+    ('missing', POOL, POSITIONS, DEFAULT_STRATEGIES, None),              # no artifact file
+    ('../escape', POOL, POSITIONS, DEFAULT_STRATEGIES, None),            # not a valid artifact name
+])
+def test_misses_fall_back_to_live(artifacts, league_id, pool, positions, names, version):
+    reader = PrecomputedLineups(str(artifacts[0]))
+    assert reader.lookup(league_id, pool, positions, _fingerprints(names), version or stats_version()) is None
+    assert reader.stats()['misses'] == 1
+
+
+def test_changed_strategy_definition_is_a_miss(artifacts):
+    reader = PrecomputedLineups(str(artifacts[0]))
+    fingerprints = _fingerprints()
+    fingerprints['balanced'] = strategy_fingerprint(Strategy('balanced', {'recent_performance': 1.0}))
+    assert reader.lookup('alpha', POOL, POSITIONS, fingerprints, stats_version()) is None
+    assert reader.lookup('alpha', POOL, POSITIONS, _fingerprints(), stats_version()) is not None
+
+
+def test_replaced_or_removed_artifacts_are_noticed(artifacts):
+    directory = artifacts[0]
+    reader = PrecomputedLineups(str(directory), check_interval=0.0)
+    version = stats_version()
+    assert reader.lookup('7', POOL, POSITIONS, _fingerprints(['conservative']), version) is not None
+
+    path = artifact_path(str(directory), 7)
+    with open(path, encoding='utf-8') as f:
+        artifact = json.load(f)
+    artifact['statsVersion'] = 'rebuilt-stats'
+    write_artifact(path, artifact)
+    assert reader.lookup('7', POOL, POSITIONS, _fingerprints(['conservative']), version) is None
+    assert reader.lookup('7', POOL, POSITIONS, _fingerprints(['conservative']), 'rebuilt-stats') is not None
+
+    artifact['format'] = ARTIFACT_FORMAT + 1
+    write_artifact(path, artifact)
+    assert reader.lookup('7', POOL, POSITIONS, _fingerprints(['conservative']), 'rebuilt-stats') is None
+
+    os.unlink(path)
+    assert reader.lookup('7', POOL, POSITIONS, _fingerprints(['conservative']), 'rebuilt-stats') is None
+    assert reader.stats()['leagues_loaded'] == 0
+
+
+def test_failed_write_leaves_the_old_artifact(tmp_path, monkeypatch):
+    path = str(tmp_path / 'league-x.json')
+    write_artifact(path, {'format': ARTIFACT_FORMAT, 'entries': []})
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(precompute.json, 'dump', fail)
+    with pytest.raises(OSError):
+        write_artifact(path, {'format': ARTIFACT_FORMAT, 'entries': [{}]})
+    assert os.listdir(tmp_path) == ['league-x.json']
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)['entries'] == []
+
+
+def test_predict_lineup_serves_current_artifacts(artifacts, monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, 'get_router', lambda: None)
+    request = {'leagueId': 'alpha', 'playerAddress': '0xabc', 'availablePlayers': POOL, 'positions': POSITIONS,
+               'optimizationGoals': list(DEFAULT_STRATEGIES)}
+    client = app.app.test_client()
+    live = client.post('/api/ai/predict-lineup', json=request).get_json()
+    assert live['metadata']['source'] == 'live'
+
+    monkeypatch.setattr(app, 'precomputed_lineups', PrecomputedLineups(str(artifacts[0])))
+    served = client.post('/api/ai/predict-lineup', json=request).get_json()
+    assert served['metadata']['source'] == 'precomputed'
+    assert served['lineup'] == live['lineup'] and served['lineups'] == live['lineups']
+
+    # Newer stats than the artifact: computed live again
+    monkeypatch.setattr(app, 'stats_version', lambda: 'newer-stats')
+    assert client.post('/api/ai/predict-lineup', json=request).get_json()['metadata']['source'] == 'live'
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from replacement_index import SLATE_FEATURES, ReplacementIndex, slate_features
+from slate_generator import generate_slate
+
+
+def _random_index(seed, n=400, positions=3, weights=None):
+    rng = np.random.default_rng(seed)
+    ids = rng.permutation(np.arange(1000, 1000 + n))
+    position = rng.integers(0, positions, size=n)
+    features = rng.normal(size=(n, 4)) * [10.0, 200.0, 0.1, 1.0] + [30.0, 500.0, 0.8, 0.0]
+    values = features[:, 1]
+    risk = rng.uniform(0, 0.5, size=n)
+    index = ReplacementIndex(ids, position, features, values, risk=risk, weights=weights)
+    return index, ids, position, features, values, risk
+
+
+def _brute_force(index, ids, position, features, values, risk, query, at, k, max_value=None, exclude=(), max_risk=None):
+    """k nearest by scanning every player with the index's standardization"""
+    standardized = (features - index.mean) / index.scale
+    target = (query - index.mean) / index.scale
+    distances = np.sqrt(((standardized - target) ** 2).sum(axis=1))
+    keep = (position == at) & ~np.isin(ids, list(exclude))
+    if max_value is not None:
+        keep &= values <= max_value
+    if max_risk is not None:
+        keep &= risk <= max_risk
+    rows = np.flatnonzero(keep)
+    rows = rows[np.argsort(distances[rows], kind='stable')][:k]
+    return ids[rows].tolist(), distances[rows]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_brute_force(seed):
+    index, ids, position, features, values, risk = _random_index(seed, weights=[1.0, 0.5, 2.0, 1.0] if seed % 2 else None)
+    rng = np.random.default_rng(100 + seed)
+    for _ in range(20):
+        row = rng.integers(len(ids))
+        query = features[row] + rng.normal(scale=0.1, size=4)
+        k = int(rng.integers(1, 12))
+        options = dict(
+            max_value=None if rng.random() < 0.3 else float(rng.uniform(200, 800)),
+            exclude=[int(ids[row]), *rng.choice(ids, size=int(rng.integers(0, 20))).tolist()],
+            max_risk=None if rng.random() < 0.5 else float(rng.uniform(0.1, 0.5))
+        )
+        expected_ids, expected_distances = _brute_force(
+            index, ids, position, features, values, risk, query, int(position[row]), k, **options
+        )
+
+        matches = index.query(query, int(position[row]), k=k, **options)
+        assert [match.player_id for match in matches] == expected_ids
+        # float32 blocks: distances agree to single precision
+        assert [match.distance for match in matches] == pytest.approx(expected_distances, rel=1e-3, abs=1e-3)
+        for match in matches:
+            assert options['max_value'] is None or match.value <= options['max_value']
+
+
+def test_value_cap_below_every_player_returns_nothing():
+    index, ids, position, features, values, risk = _random_index(1)
+    assert index.query(features[0], int(position[0]), k=5, max_value=values.min() - 1) == []
+    assert index.query(features[0], 99, k=5) == []
+    assert index.query(features[0], int(position[0]), k=0) == []
+
+
+def test_excluding_everyone_nearby_still_fills_k():
+    index, ids, position, features, values, risk = _random_index(2, n=60, positions=1)
+    exclude = ids[:50].tolist()
+    matches = index.query(features[0], 0, k=5, exclude=exclude)
+    assert len(matches) == 5
+    assert not {match.player_id for match in matches} & set(exclude)
+    # Fewer candidates than k: all of them
+    assert len(index.query(features[0], 0, k=20, exclude=exclude)) == 10
+
+
+def test_from_slate_uses_slate_features():
+    slate = generate_slate(n_players=300, seed=4)
+    index = ReplacementIndex.from_slate(slate)
+    features = slate_features(slate)
+    assert features.shape == (300, len(SLATE_FEATURES))
+    assert set(np.unique(features[:, SLATE_FEATURES.index('trend')])) <= {-1.0, 0.0, 1.0}
+
+    expected_ids, _ = _brute_force(
+        index, slate.player_id, slate.position, features, slate.market_value, slate.injury_risk,
+        features[7], int(slate.position[7]), 4, exclude=[int(slate.player_id[7])]
+    )
+    matches = index.query(features[7], int(slate.position[7]), k=4, exclude=[int(slate.player_id[7])])
+    assert [match.player_id for match in matches] == expected_ids
+
+
+def test_endpoint_returns_same_position_substitutes():
+    import app
+
+    response = app.app.test_client().post('/api/ai/replacements', json={
+        'playerId': 42, 'k': 3, 'maxValue': 10_000, 'exclude': [1, '2']
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    assert len(body['replacements']) == 3
+    assert not {42, 1, 2} & {replacement['playerId'] for replacement in body['replacements']}
+
+
+@pytest.mark.parametrize('payload', [
+    {'playerId': 'x'},
+    {'playerId': -4},
+    {'playerId': 2 ** 70},
+    {'playerId': 3, 'availablePlayers': [2 ** 70]},
+    {'playerId': 3, 'availablePlayers': [1.5, 2]},
+    {'playerId': 3, 'exclude': ['a']},
+    {'playerId': 3, 'exclude': 7},
+])
+def test_endpoint_rejects_malformed_ids(payload):
+    import app
+
+    response = app.app.test_client().post('/api/ai/replacements', json=payload)
+    assert response.status_code == 400
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+from request_coalescer import RequestCoalescer
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.001)
+
+
+def _run_batched(coalescer, gate, first, items):
+    """Submit `first`, hold the handler on `gate` until `items` are all queued, then release"""
+    results = {}
+    errors = {}
+
+    def submit(item):
+        try:
+            results[item] = coalescer.submit(item)
+        except Exception as e:
+            errors[item] = e
+
+    leader = threading.Thread(target=submit, args=(first,))
+    leader.start()
+    _wait_for(lambda: coalescer._busy)
+    threads = [threading.Thread(target=submit, args=(item,)) for item in items]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: len(coalescer._queue) == len(items))
+    gate.set()
+    for thread in [leader, *threads]:
+        thread.join(5)
+    return results, errors
+
+
+def test_lone_request_runs_immediately():
+    coalescer = RequestCoalescer(lambda items: [item * 2 for item in items])
+    assert coalescer.submit(21) == 42
+    assert coalescer.stats()['batches'] == 1
+
+
+def test_concurrent_requests_share_one_batch():
+    gate = threading.Event()
+    batches = []
+
+    def handler(items):
+        gate.wait(5)
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    coalescer = RequestCoalescer(handler, window_ms=0)
+    results, errors = _run_batched(coalescer, gate, 0, list(range(1, 9)))
+
+    assert not errors
+    assert results == {item: item * 10 for item in range(9)}
+    assert [len(batch) for batch in batches] == [1, 8]
+
+
+def test_max_batch_splits_the_queue():
+    gate = threading.Event()
+    sizes = []
+
+    def handler(items):
+        gate.wait(5)
+        sizes.append(len(items))
+        return items
+
+    coalescer = RequestCoalescer(handler, window_ms=0, max_batch=3)
+    results, _ = _run_batched(coalescer, gate, 0, list(range(1, 8)))
+
+    assert results == {item: item for item in range(8)}
+    assert sizes == [1, 3, 3, 1]
+
+
+def test_failing_item_only_fails_its_own_request():
+    gate = threading.Event()
+
+    def handler(items):
+        gate.wait(5)
+        if 'bad' in items:
+            raise ValueError("bad item")
+        return [item.upper() for item in items]
+
+    coalescer = RequestCoalescer(handler, window_ms=0)
+    results, errors = _run_batched(coalescer, gate, 'lead', ['a', 'bad', 'b', 'c'])
+
+    assert results == {'lead': 'LEAD', 'a': 'A', 'b': 'B', 'c': 'C'}
+    assert list(errors) == ['bad']
+    assert isinstance(errors['bad'], ValueError)
+    assert coalescer.stats()['isolated_failures'] == 1
+
+
+def test_lone_failure_is_raised_without_a_rerun():
+    calls = []
+
+    def handler(items):
+        calls.append(items)
+        raise KeyError("missing")
+
+    coalescer = RequestCoalescer(handler)
+    with pytest.raises(KeyError):
+        coalescer.submit(1)
+    assert len(calls) == 1
+    assert coalescer.stats()['isolated_failures'] == 0
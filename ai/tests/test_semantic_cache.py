@@ -0,0 +1,91 @@
+import pytest
+
+import semantic_cache
+from semantic_cache import HashingVectorizer, SemanticCache
+
+MESSAGE = "suggest a balanced lineup for tonight"
+PARAPHRASE = "suggest a balanced lineup for tonight please"
+
+
+def _similarity(a, b):
+    vectorizer = HashingVectorizer()
+    return float(vectorizer.transform(a) @ vectorizer.transform(b))
+
+
+def test_vectors_are_stable_and_normalized():
+    vector = HashingVectorizer().transform(MESSAGE)
+    assert vector.tolist() == HashingVectorizer().transform(MESSAGE).tolist()
+    assert float(vector @ vector) == pytest.approx(1.0)
+    assert not HashingVectorizer().transform("   ").any()
+
+
+def test_hit_and_miss_at_the_threshold():
+    similarity = _similarity(MESSAGE, PARAPHRASE)
+    assert 0.9 < similarity < 1.0
+
+    at = SemanticCache(capacity=8, threshold=similarity - 1e-6)
+    at.put(MESSAGE, "lineup A")
+    hit = at.lookup(PARAPHRASE)
+    assert hit is not None
+    assert hit.response == "lineup A" and hit.cached_message == MESSAGE
+    assert hit.similarity == pytest.approx(similarity, abs=1e-6)
+
+    above = SemanticCache(capacity=8, threshold=similarity + 1e-6)
+    above.put(MESSAGE, "lineup A")
+    assert above.lookup(PARAPHRASE) is None
+    assert above.lookup(MESSAGE).response == "lineup A"
+    assert above.stats()['hits'] == 1 and above.stats()['misses'] == 1
+
+
+def test_scopes_do_not_share_entries():
+    cache = SemanticCache(capacity=8)
+    cache.put(MESSAGE, "conservative answer", scope="conservative")
+    assert cache.lookup(MESSAGE, scope="high-risk") is None
+    assert cache.lookup(MESSAGE, scope="conservative").response == "conservative answer"
+
+
+def test_expired_entries_are_skipped_and_evicted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(semantic_cache.time, 'time', lambda: now[0])
+    cache = SemanticCache(capacity=8, threshold=0.5, ttl_seconds=60.0)
+    cache.put(MESSAGE, "old exact answer")
+    now[0] += 50.0
+    cache.put(PARAPHRASE, "newer answer")
+
+    assert cache.lookup(MESSAGE).response == "old exact answer"
+    now[0] += 20.0
+    # The exact match has expired, so the next best live entry answers
+    hit = cache.lookup(MESSAGE)
+    assert hit.response == "newer answer"
+    assert hit.age_seconds == pytest.approx(20.0)
+    assert len(cache) == 1
+
+    now[0] += 60.0
+    assert cache.lookup(MESSAGE) is None
+    assert len(cache) == 0
+
+
+def test_capacity_evicts_least_recently_used():
+    cache = SemanticCache(capacity=2)
+    cache.put("who should I start at center", "center")
+    cache.put("best point guard value picks", "guard")
+    assert cache.lookup("who should I start at center").response == "center"
+
+    cache.put("explain injury risk for my roster", "injury")
+    assert len(cache) == 2
+    assert cache.lookup("best point guard value picks") is None
+    assert cache.lookup("who should I start at center").response == "center"
+    assert cache.lookup("explain injury risk for my roster").response == "injury"
+
+
+def test_putting_the_same_message_replaces_its_entry():
+    cache = SemanticCache(capacity=4)
+    cache.put(MESSAGE, "first")
+    cache.put(MESSAGE, "second")
+    cache.put(MESSAGE, "first", scope="other")
+    assert len(cache) == 2
+    assert cache.lookup(MESSAGE).response == "second"
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.lookup(MESSAGE) is None
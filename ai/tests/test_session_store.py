@@ -0,0 +1,104 @@
+from collections import Counter
+
+import pytest
+
+import session_store
+from session_store import (
+    MAX_HISTORY_TURNS, MAX_TURN_CHARS, InMemorySessionStore, SessionState, SessionStore,
+    SQLiteSessionStore, compact_history, worker_for_session
+)
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return InMemorySessionStore()
+    return SQLiteSessionStore(str(tmp_path / "sessions.db"))
+
+
+def _state(session_id="s1", **preferences):
+    return SessionState(
+        session_id,
+        preferences or {'risk_appetite': 'balanced'},
+        history=[{'role': 'user', 'text': 'hi'}, {'role': 'model', 'text': 'hello'}],
+        metadata={'league': 1}
+    )
+
+
+def test_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def test_load_save_version_round_trip(store):
+    assert store.load("s1") is None
+    assert store.version("s1") is None
+
+    assert store.save(_state()) == 1
+    loaded = store.load("s1")
+    assert loaded.version == 1 and loaded.history == _state().history
+    assert loaded.preferences == {'risk_appetite': 'balanced'}
+    assert loaded.metadata == {'league': 1}
+    assert store.version("s1") == 1
+
+    assert store.save(_state(risk_appetite='aggressive')) == 2
+    assert store.load("s1").preferences == {'risk_appetite': 'aggressive'}
+    assert store.load("s1").version == 2
+    assert store.version("other") is None
+
+    store.delete("s1")
+    assert store.load("s1") is None and store.version("s1") is None
+
+
+def test_stale_writer_sees_the_newer_version(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    worker_a, worker_b = SQLiteSessionStore(path), SQLiteSessionStore(path)
+
+    seen_by_a = worker_a.save(_state())
+    state = worker_b.load("s1")
+    state.preferences = {'risk_appetite': 'conservative'}
+    assert worker_b.save(state) == seen_by_a + 1
+
+    # Worker A's cached assistant is behind the shared version and must reload
+    assert worker_a.version("s1") != seen_by_a
+    assert worker_a.load("s1").preferences == {'risk_appetite': 'conservative'}
+
+    # Versions keep increasing whichever worker saves, so neither can go backwards
+    assert worker_a.save(_state()) == seen_by_a + 2
+
+
+def test_sqlite_reconnects_after_fork(tmp_path, monkeypatch):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    store.save(_state())
+    parent_connection = store._connection()
+    assert store._connection() is parent_connection
+
+    monkeypatch.setattr(session_store.os, 'getpid', lambda: -1)
+    child_connection = store._connection()
+    assert child_connection is not parent_connection
+    assert store.load("s1").version == 1
+
+
+def test_compact_history_keeps_recent_truncated_turns():
+    history = [{'role': 'user', 'text': str(i) * (MAX_TURN_CHARS + 5)} for i in range(MAX_HISTORY_TURNS + 3)]
+    compacted = compact_history(history)
+    assert len(compacted) == MAX_HISTORY_TURNS
+    assert compacted[0]['text'][0] == '3'
+    assert all(len(turn['text']) == MAX_TURN_CHARS for turn in compacted)
+
+
+def test_worker_for_session_is_stable_and_balanced():
+    sessions = [f"user-{i}" for i in range(4000)]
+    placement = [worker_for_session(session, 4) for session in sessions]
+    assert placement == [worker_for_session(session, 4) for session in sessions]
+    assert set(placement) == {0, 1, 2, 3}
+    assert max(Counter(placement).values()) < 1300
+
+    # Adding a worker only moves sessions onto the new one
+    grown = [worker_for_session(session, 5) for session in sessions]
+    moved = [(old, new) for old, new in zip(placement, grown) if old != new]
+    assert all(new == 4 for _, new in moved)
+    assert len(moved) < len(sessions) * 0.3
+
+    with pytest.raises(ValueError):
+        worker_for_session("user-1", 0)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from settlement_scorer import (
+    EMPTY_SLOT, PRIZE_SPLIT, lineup_totals, pack_lineups, rank_winners, settle_contest, synthetic_contest
+)
+
+
+def _places(payouts):
+    return [(payout.entry, payout.rank, payout.share) for payout in payouts]
+
+
+def test_ties_are_paid_by_place_without_splitting():
+    # Settlement.determineWinners pays 60/25/15 by sorted position, never splitting a tie
+    payouts = rank_winners([7.0, 3.0, 7.0, 1.0], prize_pool=100.0)
+    assert _places(payouts) == [(0, 1, 0.60), (2, 2, 0.25), (1, 3, 0.15)]
+    assert [payout.amount for payout in payouts] == pytest.approx([60.0, 25.0, 15.0])
+
+
+def test_tie_at_the_last_paid_place_goes_to_the_lower_entry_index():
+    payouts = rank_winners([9.0, 5.0, 8.0, 5.0, 5.0])
+    assert _places(payouts) == [(0, 1, 0.60), (2, 2, 0.25), (1, 3, 0.15)]
+
+
+def test_all_tied():
+    assert _places(rank_winners([4.0] * 5)) == [(0, 1, 0.60), (1, 2, 0.25), (2, 3, 0.15)]
+
+
+def test_fewer_entries_than_places_leave_the_rest_unallocated():
+    result = settle_contest(np.array([1.0, 2.0]), np.array([[0, EMPTY_SLOT], [1, 0]]))
+    assert [payout['entry'] for payout in result['payouts']] == [1, 0]
+    assert result['unallocated'] == pytest.approx(PRIZE_SPLIT[2])
+    assert rank_winners([]) == []
+
+
+def test_matches_a_full_sort():
+    points, lineups = synthetic_contest(5000, seed=3)
+    totals = lineup_totals(points, lineups)
+    expected = sorted(range(len(totals)), key=lambda entry: (-totals[entry], entry))[:3]
+    assert [payout.entry for payout in rank_winners(totals)] == expected
+
+
+def test_slot_order_does_not_break_ties():
+    points = np.array([0.1, 0.2, 0.3, 1e6])
+    totals = lineup_totals(points, np.array([[0, 1, 2], [2, 1, 0], [1, 2, 0]]))
+    assert totals[0] == totals[1] == totals[2]
+
+
+def test_lineups_outside_the_points_array_are_rejected():
+    with pytest.raises(ValueError):
+        lineup_totals(np.zeros(3), np.array([[0, 3]]))
+
+
+def test_pack_lineups_pads_and_holds_large_ids():
+    packed = pack_lineups([[2 ** 40, 1], [3]])
+    assert packed.dtype == np.int64
+    assert packed.tolist() == [[2 ** 40, 1], [3, EMPTY_SLOT]]
+    with pytest.raises(ValueError):
+        pack_lineups([[2 ** 64]])
+    with pytest.raises(ValueError):
+        pack_lineups([[1, 2, 3]], slots=2)
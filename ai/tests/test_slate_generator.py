@@ -0,0 +1,84 @@
+import hashlib
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from slate_generator import POSITIONS, STAT_RANGES, PlayerSlate, counter_uniforms, generate_slate
+
+AI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IDS = np.array([1, 2, 3, 42, 2 ** 40, 999_999], dtype=np.int64)
+
+_DIGEST_SCRIPT = """
+import hashlib, sys
+import numpy as np
+from slate_generator import generate_slate
+slate = generate_slate(np.array([1, 2, 3, 42, 2 ** 40, 999_999], dtype=np.int64))
+digest = hashlib.sha256()
+for name in slate.__dataclass_fields__:
+    digest.update(np.ascontiguousarray(getattr(slate, name)).tobytes())
+print(digest.hexdigest())
+"""
+
+
+def _digest(slate: PlayerSlate) -> str:
+    digest = hashlib.sha256()
+    for name in slate.__dataclass_fields__:
+        digest.update(np.ascontiguousarray(getattr(slate, name)).tobytes())
+    return digest.hexdigest()
+
+
+def test_same_ids_give_the_same_stats_across_calls():
+    assert _digest(generate_slate(IDS)) == _digest(generate_slate(list(IDS)))
+    assert _digest(generate_slate(IDS)) == _digest(generate_slate(iter(IDS.tolist())))
+
+
+def test_stats_depend_only_on_the_player_not_the_pool():
+    alone = generate_slate(IDS)
+    order = np.array([4, 0, 5, 2])
+    mixed = generate_slate(np.concatenate([IDS[order], [7, 8]]))
+    for name in alone.__dataclass_fields__:
+        np.testing.assert_array_equal(getattr(mixed, name)[:4], getattr(alone, name)[order])
+
+
+def test_same_stats_in_other_processes():
+    expected = _digest(generate_slate(IDS))
+    for hash_seed in ('0', '12345'):
+        env = dict(os.environ, PYTHONPATH=AI_DIR, PYTHONHASHSEED=hash_seed)
+        output = subprocess.run(
+            [sys.executable, '-c', _DIGEST_SCRIPT], env=env, capture_output=True, text=True, check=True
+        ).stdout.split()[-1]
+        assert output == expected
+
+
+def test_threads_agree():
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        digests = set(pool.map(lambda _: _digest(generate_slate(n_players=5000)), range(16)))
+    assert len(digests) == 1
+
+
+def test_seed_and_stream_change_the_draws():
+    base = counter_uniforms(IDS, 0)
+    assert not np.array_equal(base, counter_uniforms(IDS, 1))
+    assert not np.array_equal(base, counter_uniforms(IDS, 0, seed=7))
+    assert _digest(generate_slate(IDS, seed=7)) != _digest(generate_slate(IDS))
+
+
+def test_values_stay_in_range():
+    slate = generate_slate(n_players=20000)
+    assert slate.player_id.tolist()[:3] == [1, 2, 3]
+    for name, (low, high) in STAT_RANGES.items():
+        column = getattr(slate, name)
+        assert column.min() >= low and column.max() < high
+    assert set(np.unique(slate.position)) == set(range(len(POSITIONS)))
+    assert set(np.unique(slate.trending)) == {0, 1, 2}
+    # Up is twice as likely as down or stable
+    assert np.mean(slate.trending == 2) == pytest.approx(0.5, abs=0.02)
+
+
+def test_needs_ids_or_a_count():
+    with pytest.raises(ValueError):
+        generate_slate()
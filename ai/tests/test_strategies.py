@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from strategies import Modifier, Strategy, StrategyRegistry
+
+FEATURES = ('performance', 'value', 'risk')
+
+
+def _registry(**kwargs):
+    registry = StrategyRegistry(FEATURES, default='base', **kwargs)
+    registry.register(Strategy('base', {'performance': 1.0}, floor=0.0))
+    return registry
+
+
+def test_from_dict_casts_numbers():
+    strategy = Strategy.from_dict({
+        'name': 'x',
+        'weights': {'performance': '0.5'},
+        'modifiers': [{'conditions': [['value', '>', '10']], 'factor': '2'}],
+        'floor': '1',
+    })
+    assert strategy.weights == {'performance': 0.5}
+    assert strategy.modifiers == (Modifier((('value', '>', 10.0),), 2.0),)
+    assert strategy.floor == 1.0
+
+
+@pytest.mark.parametrize('data', [
+    {'name': 'x', 'weights': [1.0]},
+    {'name': 'x', 'weights': {'performance': 1.0}, 'floor': 'abc'},
+    {'name': 'x', 'weights': {'performance': 'abc'}},
+    {'name': 'x', 'weights': {'performance': 1.0}, 'modifiers': [{'conditions': [['value', '>', 'abc']], 'factor': 2}]},
+    {'name': 'x', 'weights': {'performance': 1.0}, 'modifiers': [{'conditions': [['value', '>', 1]], 'factor': None}]},
+])
+def test_from_dict_rejects_non_numbers(data):
+    with pytest.raises((ValueError, TypeError)):
+        Strategy.from_dict(data)
+
+
+@pytest.mark.parametrize('strategy', [
+    Strategy('x', {'unknown': 1.0}),
+    Strategy('x', {'performance': float('nan')}),
+    Strategy('x', {'performance': 1.0}, floor=float('inf')),
+    Strategy('x', {'performance': 1.0}, modifiers=(Modifier((('value', '!=', 1.0),), 2.0),)),
+    Strategy('x', {'performance': 1.0}, modifiers=(Modifier((('missing', '>', 1.0),), 2.0),)),
+    Strategy('', {'performance': 1.0}),
+])
+def test_register_rejects_invalid_strategies(strategy):
+    with pytest.raises(ValueError):
+        _registry().register(strategy, league_id=1)
+
+
+def test_scores_apply_floor_then_modifiers():
+    registry = _registry()
+    registry.register(Strategy(
+        'boost', {'performance': 1.0, 'risk': -1.0},
+        modifiers=(Modifier((('value', '>', 5.0),), 2.0),), floor=0.0
+    ))
+    features = np.array([[10.0, 1.0, 2.0], [10.0, 9.0, 2.0], [1.0, 9.0, 5.0]])
+    scores = registry.score(features, ['boost', 'base'])
+    np.testing.assert_allclose(scores, [[8.0, 10.0], [16.0, 10.0], [0.0, 1.0]])
+
+
+def test_league_strategies_override_globals_and_fall_back_to_default():
+    registry = _registry()
+    registry.register(Strategy('custom', {'value': 1.0}), league_id=7)
+    assert registry.get('custom', 7).weights == {'value': 1.0}
+    assert registry.get('custom', 8).name == 'base'
+    assert registry.get('custom').name == 'base'
+
+
+def test_league_strategies_are_shared_through_the_store(tmp_path):
+    path = str(tmp_path / 'strategies.json')
+    writer = _registry(path=path, check_interval=0.0)
+    reader = _registry(path=path, check_interval=0.0)
+
+    writer.register(Strategy('custom', {'value': 2.0}, floor=1.0), league_id=7)
+    assert reader.get('custom', 7) == writer.get('custom', 7)
+    assert reader.names(7) == ['base', 'custom']
+
+    # Writes from both registries are merged, not overwritten
+    reader.register(Strategy('other', {'risk': -1.0}), league_id=7)
+    assert writer.names(7) == ['base', 'custom', 'other']
+    assert _registry(path=path).names(7) == ['base', 'custom', 'other']
+
+
+def test_strategy_endpoint_rejects_bad_numbers():
+    import app
+
+    client = app.app.test_client()
+    bad = client.post('/api/ai/strategies', json={
+        'leagueId': 'test-strategies', 'name': 'broken', 'weights': {'recent_performance': 1.0}, 'floor': 'abc'
+    })
+    assert bad.status_code == 400
+    assert 'broken' not in app.predictor.registry.names('test-strategies')
+
+    good = client.post('/api/ai/strategies', json={
+        'leagueId': 'test-strategies', 'name': 'ok', 'weights': {'recent_performance': '1'}, 'floor': '0'
+    })
+    assert good.status_code == 200
+    assert good.get_json()['strategy']['floor'] == 0.0
+
+
+@pytest.mark.parametrize('goals', ['balanced', ['balanced', 3], [''], {'balanced': 1}])
+def test_predict_lineup_rejects_malformed_goals(goals):
+    import app
+
+    response = app.app.test_client().post('/api/ai/predict-lineup', json={
+        'leagueId': 1, 'playerAddress': '0xabc', 'availablePlayers': [1, 2, 3, 4, 5, 6],
+        'positions': ['PG', 'SG', 'SF', 'PF', 'C'], 'optimizationGoals': goals
+    })
+    assert response.status_code == 400
+    assert 'optimizationGoals' in response.get_json()['error']
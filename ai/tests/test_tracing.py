@@ -0,0 +1,168 @@
+import json
+
+import pytest
+
+from tracing import FileSpanExporter, TraceContext, Tracer, current_span, instrument_fastapi, instrument_flask
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_ID = '00f067aa0ba902b7'
+
+
+def _spans(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize('header, sampled', [
+    (f'00-{TRACE_ID}-{PARENT_ID}-01', True),
+    (f'00-{TRACE_ID}-{PARENT_ID}-00', False),
+    (f'00-{TRACE_ID}-{PARENT_ID}-03', True),  # unknown flags beside 'sampled'
+    (f'  00-{TRACE_ID.upper()}-{PARENT_ID}-01 ', True),
+    (f'01-{TRACE_ID}-{PARENT_ID}-01-future', True),  # later versions may append fields
+])
+def test_parses_valid_traceparent(header, sampled):
+    context = TraceContext.parse(header)
+    assert context == TraceContext(TRACE_ID, PARENT_ID, sampled)
+
+
+@pytest.mark.parametrize('header', [
+    None,
+    '',
+    'garbage',
+    f'ff-{TRACE_ID}-{PARENT_ID}-01',
+    f'00-{TRACE_ID}-{PARENT_ID}-01-extra',
+    f'00-{"0" * 32}-{PARENT_ID}-01',
+    f'00-{TRACE_ID}-{"0" * 16}-01',
+    f'00-{TRACE_ID[:-1]}-{PARENT_ID}-01',
+    f'00-{TRACE_ID}-{PARENT_ID}-1',
+])
+def test_rejects_invalid_traceparent(header):
+    assert TraceContext.parse(header) is None
+
+
+def test_traceparent_round_trips():
+    for sampled in (True, False):
+        context = TraceContext(TRACE_ID, PARENT_ID, sampled)
+        assert TraceContext.parse(context.traceparent()) == context
+    assert TraceContext(TRACE_ID, PARENT_ID, True).traceparent() == f'00-{TRACE_ID}-{PARENT_ID}-01'
+
+
+def test_child_continues_the_trace_with_the_callers_flag(tmp_path):
+    for exporter in (None, FileSpanExporter(str(tmp_path / 'spans.jsonl'))):
+        for sample_ratio in (0.0, 1.0):
+            tracer = Tracer('svc', sample_ratio=sample_ratio, exporter=exporter)
+            for sampled in (True, False):
+                parent = TraceContext(TRACE_ID, PARENT_ID, sampled)
+                span = tracer.start_span('op', parent=parent)
+                assert span.context.trace_id == TRACE_ID
+                assert span.context.span_id not in (PARENT_ID, '0' * 16)
+                assert span.parent_id == PARENT_ID
+                assert span.context.sampled is sampled
+
+
+def test_new_traces_follow_the_sample_ratio(tmp_path):
+    exporter = FileSpanExporter(str(tmp_path / 'spans.jsonl'))
+    assert all(Tracer('svc', 1.0, exporter).start_span('op').context.sampled for _ in range(50))
+    assert not any(Tracer('svc', 0.0, exporter).start_span('op').context.sampled for _ in range(50))
+    # Nothing is sampled when there is nowhere to export it
+    assert not any(Tracer('svc', 1.0, None).start_span('op').context.sampled for _ in range(50))
+
+    tracer = Tracer('svc', 0.25, exporter)
+    share = sum(tracer.start_span('op').context.sampled for _ in range(4000)) / 4000
+    assert 0.2 < share < 0.3
+
+
+def test_sampling_decision_depends_only_on_the_trace_id(tmp_path):
+    exporter = FileSpanExporter(str(tmp_path / 'spans.jsonl'))
+    first, second = Tracer('a', 0.5, exporter), Tracer('b', 0.5, exporter)
+    for trace_id in (f'{n:032x}' for n in range(0, 1 << 64, (1 << 64) // 97)):
+        assert first._sample_new_trace(trace_id) == second._sample_new_trace(trace_id)
+
+
+def test_nested_spans_export_with_parent_links(tmp_path):
+    path = str(tmp_path / 'spans.jsonl')
+    tracer = Tracer('svc', sample_ratio=1.0, exporter=FileSpanExporter(path))
+    with tracer.span('request', kind='server', attributes={'http.method': 'GET'}) as outer:
+        with tracer.span('stage') as inner:
+            assert current_span() is inner
+            inner.set_attribute('players', 3)
+        assert current_span() is outer
+    assert current_span() is None
+    with pytest.raises(ValueError):
+        with tracer.span('failing'):
+            raise ValueError('boom')
+    tracer.exporter.flush()
+
+    stage, request, failing = _spans(path)
+    assert request['traceId'] == stage['traceId'] == outer.context.trace_id
+    assert stage['parentSpanId'] == request['spanId'] and request['parentSpanId'] == ''
+    assert request['kind'] == 'SPAN_KIND_SERVER'
+    assert {'key': 'players', 'value': {'intValue': '3'}} in stage['attributes']
+    assert int(stage['endTimeUnixNano']) >= int(stage['startTimeUnixNano']) > 0
+    assert failing['status'] == {'code': 'STATUS_CODE_ERROR', 'message': 'ValueError: boom'}
+    assert tracer.stats()['spans_exported'] == 3
+
+
+def test_unsampled_spans_record_nothing(tmp_path):
+    path = tmp_path / 'spans.jsonl'
+    tracer = Tracer('svc', sample_ratio=1.0, exporter=FileSpanExporter(str(path)))
+    parent = TraceContext(TRACE_ID, PARENT_ID, False)
+    with tracer.span('request', parent=parent, attributes={'a': 1}) as span:
+        span.set_attribute('b', 2)
+    tracer.exporter.flush()
+    assert span.attributes == {} and span.start_ns == 0
+    assert not path.exists()
+
+
+def test_flask_continues_and_returns_traceparent(tmp_path):
+    flask = pytest.importorskip('flask')
+    path = str(tmp_path / 'spans.jsonl')
+    app = flask.Flask('traced')
+    tracer = Tracer('lineups', sample_ratio=0.0, exporter=FileSpanExporter(path))
+    instrument_flask(app, tracer)
+
+    @app.route('/items/<int:item_id>')
+    def item(item_id):
+        return {'trace': current_span().context.trace_id}
+
+    client = app.test_client()
+    response = client.get('/items/7', headers={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-01'})
+    returned = TraceContext.parse(response.headers['traceparent'])
+    assert response.get_json() == {'trace': TRACE_ID}
+    assert returned.trace_id == TRACE_ID and returned.sampled and returned.span_id != PARENT_ID
+
+    unsampled = client.get('/items/7', headers={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-00'})
+    assert not TraceContext.parse(unsampled.headers['traceparent']).sampled
+    tracer.exporter.flush()
+
+    [span] = _spans(path)
+    assert span['name'] == 'GET /items/<int:item_id>'
+    assert span['spanId'] == returned.span_id and span['parentSpanId'] == PARENT_ID
+    assert {'key': 'http.status_code', 'value': {'intValue': '200'}} in span['attributes']
+
+
+def test_fastapi_continues_and_returns_traceparent(tmp_path):
+    fastapi = pytest.importorskip('fastapi')
+    from fastapi.testclient import TestClient
+
+    path = str(tmp_path / 'spans.jsonl')
+    app = fastapi.FastAPI()
+    tracer = Tracer('chat', sample_ratio=0.0, exporter=FileSpanExporter(path))
+    instrument_fastapi(app, tracer)
+
+    @app.get('/items/{item_id}')
+    async def item(item_id: int):
+        return {'trace': current_span().context.trace_id}
+
+    client = TestClient(app)
+    response = client.get('/items/7', headers={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-01'})
+    returned = TraceContext.parse(response.headers['traceparent'])
+    assert response.json() == {'trace': TRACE_ID}
+    assert returned.trace_id == TRACE_ID and returned.sampled
+
+    fresh = TraceContext.parse(client.get('/items/7').headers['traceparent'])
+    assert fresh.trace_id != TRACE_ID and not fresh.sampled
+    tracer.exporter.flush()
+
+    [span] = _spans(path)
+    assert span['name'] == 'GET /items/{item_id}' and span['parentSpanId'] == PARENT_ID
@@ -0,0 +1,349 @@
+"""
+Request Tracing
+W3C trace-context propagation and lightweight spans for the AI services
+
+Incoming `traceparent` headers are continued (or a new trace is started), every
+stage of a request runs in a span tracked through contextvars, and responses
+carry a `traceparent` naming the server span so the gateway can log it. Sampled
+spans are written as OTLP-style JSON lines (one span per line, trace/span IDs in
+hex, times in Unix nanoseconds) to a local file that works offline and can be
+replayed into any OTLP collector.
+
+Sampling is parent-based: a caller's sampled flag is always honoured and passed
+on unchanged (even by a service that exports nothing), and new traces are
+sampled when the trace ID falls under TRACE_SAMPLE_RATIO. Unsampled requests
+still propagate IDs but record nothing. Spans are written to the file by a
+background thread, never on the request path.
+
+Environment:
+    TRACE_SAMPLE_RATIO=0.1       share of new traces that are recorded
+    TRACE_EXPORT_PATH=traces.jsonl   where sampled spans go (unset: not exported)
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import re
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+TRACEPARENT_RE = re.compile(r'^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(-.*)?$')
+
+INVALID_TRACE_ID = '0' * 32
+INVALID_SPAN_ID = '0' * 16
+
+FLAG_SAMPLED = 0x01
+
+
+@dataclass(frozen=True)
+class TraceContext:
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+    @classmethod
+    def parse(cls, header: Optional[str]) -> Optional["TraceContext"]:
+        """Parse a traceparent header; None if it is missing or invalid"""
+        if not header:
+            return None
+        match = TRACEPARENT_RE.match(header.strip().lower())
+        if match is None:
+            return None
+        version, trace_id, span_id, flags, rest = match.groups()
+        if version == 'ff' or (version == '00' and rest):
+            return None
+        if trace_id == INVALID_TRACE_ID or span_id == INVALID_SPAN_ID:
+            return None
+        return cls(trace_id, span_id, bool(int(flags, 16) & FLAG_SAMPLED))
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+@dataclass
+class Span:
+    name: str
+    context: TraceContext
+    parent_id: Optional[str]
+    kind: str = 'internal'
+    start_ns: int = 0
+    end_ns: int = 0
+    attributes: Dict[str, object] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def recording(self) -> bool:
+        return self.context.sampled
+
+    def set_attribute(self, key: str, value):
+        if self.context.sampled:
+            self.attributes[key] = value
+
+    def to_otlp(self, service_name: str) -> Dict:
+        attributes = [{'key': 'service.name', 'value': {'stringValue': service_name}}]
+        for key, value in self.attributes.items():
+            if isinstance(value, bool):
+                typed = {'boolValue': value}
+            elif isinstance(value, int):
+                typed = {'intValue': str(value)}
+            elif isinstance(value, float):
+                typed = {'doubleValue': value}
+            else:
+                typed = {'stringValue': str(value)}
+            attributes.append({'key': key, 'value': typed})
+        return {
+            'traceId': self.context.trace_id,
+            'spanId': self.context.span_id,
+            'parentSpanId': self.parent_id or '',
+            'name': self.name,
+            'kind': f"SPAN_KIND_{self.kind.upper()}",
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': attributes,
+            'status': {'code': 'STATUS_CODE_ERROR', 'message': self.error} if self.error else {'code': 'STATUS_CODE_OK'}
+        }
+
+
+class FileSpanExporter:
+    """
+    Buffered JSON-lines span file
+
+    export() only appends to a buffer; a background thread writes it out every
+    `max_age_s` seconds, or sooner once `max_buffer` spans are waiting, so
+    request threads and the event loop never touch the file. The thread is
+    started lazily in each process (it does not survive a fork), and the
+    buffer is flushed at exit.
+    """
+
+    def __init__(self, path: str, max_buffer: int = 256, max_age_s: float = 2.0):
+        self.path = path
+        self.max_buffer = max_buffer
+        self.max_age_s = max_age_s
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid: Optional[int] = None
+        self.exported = 0
+        atexit.register(self.flush)
+
+    def _ensure_writer(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._wake = threading.Event()
+                threading.Thread(target=self._run, name='span-exporter', daemon=True).start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.max_age_s)
+            self._wake.clear()
+            self.flush()
+
+    def export(self, line: str):
+        self._ensure_writer()
+        with self._lock:
+            self._buffer.append(line)
+            full = len(self._buffer) >= self.max_buffer
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                lines, self._buffer = self._buffer, []
+            if not lines:
+                return
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+            self.exported += len(lines)
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar('current_span', default=None)
+
+
+class Tracer:
+    """
+    Starts spans for one service
+
+    Args:
+        service_name: Recorded on every span
+        sample_ratio: Share of new traces recorded (callers' sampled flag wins)
+        exporter: Destination for finished sampled spans; None records nothing
+    """
+
+    def __init__(self, service_name: str, sample_ratio: float = 0.1, exporter: Optional[FileSpanExporter] = None):
+        self.service_name = service_name
+        self.sample_ratio = min(max(sample_ratio, 0.0), 1.0)
+        self.exporter = exporter
+        self._threshold = int(self.sample_ratio * (1 << 64))
+        self.spans_started = 0
+
+    def _sample_new_trace(self, trace_id: str) -> bool:
+        # Decided from the trace ID itself, so every hop reaches the same answer
+        return self.exporter is not None and int(trace_id[16:], 16) < self._threshold
+
+    def _child_context(self, parent: Optional[TraceContext]) -> TraceContext:
+        # IDs need uniqueness, not secrecy; getrandbits avoids a urandom call per span
+        span_id = f"{random.getrandbits(64) or 1:016x}"
+        if parent is not None:
+            # The caller's sampled flag passes through even when this service exports nothing
+            return TraceContext(parent.trace_id, span_id, parent.sampled)
+        trace_id = f"{random.getrandbits(128) or 1:032x}"
+        return TraceContext(trace_id, span_id, self._sample_new_trace(trace_id))
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        parent: Optional[TraceContext] = None,
+        kind: str = 'internal',
+        attributes: Optional[Dict[str, object]] = None
+    ) -> Iterator[Span]:
+        """
+        Run the enclosed block in a new span
+
+        The parent is `parent` when given (e.g. from an incoming traceparent),
+        otherwise the current span; without either a new trace starts.
+        """
+        span = self.start_span(name, parent, kind, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[TraceContext] = None,
+        kind: str = 'internal',
+        attributes: Optional[Dict[str, object]] = None
+    ) -> Span:
+        """Start a span without making it current (see span() for the usual form)"""
+        if parent is None:
+            current = _current_span.get()
+            parent = current.context if current is not None else None
+        context = self._child_context(parent)
+        self.spans_started += 1
+        span = Span(
+            name=name,
+            context=context,
+            parent_id=parent.span_id if parent is not None else None,
+            kind=kind,
+            start_ns=time.time_ns() if context.sampled else 0
+        )
+        if attributes and context.sampled:
+            span.attributes.update(attributes)
+        return span
+
+    def end_span(self, span: Span):
+        if not span.recording or self.exporter is None:
+            return
+        span.end_ns = time.time_ns()
+        self.exporter.export(json.dumps(span.to_otlp(self.service_name), separators=(',', ':')))
+
+    def stats(self) -> Dict:
+        return {
+            'sample_ratio': self.sample_ratio,
+            'exporting_to': self.exporter.path if self.exporter else None,
+            'spans_started': self.spans_started,
+            'spans_exported': self.exporter.exported if self.exporter else 0
+        }
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def activate(span: Span) -> contextvars.Token:
+    """Make a span started with start_span() current; undo with deactivate(token)"""
+    return _current_span.set(span)
+
+
+def deactivate(token: contextvars.Token):
+    _current_span.reset(token)
+
+
+_exporters: Dict[str, FileSpanExporter] = {}
+
+
+def tracer_from_env(service_name: str) -> Tracer:
+    """Tracer configured by TRACE_SAMPLE_RATIO and TRACE_EXPORT_PATH; tracers in one process share the file"""
+    path = os.environ.get('TRACE_EXPORT_PATH')
+    if path and path not in _exporters:
+        _exporters[path] = FileSpanExporter(path)
+    return Tracer(
+        service_name,
+        sample_ratio=float(os.environ.get('TRACE_SAMPLE_RATIO', '0.1')),
+        exporter=_exporters.get(path) if path else None
+    )
+
+
+def instrument_flask(app, tracer: Tracer):
+    """Server span per Flask request, continuing any incoming traceparent"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_span():
+        span = tracer.start_span(
+            f"{request.method} {request.path}",
+            parent=TraceContext.parse(request.headers.get('traceparent')),
+            kind='server',
+            attributes={'http.method': request.method, 'http.target': request.path}
+        )
+        g.trace_span = span
+        g.trace_token = activate(span)
+
+    @app.after_request
+    def _tag_response(response):
+        span = g.get('trace_span')
+        if span is not None:
+            span.set_attribute('http.status_code', response.status_code)
+            if request.url_rule is not None:
+                span.name = f"{request.method} {request.url_rule.rule}"
+            response.headers['traceparent'] = span.context.traceparent()
+        return response
+
+    @app.teardown_request
+    def _end_request_span(error=None):
+        span = g.pop('trace_span', None)
+        token = g.pop('trace_token', None)
+        if span is None:
+            return
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        if token is not None:
+            deactivate(token)
+        tracer.end_span(span)
+
+
+def instrument_fastapi(app, tracer: Tracer):
+    """Server span per FastAPI HTTP request, continuing any incoming traceparent"""
+
+    @app.middleware("http")
+    async def _trace_request(request, call_next):
+        with tracer.span(
+            f"{request.method} {request.url.path}",
+            parent=TraceContext.parse(request.headers.get('traceparent')),
+            kind='server',
+            attributes={'http.method': request.method, 'http.target': request.url.path}
+        ) as span:
+            response = await call_next(request)
+            span.set_attribute('http.status_code', response.status_code)
+            route = request.scope.get('route')
+            if route is not None and hasattr(route, 'path'):
+                span.name = f"{request.method} {route.path}"
+            response.headers['traceparent'] = span.context.traceparent()
+            return response
@@ -4,6 +4,20 @@ const router = express.Router();
 
 const AI_SERVICE_URL = process.env.AI_SERVICE_URL || 'http://localhost:5000';
 
+const TRACEPARENT_RE = /^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$/;
+
+// The gateway records no spans, so the caller's W3C traceparent is forwarded
+// unchanged; without one the AI service starts (and samples) the trace itself
+function traceHeaders(req) {
+  const traceparent = (req.get('traceparent') || '').trim().toLowerCase();
+  return TRACEPARENT_RE.test(traceparent) ? { traceparent } : {};
+}
+
+// The AI service's server span, echoed to the caller and logged on errors
+function traceparentOf(response, req) {
+  return (response && response.headers && response.headers.traceparent) || req.get('traceparent') || '';
+}
+
 // POST request lineup prediction
 router.post('/predict-lineup', async (req, res) => {
   try {
@@ -33,12 +47,13 @@ router.post('/predict-lineup', async (req, res) => {
         positions,
         optimizationGoal: optimizationGoal || 'balanced'
       },
-      { timeout: 10000 }
+      { timeout: 10000, headers: traceHeaders(req) }
     );
     
+    res.set('traceparent', traceparentOf(aiResponse, req));
     res.json(aiResponse.data);
   } catch (error) {
-    console.error('Error calling AI service:', error.message);
+    console.error('Error calling AI service:', error.message, traceparentOf(error.response, req));
     
     // Fallback response if AI service is unavailable
     if (error.code === 'ECONNREFUSED' || error.code === 'ETIMEDOUT') {
@@ -80,12 +95,13 @@ router.post('/player-analysis', async (req, res) => {
     const aiResponse = await axios.post(
       `${AI_SERVICE_URL}/api/ai/player-analysis`,
       { playerId },
-      { timeout: 5000 }
+      { timeout: 5000, headers: traceHeaders(req) }
     );
     
+    res.set('traceparent', traceparentOf(aiResponse, req));
     res.json(aiResponse.data);
   } catch (error) {
-    console.error('Error analyzing player:', error.message);
+    console.error('Error analyzing player:', error.message, traceparentOf(error.response, req));
     res.status(500).json({
       success: false,
       error: 'Player analysis failed',
@@ -94,4 +110,52 @@ router.post('/player-analysis', async (req, res) => {
   }
 });
 
+// POST bulk player analysis (columnar; ETag/If-None-Match pass through for 304s)
+router.post('/player-analysis/bulk', async (req, res) => {
+  try {
+    const { playerIds } = req.body;
+    
+    if (!Array.isArray(playerIds) || playerIds.length === 0) {
+      return res.status(400).json({
+        success: false,
+        error: 'Missing playerIds'
+      });
+    }
+    
+    const headers = traceHeaders(req);
+    if (req.get('if-none-match')) {
+      headers['If-None-Match'] = req.get('if-none-match');
+    }
+    
+    const aiResponse = await axios.post(
+      `${AI_SERVICE_URL}/api/ai/player-analysis/bulk`,
+      { playerIds },
+      {
+        timeout: 5000,
+        headers,
+        validateStatus: (status) => (status >= 200 && status < 300) || status === 304
+      }
+    );
+    
+    res.set('traceparent', traceparentOf(aiResponse, req));
+    if (aiResponse.headers.etag) {
+      res.set('ETag', aiResponse.headers.etag);
+      res.set('Cache-Control', 'private, no-cache');
+    }
+    if (aiResponse.status === 304) {
+      return res.status(304).end();
+    }
+    
+    res.json(aiResponse.data);
+  } catch (error) {
+    console.error('Error analyzing players:', error.message, traceparentOf(error.response, req));
+    const status = error.response && error.response.status === 400 ? 400 : 500;
+    res.status(status).json({
+      success: false,
+      error: 'Bulk player analysis failed',
+      details: (error.response && error.response.data && error.response.data.error) || error.message
+    });
+  }
+});
+
 module.exports = router;